@@ -0,0 +1,258 @@
+import asyncio
+import itertools
+import json
+import random
+import websockets
+from solana.rpc.core import RPCException
+from jup_swap import SOL_MINT
+
+
+def ws_url_from_rpc(rpc_url: str):
+    # Solana nodes serve pubsub on the same host, just over ws(s)://
+    if rpc_url.startswith("https://"):
+        return "wss://" + rpc_url[len("https://"):]
+    if rpc_url.startswith("http://"):
+        return "ws://" + rpc_url[len("http://"):]
+    return rpc_url
+
+
+class BalanceSubscriber:
+    """
+    Push-based balance updates over Solana pubsub.
+    Subscribes with accountSubscribe to the wallet itself (SOL) and to the
+    associated token account of every watched mint, and calls
+    on_balance(mint, amount) whenever one of them changes.
+    On disconnect it reconnects with backoff and resubscribes everything;
+    `connected` tells callers when they have to fall back to polling.
+    Every (re)subscribed account is read once over RPC, so changes missed
+    while disconnected still reach on_balance. Accounts that could not be
+    watched are retried every retry_interval seconds and on reconnect.
+    balances keeps the amounts known to be current: pushed by a
+    notification or seeded by a read, for subscribed mints while
+    connected. JupSwap(balance_cache=...) sizes sells from it.
+    """
+
+    def __init__(
+        self,
+        swap,
+        on_balance,
+        ws_url: str = None,
+        on_status=None,
+        commitment: str = "confirmed",
+        reconnect_delay: float = 1,
+        max_reconnect_delay: float = 30,
+        retry_interval: float = 30
+    ):
+        self.swap = swap
+        self.on_balance = on_balance
+        self.on_status = on_status
+        self.ws_url = ws_url or ws_url_from_rpc(swap.rpc_url)
+        self.commitment = commitment
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.retry_interval = retry_interval
+        self.connected = False
+        self.mints = set()
+        self._ws = None
+        self._stopped = False
+        self._ids = itertools.count(1)
+        self._pending = {}  # request id -> mint, waiting for the subscription id
+        self._subscriptions = {}  # subscription id -> mint
+        self._by_mint = {}  # mint -> subscription id
+        self.balances = {}  # mint -> raw amount, see cached()
+        self._versions = {}  # mint -> notifications seen, see seed()
+        self._unwatched = set()  # mints whose subscribe failed, retried
+        self._seeding = set()  # initial reads in flight
+
+    def _status(self, msg):
+        if self.on_status:
+            self.on_status(msg)
+
+    def cached(self, mint):
+        """Current raw balance of mint, or None if the stream can't vouch for it."""
+        if not self.connected or mint not in self._by_mint:
+            return None
+        return self.balances.get(mint)
+
+    def version(self, mint):
+        """Taken before an RPC read and handed to seed(); None while mint is not subscribed."""
+        sub_id = self._by_mint.get(mint) if self.connected else None
+        if sub_id is None:
+            return None
+        return sub_id, self._versions.get(mint, 0)
+
+    def seed(self, mint, amount, version):
+        """
+        Remember a balance read over RPC. Dropped unless the subscription
+        was already live when the read started and no notification came in
+        since, a notification is newer than the read.
+        """
+        if version is not None and self.version(mint) == version:
+            self.balances.setdefault(mint, amount)
+
+    def _account_for(self, mint):
+        owner = self.swap.private_key.pubkey()
+        if mint == SOL_MINT:
+            return str(owner)
+        return str(self.swap.mint_registry.ata(mint, self.swap.pubkey))
+
+    async def run(self):
+        delay = self.reconnect_delay
+        while not self._stopped:
+            try:
+                async with websockets.connect(self.ws_url, ping_interval=20, ping_timeout=20, max_size=None) as ws:
+                    self._ws = ws
+                    self.connected = True
+                    delay = self.reconnect_delay
+                    self._status(f"Balance stream connected: {self.ws_url}")
+                    for mint in list(self.mints):
+                        await self._subscribe(mint)
+                    retry = asyncio.ensure_future(self._retry_unwatched())
+                    try:
+                        async for raw in ws:
+                            self._handle(json.loads(raw))
+                    finally:
+                        retry.cancel()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._status(f"Balance stream error: {str(e)}")
+            finally:
+                for task in list(self._seeding):
+                    task.cancel()
+                self._ws = None
+                self.connected = False
+                self._pending.clear()
+                self._subscriptions.clear()
+                self._by_mint.clear()
+                # Changes while disconnected are not seen
+                self.balances.clear()
+            if self._stopped:
+                break
+            self._status(f"Balance stream disconnected, reconnecting in {delay:.0f}s (polling meanwhile)")
+            await asyncio.sleep(delay * (1 + random.random() * 0.2))
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def stop(self):
+        self._stopped = True
+        if self._ws is not None:
+            await self._ws.close()
+
+    async def update_mints(self, mints):
+        """Replace the watched set, (un)subscribing only the difference."""
+        mints = set(mints)
+        added = mints - self.mints
+        removed = self.mints - mints
+        self.mints = mints
+        self._unwatched &= mints
+        if self._ws is None:
+            return
+        for mint in removed:
+            await self._unsubscribe(mint)
+        for mint in added:
+            await self._subscribe(mint)
+        await self._resubscribe_unwatched()
+
+    async def _resubscribe_unwatched(self):
+        waiting = set(self._pending.values())
+        for mint in list(self._unwatched & self.mints):
+            if mint not in self._by_mint and mint not in waiting:
+                await self._subscribe(mint)
+
+    async def _retry_unwatched(self):
+        while True:
+            await asyncio.sleep(self.retry_interval)
+            try:
+                await self._resubscribe_unwatched()
+            except Exception:
+                return  # the connection is going away, run() reconnects
+
+    async def _send(self, method, params):
+        request_id = next(self._ids)
+        await self._ws.send(json.dumps({
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "method": method,
+            "params": params
+        }))
+        return request_id
+
+    async def _subscribe(self, mint):
+        try:
+            account = self._account_for(mint)
+        except Exception as e:
+            self._unwatch(mint, f"Can't watch {mint}: {str(e)}")
+            return
+        request_id = await self._send(
+            "accountSubscribe",
+            [account, {"encoding": "jsonParsed", "commitment": self.commitment}]
+        )
+        self._pending[request_id] = mint
+
+    async def _unsubscribe(self, mint):
+        sub_id = self._by_mint.pop(mint, None)
+        if sub_id is None:
+            return
+        self._subscriptions.pop(sub_id, None)
+        self.balances.pop(mint, None)
+        await self._send("accountUnsubscribe", [sub_id])
+
+    def _unwatch(self, mint, msg):
+        # Said once, the retries are quiet
+        if mint not in self._unwatched:
+            self._unwatched.add(mint)
+            self._status(msg)
+
+    async def _seed(self, mint):
+        """Read a freshly subscribed account once, unless a notification beats the read."""
+        version = self.version(mint)
+        try:
+            amount = await self.swap.read_balance(mint)
+        except RPCException:
+            # No token account yet, the first notification will create it
+            return
+        except Exception as e:
+            self._status(f"Balance read for {mint} failed: {str(e)}")
+            return
+        if version is not None and self.version(mint) == version and mint not in self.balances:
+            self.balances[mint] = amount
+            self.on_balance(mint, amount)
+
+    def _handle(self, msg):
+        if "id" in msg:
+            mint = self._pending.pop(msg["id"], None)
+            if mint is None:
+                return
+            if "error" in msg:
+                self._unwatch(mint, f"Subscribe failed for {mint}: {msg['error']}")
+                return
+            self._unwatched.discard(mint)
+            self._subscriptions[msg["result"]] = mint
+            self._by_mint[mint] = msg["result"]
+            task = asyncio.ensure_future(self._seed(mint))
+            self._seeding.add(task)
+            task.add_done_callback(self._seeding.discard)
+            return
+        if msg.get("method") != "accountNotification":
+            return
+        params = msg.get("params", {})
+        mint = self._subscriptions.get(params.get("subscription"))
+        if mint is None:
+            return
+        amount = self._parse_amount(mint, params.get("result", {}).get("value"))
+        self.balances[mint] = amount
+        self._versions[mint] = self._versions.get(mint, 0) + 1
+        self.on_balance(mint, amount)
+
+    @staticmethod
+    def _parse_amount(mint, value):
+        # Closed account comes as null
+        if not value:
+            return 0
+        if mint == SOL_MINT:
+            return int(value.get("lamports", 0))
+        data = value.get("data")
+        if isinstance(data, dict):
+            info = data.get("parsed", {}).get("info", {})
+            return int(info.get("tokenAmount", {}).get("amount", 0))
+        return 0
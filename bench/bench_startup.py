@@ -0,0 +1,106 @@
+"""
+Startup-time benchmark based on `python -X importtime`.
+
+Each target is imported in a fresh interpreter several times and the median
+cumulative import time is compared with its budget. Exits with 1 when a
+budget is exceeded, so it can gate changes:
+
+    python bench/bench_startup.py
+    python bench/bench_startup.py --runs 10 --budget jup_swap=30
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Not installed everywhere; a target needing them is skipped, not failed
+OPTIONAL_DEPS = ("aiohttp", "solders", "solana", "spl", "PyQt5")
+
+# name -> (code to run, budget in ms, modules that must not be imported, optional deps it needs).
+# Budgets are mostly asyncio itself; the forbidden-module check is the part
+# that catches a heavy import sneaking back in on any machine.
+TARGETS = {
+    "jup_swap": ("import jup_swap", 120, ("aiohttp", "solders", "solana", "spl", "PyQt5"), ()),
+    "runner": ("import runner", 150, ("aiohttp", "solders", "solana", "spl", "PyQt5"), ()),
+    # Informational: what preload() costs once the window is already up
+    "wallet_stack": ("import jup_swap; jup_swap.preload()", None, (), OPTIONAL_DEPS),
+}
+
+
+class MissingDependency(RuntimeError):
+    def __init__(self, module: str):
+        super().__init__(f"{module} is not installed")
+        self.module = module
+
+
+def measure(code: str):
+    """Returns (top-level cumulative ms, imported module names) for one run."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed"
+        if error.startswith("ModuleNotFoundError: No module named "):
+            raise MissingDependency(error.split("'")[1].split(".")[0])
+        raise RuntimeError(error)
+    total_us = 0
+    modules = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Only top-level entries (no leading indentation) add up to the total
+        if not name.startswith("  "):
+            total_us += int(cumulative)
+        modules.add(name.strip())
+    return total_us / 1000, modules
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", action="append", default=[], help="override as name=ms")
+    args = parser.parse_args(argv)
+
+    budgets = {name: target[1] for name, target in TARGETS.items()}
+    for item in args.budget:
+        name, ms = item.split("=")
+        budgets[name] = float(ms)
+
+    failed = False
+    for name, (code, _, forbidden, optional) in TARGETS.items():
+        try:
+            samples = [measure(code) for _ in range(args.runs)]
+        except MissingDependency as e:
+            if e.module in optional:
+                print(f"{name:14s} skipped: {e}")
+                continue
+            print(f"{name:14s} FAIL: {e}")
+            failed = True
+            continue
+        except RuntimeError as e:
+            # A broken import must not pass the gate
+            print(f"{name:14s} FAIL: {e}")
+            failed = True
+            continue
+        median = statistics.median(ms for ms, _ in samples)
+        leaked = sorted({m.split(".")[0] for m in samples[0][1]} & set(forbidden))
+        budget = budgets[name]
+        status = "ok"
+        if leaked:
+            status = f"FAIL: imports {', '.join(leaked)}"
+            failed = True
+        elif budget is not None and median > budget:
+            status = f"FAIL: over budget {budget:.0f} ms"
+            failed = True
+        budget_text = f"{budget:.0f} ms" if budget is not None else "-"
+        print(f"{name:14s} median {median:8.1f} ms  budget {budget_text:>7s}  {status}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
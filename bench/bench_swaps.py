@@ -0,0 +1,212 @@
+"""
+Offline swap benchmark against bench/stub_servers.py.
+
+Runs 1, 10, 100 and 1000 concurrent swaps (and wallet snapshots) through
+JupSwap and reports throughput, latency percentiles and memory.
+The pipeline scenario sends the same swaps through pipeline.SwapPipeline:
+
+    python bench/bench_swaps.py
+    python bench/bench_swaps.py --scenarios swaps,pipeline --latency 0.05
+    python bench/bench_swaps.py --sizes 100,1000 --latency 0.08 --error-rate 0.02 --json bench_output.json
+
+By default the stubs run in a separate process so their CPU time does not
+count against the client; --inprocess keeps everything in one loop.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from jup_swap import JupSwap, SOL_MINT  # noqa: E402
+from pipeline import SwapPipeline  # noqa: E402
+from stats import percentile  # noqa: E402
+
+USDC_MINT = "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v"
+
+
+def start_stub_process(args):
+    cmd = [
+        sys.executable, os.path.join(ROOT, "bench", "stub_servers.py"),
+        "--latency", str(args.latency), "--rpc-latency", str(args.rpc_latency),
+        "--jitter", str(args.jitter), "--error-rate", str(args.error_rate), "--rate-429", str(args.rate_429)
+    ]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline()
+    if not line:
+        proc.kill()
+        raise RuntimeError("stub servers failed to start")
+    urls = json.loads(line)
+    return proc, urls["jupiter_url"], urls["rpc_url"]
+
+
+async def start_stubs_inprocess(args):
+    from stub_servers import Faults, start_stubs
+    jupiter_url, rpc_url, _, _, cleanup = await start_stubs(
+        Faults(args.latency, args.jitter, args.error_rate, args.rate_429),
+        Faults(args.rpc_latency, args.jitter, args.error_rate, 0)
+    )
+    return jupiter_url, rpc_url, cleanup
+
+
+def make_swap(args, jupiter_url, rpc_url):
+    from solders.keypair import Keypair
+    return JupSwap(
+        private_key_str=str(Keypair()),
+        rpc_url=rpc_url,
+        jupiter_url=jupiter_url,
+        pool_limit=args.pool_limit,
+        pool_limit_per_host=args.per_host,
+        max_retries=args.retries
+    )
+
+
+async def timed(coro):
+    started = time.perf_counter()
+    try:
+        result = await coro
+        ok = not isinstance(result, str) or result.startswith("Succes")
+    except Exception:
+        ok = False
+    return ok, time.perf_counter() - started
+
+
+async def run_pipeline(swap, size: int):
+    # Latency of a pipelined swap counts from the start of the batch
+    pipeline = SwapPipeline(swap, quote_concurrency=size, execute_concurrency=size, queue_size=size * 2, log=None)
+    started = time.perf_counter()
+    done_at = {}
+    jobs = [((SOL_MINT, USDC_MINT, 1000 + i, 300, 500000), i, 0) for i in range(size)]
+    results = await pipeline.run(jobs, on_result=lambda i, result: done_at.setdefault(i, time.perf_counter()))
+    return [
+        (not isinstance(r, Exception) and str(r).startswith("Succes"), done_at.get(i, time.perf_counter()) - started)
+        for i, r in enumerate(results)
+    ]
+
+
+async def run_round(swap, scenario: str, size: int):
+    if scenario == "pipeline":
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = await run_pipeline(swap, size)
+        return time.perf_counter() - started, results
+    if scenario == "swaps":
+        coros = [
+            swap.fetch_and_execute(inputMint=SOL_MINT, outputMint=USDC_MINT, amount=1000 + i)
+            for i in range(size)
+        ]
+    else:
+        coros = [swap.get_all_balances() for _ in range(size)]
+    started = time.perf_counter()
+    # sign_and_execute prints every /execute result, keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = await asyncio.gather(*(timed(c) for c in coros))
+    return time.perf_counter() - started, results
+
+
+async def bench(args, jupiter_url, rpc_url):
+    rows = []
+    for scenario in args.scenarios:
+        for size in args.sizes:
+            swap = make_swap(args, jupiter_url, rpc_url)
+            async with swap:
+                # Warm-up opens the connections and imports the signing stack
+                await run_round(swap, scenario, min(size, 10))
+                latencies = []
+                ok = failed = 0
+                wall = 0.0
+                tracemalloc.start()
+                for _ in range(args.rounds):
+                    elapsed, results = await run_round(swap, scenario, size)
+                    wall += elapsed
+                    for success, latency in results:
+                        latencies.append(latency)
+                        ok += success
+                        failed += not success
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+            rows.append({
+                "scenario": scenario,
+                "concurrency": size,
+                "ok": ok,
+                "failed": failed,
+                "per_sec": ok / wall if wall else 0.0,
+                "p50_ms": percentile(latencies, 0.5) * 1000,
+                "p95_ms": percentile(latencies, 0.95) * 1000,
+                "p99_ms": percentile(latencies, 0.99) * 1000,
+                "peak_mem_kb": peak / 1024,
+                "retries": swap.retry_count
+            })
+            print_row(rows[-1])
+    return rows
+
+
+def print_header():
+    print(f"{'scenario':10s} {'conc':>5s} {'ok':>6s} {'fail':>5s} {'per sec':>9s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s} {'peak KiB':>9s} {'retries':>7s}")
+
+
+def print_row(r):
+    print(
+        f"{r['scenario']:10s} {r['concurrency']:>5d} {r['ok']:>6d} {r['failed']:>5d} {r['per_sec']:>9.1f} "
+        f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['peak_mem_kb']:>9.0f} {r['retries']:>7d}"
+    )
+
+
+async def main_async(args):
+    cleanup = None
+    proc = None
+    if args.inprocess:
+        jupiter_url, rpc_url, cleanup = await start_stubs_inprocess(args)
+    else:
+        proc, jupiter_url, rpc_url = start_stub_process(args)
+    try:
+        print_header()
+        rows = await bench(args, jupiter_url, rpc_url)
+    finally:
+        if cleanup:
+            await cleanup()
+        if proc:
+            proc.terminate()
+            proc.wait()
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": rows}, f, indent=2)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1,10,100,1000", help="comma separated concurrency levels")
+    parser.add_argument("--scenarios", default="swaps,balances", help="any of swaps, pipeline, balances")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.0, help="injected Jupiter latency, seconds")
+    parser.add_argument("--rpc-latency", type=float, default=0.0, help="injected RPC latency, seconds")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of 500 answers")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="share of 429 answers from Jupiter")
+    parser.add_argument("--retries", type=int, default=3, help="JupSwap max_retries")
+    parser.add_argument("--pool-limit", type=int, default=100)
+    parser.add_argument("--per-host", type=int, default=20)
+    parser.add_argument("--inprocess", action="store_true", help="run the stubs in the benchmark's own loop")
+    parser.add_argument("--json", help="also write the results to this file")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.sizes = [int(s) for s in args.sizes.split(",") if s]
+    args.scenarios = [s for s in args.scenarios.split(",") if s]
+    return asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
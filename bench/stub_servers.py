@@ -0,0 +1,486 @@
+"""
+Local stand-ins for the Jupiter Ultra API and a Solana JSON-RPC node.
+
+The Jupiter stub serves /order with real serialized VersionedTransactions
+and accepts /execute, checking that the signed transaction deserializes.
+The RPC stub answers the balance calls JupSwap makes and getTransaction
+for swaps the Jupiter stub executed. On the same port it serves pubsub
+(accountSubscribe), with notify() pushing an accountNotification and
+drop_pubsub() cutting every connection. Both can inject latency and errors:
+
+    python bench/stub_servers.py --jup-port 8081 --rpc-port 8899 --latency 0.05 --error-rate 0.01
+
+and then JupSwap(..., jupiter_url="http://127.0.0.1:8081", rpc_url="http://127.0.0.1:8899").
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+from base64 import b64encode, b64decode
+from aiohttp import WSMsgType, web
+from solders.hash import Hash
+from solders.keypair import Keypair
+from solders.message import MessageV0
+from solders.pubkey import Pubkey
+from solders.signature import Signature
+from solders.system_program import TransferParams, transfer
+from solders.transaction import VersionedTransaction
+from spl.token.constants import TOKEN_PROGRAM_ID, TOKEN_2022_PROGRAM_ID
+
+SOL_MINT = "So11111111111111111111111111111111111111112"
+TOKEN_PROGRAM = str(TOKEN_PROGRAM_ID)
+TOKEN_2022_PROGRAM = str(TOKEN_2022_PROGRAM_ID)
+
+
+class Faults:
+    """Shared latency / error injection settings."""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, rate_429: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_429 = rate_429
+        self.requests = 0
+        self.injected = 0
+
+    async def apply(self):
+        """Sleeps the injected latency; returns an error status to answer with, or None."""
+        self.requests += 1
+        delay = self.latency + random.uniform(0, self.jitter) if self.jitter else self.latency
+        if delay:
+            await asyncio.sleep(delay)
+        roll = random.random()
+        if roll < self.rate_429:
+            self.injected += 1
+            return 429
+        if roll < self.rate_429 + self.error_rate:
+            self.injected += 1
+            return 500
+        return None
+
+
+def build_transaction(payer: Pubkey):
+    """A real v0 transfer transaction with one empty signature slot, base64."""
+    ix = transfer(TransferParams(from_pubkey=payer, to_pubkey=Keypair().pubkey(), lamports=1000))
+    msg = MessageV0.try_compile(payer, [ix], [], Hash.new_unique())
+    tx = VersionedTransaction.populate(msg, [Signature.default()])
+    return b64encode(bytes(tx)).decode("utf-8")
+
+
+class JupiterStub:
+    def __init__(self, faults: Faults = None, pool_size: int = 64):
+        self.faults = faults or Faults()
+        self.pool_size = pool_size
+        self._pools = {}
+        self._ids = itertools.count(1)
+        self.orders = {}
+        self.executed = 0
+        # signature -> (taker, inputMint, outputMint, in amount, out amount), read by RpcStub
+        self.fills = {}
+
+    def _transaction_for(self, taker: str):
+        # Building a transaction per request would make the stub the bottleneck
+        pool = self._pools.get(taker)
+        if pool is None:
+            try:
+                payer = Pubkey.from_string(taker)
+            except Exception:
+                payer = Keypair().pubkey()
+            pool = self._pools[taker] = [build_transaction(payer) for _ in range(self.pool_size)]
+        return random.choice(pool)
+
+    async def order(self, request):
+        status = await self.faults.apply()
+        if status:
+            return web.json_response({"error": "injected"}, status=status)
+        q = request.query
+        amount = int(q.get("amount", "0"))
+        if amount <= 0:
+            return web.json_response({"error": "Invalid amount", "errorMessage": "amount must be positive"})
+        request_id = f"stub-{next(self._ids)}"
+        self.orders[request_id] = (q.get("taker", ""), q.get("inputMint"), q.get("outputMint"), amount)
+        return web.json_response({
+            "requestId": request_id,
+            "transaction": self._transaction_for(q.get("taker", "")),
+            "inputMint": q.get("inputMint"),
+            "outputMint": q.get("outputMint"),
+            "inAmount": str(amount),
+            "outAmount": str(amount * 2),
+            "slippageBps": int(q.get("slippageBps", "0")),
+            "prioritizationFeeLamports": int(q.get("priorityFeeLamports", "0")),
+            "swapType": "aggregator"
+        })
+
+    async def execute(self, request):
+        status = await self.faults.apply()
+        if status:
+            return web.json_response({"error": "injected"}, status=status)
+        body = await request.json()
+        order = self.orders.pop(body.get("requestId"), None)
+        if order is None:
+            return web.json_response({"status": "Failed", "error": "Unknown or used requestId", "code": -1})
+        try:
+            tx = VersionedTransaction.from_bytes(b64decode(body["signedTransaction"]))
+        except Exception as e:
+            return web.json_response({"status": "Failed", "error": f"Bad transaction: {e}", "code": -2})
+        self.executed += 1
+        taker, inputMint, outputMint, amount = order
+        signature = str(tx.signatures[0])
+        self.fills[signature] = (taker, inputMint, outputMint, amount, amount * 2)
+        return web.json_response({
+            "status": "Success",
+            "signature": signature,
+            "slot": "1",
+            "code": 0,
+            "inputAmountResult": str(amount),
+            "outputAmountResult": str(amount * 2)
+        })
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get("/order", self.order)
+        app.router.add_post("/execute", self.execute)
+        return app
+
+
+class RpcStub:
+    """Minimal Solana JSON-RPC: answers the methods JupSwap uses."""
+
+    def __init__(
+        self,
+        faults: Faults = None,
+        lamports: int = 5_000_000_000,
+        tokens: dict = None,
+        fills: dict = None,
+        programs: dict = None
+    ):
+        self.faults = faults or Faults()
+        # JupiterStub.fills, so executed swaps have a transaction to fetch
+        self.fills = fills if fills is not None else {}
+        # signature -> first time it was asked about, drives the fake commitment
+        self.first_seen = {}
+        self.lamports = lamports
+        # mint -> raw amount held by every owner
+        self.tokens = tokens if tokens is not None else {
+            "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v": 25_000_000,
+            "JUPyiwrYJFskUPiHa7hkeR8VUtAeFoSYbKedZNsDvCN": 1_000_000_000,
+        }
+        # mint -> owning token program, the classic one unless listed
+        self.programs = programs or {}
+        self.calls = {}
+        # pubsub: subscription id -> (websocket, account)
+        self.subscriptions = {}
+        self.sockets = set()
+        self._sub_ids = itertools.count(1)
+
+    def program_of(self, mint):
+        return self.programs.get(mint, TOKEN_PROGRAM)
+
+    @staticmethod
+    def context():
+        return {"slot": 1, "apiVersion": "2.0.0"}
+
+    def get_balance(self, params):
+        return {"context": self.context(), "value": self.lamports}
+
+    def get_token_account_balance(self, params):
+        amount = next(iter(self.tokens.values()), 0)
+        return {"context": self.context(), "value": {
+            "amount": str(amount), "decimals": 6,
+            "uiAmount": amount / 10 ** 6, "uiAmountString": str(amount / 10 ** 6)
+        }}
+
+    def get_token_accounts_by_owner(self, params):
+        owner = params[0]
+        program = (params[1] if len(params) > 1 else {}).get("programId")
+        value = []
+        for mint, amount in self.tokens.items():
+            if program and program != self.program_of(mint):
+                continue
+            value.append({
+                "pubkey": str(Keypair().pubkey()),
+                "account": {
+                    "data": {
+                        "program": "spl-token" if self.program_of(mint) == TOKEN_PROGRAM else "spl-token-2022",
+                        "parsed": {
+                            "info": {
+                                "isNative": False,
+                                "mint": mint,
+                                "owner": owner,
+                                "state": "initialized",
+                                "tokenAmount": {
+                                    "amount": str(amount), "decimals": 6,
+                                    "uiAmount": amount / 10 ** 6, "uiAmountString": str(amount / 10 ** 6)
+                                }
+                            },
+                            "type": "account"
+                        },
+                        "space": 165
+                    },
+                    "executable": False,
+                    "lamports": 2039280,
+                    "owner": self.program_of(mint),
+                    "rentEpoch": 18446744073709551615,
+                    "space": 165
+                }
+            })
+        return {"context": self.context(), "value": value}
+
+    @staticmethod
+    def token_balance(index, owner, mint, amount):
+        return {
+            "accountIndex": index, "mint": mint, "owner": owner, "programId": TOKEN_PROGRAM,
+            "uiTokenAmount": {
+                "amount": str(amount), "decimals": 6,
+                "uiAmount": amount / 10 ** 6, "uiAmountString": str(amount / 10 ** 6)
+            }
+        }
+
+    def get_transaction(self, params):
+        fill = self.fills.get(params[0])
+        if fill is None:
+            return None
+        taker, inputMint, outputMint, in_amount, out_amount = fill
+        pool = str(Keypair().pubkey())
+        fee = 5000
+        keys = [taker, str(Keypair().pubkey()), str(Keypair().pubkey()), str(Keypair().pubkey()), str(Keypair().pubkey())]
+        pre_lamports = post_lamports = self.lamports
+        pre_tokens, post_tokens = [], []
+        # Index 1/2: the taker's input/output token accounts, 3/4: the pool's
+        # accounts of the same mints, which a reconciler must not count
+        for mint, index, pool_index, delta in ((inputMint, 1, 3, -in_amount), (outputMint, 2, 4, out_amount)):
+            if mint == SOL_MINT:
+                post_lamports += delta
+                continue
+            start = self.tokens.get(mint, 10 ** 9)
+            pre_tokens.append(self.token_balance(index, taker, mint, start))
+            post_tokens.append(self.token_balance(index, taker, mint, start + delta))
+            pre_tokens.append(self.token_balance(pool_index, pool, mint, 10 ** 12))
+            post_tokens.append(self.token_balance(pool_index, pool, mint, 10 ** 12 - delta))
+        post_lamports -= fee
+        return {
+            "slot": 1,
+            "blockTime": int(time.time()),
+            "version": 0,
+            "transaction": {
+                "signatures": [params[0]],
+                "message": {
+                    "header": {"numRequiredSignatures": 1, "numReadonlySignedAccounts": 0, "numReadonlyUnsignedAccounts": 0},
+                    "accountKeys": keys,
+                    "recentBlockhash": str(Hash.new_unique()),
+                    "instructions": [],
+                    "addressTableLookups": []
+                }
+            },
+            "meta": {
+                "err": None,
+                "status": {"Ok": None},
+                "fee": fee,
+                "preBalances": [pre_lamports, 2039280, 2039280, 2039280, 2039280],
+                "postBalances": [post_lamports, 2039280, 2039280, 2039280, 2039280],
+                "innerInstructions": [],
+                "logMessages": [],
+                "preTokenBalances": pre_tokens,
+                "postTokenBalances": post_tokens,
+                "rewards": [],
+                "loadedAddresses": {"writable": [], "readonly": []},
+                "computeUnitsConsumed": 150000
+            }
+        }
+
+    def get_signature_statuses(self, params):
+        now = time.monotonic()
+        value = []
+        for signature in params[0]:
+            if signature not in self.fills:
+                value.append(None)
+                continue
+            age = now - self.first_seen.setdefault(signature, now)
+            level = "finalized" if age > 1.2 else "confirmed" if age > 0.4 else "processed"
+            value.append({
+                "slot": 1, "confirmations": None if level == "finalized" else 0,
+                "err": None, "status": {"Ok": None}, "confirmationStatus": level
+            })
+        return {"context": self.context(), "value": value}
+
+    def get_recent_prioritization_fees(self, params):
+        # 150 slots of per-CU prices in micro-lamports, mostly quiet with spikes
+        return [
+            {"slot": slot, "prioritizationFee": random.choice((0, 0, 1000, 5000, 20000, 100000))}
+            for slot in range(1, 151)
+        ]
+
+    def get_multiple_accounts(self, params):
+        value = []
+        for address in params[0]:
+            # Every address is treated as a 6-decimal SPL mint (9 for wSOL)
+            value.append({
+                "data": {
+                    "program": "spl-token",
+                    "parsed": {
+                        "info": {
+                            "decimals": 9 if address == SOL_MINT else 6,
+                            "freezeAuthority": None,
+                            "isInitialized": True,
+                            "mintAuthority": None,
+                            "supply": "1000000000000000"
+                        },
+                        "type": "mint"
+                    },
+                    "space": 82
+                },
+                "executable": False,
+                "lamports": 1461600,
+                "owner": self.program_of(address),
+                "rentEpoch": 18446744073709551615,
+                "space": 82
+            })
+        return {"context": self.context(), "value": value}
+
+    def methods(self):
+        return {
+            "getBalance": self.get_balance,
+            "getTokenAccountBalance": self.get_token_account_balance,
+            "getTokenAccountsByOwner": self.get_token_accounts_by_owner,
+            "getTransaction": self.get_transaction,
+            "getSignatureStatuses": self.get_signature_statuses,
+            "getRecentPrioritizationFees": self.get_recent_prioritization_fees,
+            "getMultipleAccounts": self.get_multiple_accounts,
+        }
+
+    async def handle(self, request):
+        status = await self.faults.apply()
+        if status:
+            return web.Response(status=status, text="injected")
+        body = await request.json()
+        batch = isinstance(body, list)
+        responses = [self._dispatch(call) for call in (body if batch else [body])]
+        return web.json_response(responses if batch else responses[0])
+
+    def _dispatch(self, call):
+        method = call.get("method")
+        self.calls[method] = self.calls.get(method, 0) + 1
+        handler = self.methods().get(method)
+        if handler is None:
+            return {"jsonrpc": "2.0", "id": call.get("id"), "error": {"code": -32601, "message": f"Method not found: {method}"}}
+        return {"jsonrpc": "2.0", "id": call.get("id"), "result": handler(call.get("params") or [])}
+
+    async def pubsub(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.sockets.add(ws)
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                call = json.loads(msg.data)
+                method = call.get("method")
+                self.calls[method] = self.calls.get(method, 0) + 1
+                params = call.get("params") or []
+                if method == "accountSubscribe":
+                    sub_id = next(self._sub_ids)
+                    self.subscriptions[sub_id] = (ws, params[0])
+                    result = sub_id
+                elif method == "accountUnsubscribe":
+                    result = self.subscriptions.pop(params[0], None) is not None
+                else:
+                    await ws.send_json({"jsonrpc": "2.0", "id": call.get("id"), "error": {
+                        "code": -32601, "message": f"Method not found: {method}"
+                    }})
+                    continue
+                await ws.send_json({"jsonrpc": "2.0", "id": call.get("id"), "result": result})
+        finally:
+            self.sockets.discard(ws)
+            for sub_id in [s for s, (sock, _) in self.subscriptions.items() if sock is ws]:
+                del self.subscriptions[sub_id]
+        return ws
+
+    async def notify(self, account: str, value):
+        """Push accountNotification with `value` (the account, or None if closed) to its subscribers."""
+        for sub_id, (ws, subscribed) in list(self.subscriptions.items()):
+            if subscribed == account and not ws.closed:
+                await ws.send_json({"jsonrpc": "2.0", "method": "accountNotification", "params": {
+                    "subscription": sub_id,
+                    "result": {"context": self.context(), "value": value}
+                }})
+
+    async def drop_pubsub(self):
+        """Close every pubsub connection, like a node restart."""
+        for ws in list(self.sockets):
+            await ws.close()
+
+    @staticmethod
+    def lamports_account(lamports: int):
+        return {"lamports": lamports, "owner": "11111111111111111111111111111111", "data": ["", "base64"],
+                "executable": False, "rentEpoch": 0, "space": 0}
+
+    def token_account(self, mint: str, owner: str, amount: int):
+        return {"lamports": 2039280, "owner": self.program_of(mint), "executable": False, "rentEpoch": 0, "space": 165,
+                "data": {"program": "spl-token", "space": 165, "parsed": {"type": "account", "info": {
+                    "mint": mint, "owner": owner, "state": "initialized", "isNative": False,
+                    "tokenAmount": {"amount": str(amount), "decimals": 6,
+                                    "uiAmount": amount / 10 ** 6, "uiAmountString": str(amount / 10 ** 6)}
+                }}}}
+
+    def app(self):
+        app = web.Application()
+        app.router.add_post("/", self.handle)
+        # ws:// on the same url, like a real node
+        app.router.add_get("/", self.pubsub)
+        return app
+
+
+async def start_app(app, host: str = "127.0.0.1", port: int = 0):
+    """Start an aiohttp app, returns (base url, runner). Port 0 picks a free one."""
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    port = runner.addresses[0][1]
+    return f"http://{host}:{port}", runner
+
+
+async def start_stubs(jup_faults: Faults = None, rpc_faults: Faults = None, jup_port: int = 0, rpc_port: int = 0):
+    """Start both stubs in the running loop. Returns (jupiter_url, rpc_url, jupiter, rpc, cleanup)."""
+    jupiter = JupiterStub(jup_faults)
+    rpc = RpcStub(rpc_faults, fills=jupiter.fills)
+    jupiter_url, jup_runner = await start_app(jupiter.app(), port=jup_port)
+    rpc_url, rpc_runner = await start_app(rpc.app(), port=rpc_port)
+
+    async def cleanup():
+        await jup_runner.cleanup()
+        await rpc_runner.cleanup()
+
+    return jupiter_url, rpc_url, jupiter, rpc, cleanup
+
+
+async def serve_forever(args):
+    jup_faults = Faults(args.latency, args.jitter, args.error_rate, args.rate_429)
+    rpc_faults = Faults(args.rpc_latency, args.jitter, args.error_rate, 0)
+    jupiter_url, rpc_url, _, _, cleanup = await start_stubs(jup_faults, rpc_faults, args.jup_port, args.rpc_port)
+    # One parseable line so a parent process knows where to connect
+    print(json.dumps({"jupiter_url": jupiter_url, "rpc_url": rpc_url}), flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await cleanup()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Jupiter Ultra + Solana RPC stub servers")
+    parser.add_argument("--jup-port", type=int, default=0)
+    parser.add_argument("--rpc-port", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every Jupiter request")
+    parser.add_argument("--rpc-latency", type=float, default=0.0, help="seconds added to every RPC request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 500")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="share of Jupiter requests answered with 429")
+    return parser
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(serve_forever(build_parser().parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,175 @@
+"""
+Confirmation tracking for executed swaps.
+
+    tracker = ConfirmationTracker(swap, on_status=lambda sig, status, pair_id: ...)
+    swap.tracker = tracker           # fetch_and_execute hands it every signature
+    asyncio.ensure_future(tracker.run())
+
+All outstanding signatures are polled together with getSignatureStatuses,
+up to 256 per call, from one loop. Thousands of in-flight swaps therefore
+cost a few RPC calls per poll instead of one per swap. Every transition
+(processed -> confirmed -> finalized, or failed / expired) is reported once.
+"""
+import asyncio
+import json
+import time
+
+# getSignatureStatuses accepts at most this many signatures per call
+MAX_BATCH = 256
+
+LEVELS = {"processed": 1, "confirmed": 2, "finalized": 3}
+# Statuses after which a signature is no longer polled
+FINAL = ("finalized", "failed", "expired")
+
+
+def statuses_json(resp):
+    """getSignatureStatuses response -> list of status dicts / None, in request order."""
+    if hasattr(resp, "to_json"):
+        resp = json.loads(resp.to_json())
+    if isinstance(resp, dict) and "result" in resp:
+        resp = resp["result"]
+    return resp.get("value") or []
+
+
+class Pending:
+    __slots__ = ("signature", "pair_id", "status", "sent_at")
+
+    def __init__(self, signature, pair_id):
+        self.signature = signature
+        self.pair_id = pair_id
+        self.status = "sent"
+        self.sent_at = time.monotonic()
+
+
+class ConfirmationTracker:
+    """
+    Polls every tracked signature until it is finalized, failed, or not seen
+    for `expire_after` seconds (its blockhash is gone by then). Calls
+    on_status(signature, status, pair_id) on every change and, with a
+    journal, stores the latest status in the swaps table.
+    """
+
+    def __init__(
+        self,
+        swap,
+        on_status=None,
+        journal=None,
+        interval: float = 1.0,
+        batch_size: int = MAX_BATCH,
+        expire_after: float = 90,
+        log=print
+    ):
+        self.swap = swap
+        self.on_status = on_status
+        self.journal = journal
+        self.interval = interval
+        self.batch_size = min(batch_size, MAX_BATCH)
+        self.expire_after = expire_after
+        self.log = log
+        self.pending = {}
+        self.rpc_calls = 0
+        self._wake = None
+        self._stopped = False
+
+    def track(self, signature: str, pair_id: int = None):
+        """Start following a signature; cheap, call it right after /execute."""
+        if not signature or signature in self.pending:
+            return
+        self.pending[signature] = Pending(signature, pair_id)
+        if self._wake is not None:
+            self._wake.set()
+
+    @property
+    def outstanding(self):
+        return len(self.pending)
+
+    async def _fetch(self, signatures):
+        from solders.signature import Signature
+        sigs = [Signature.from_string(s) for s in signatures]
+        self.rpc_calls += 1
+        with self.swap.metrics.span("rpc_signature_statuses"):
+            resp = await self.swap._rpc_call(lambda client: client.get_signature_statuses(sigs))
+        return statuses_json(resp)
+
+    async def poll(self):
+        """One round over every pending signature. Returns the transitions seen."""
+        signatures = list(self.pending)
+        if not signatures:
+            return []
+        batches = [signatures[i:i + self.batch_size] for i in range(0, len(signatures), self.batch_size)]
+        results = await asyncio.gather(*(self._fetch(batch) for batch in batches), return_exceptions=True)
+        now = time.monotonic()
+        changes = []
+        for batch, statuses in zip(batches, results):
+            if isinstance(statuses, Exception):
+                self.log(f"getSignatureStatuses failed: {str(statuses)}")
+                continue
+            for signature, status in zip(batch, statuses):
+                entry = self.pending.get(signature)
+                if entry is None:
+                    continue
+                new = entry.status
+                if status is None:
+                    if now - entry.sent_at > self.expire_after:
+                        new = "expired"
+                elif status.get("err") is not None:
+                    new = "failed"
+                else:
+                    level = status.get("confirmationStatus") or "processed"
+                    if LEVELS.get(level, 0) > LEVELS.get(entry.status, 0):
+                        new = level
+                if new != entry.status:
+                    entry.status = new
+                    changes.append((signature, new, entry.pair_id))
+                if new in FINAL:
+                    del self.pending[signature]
+        if changes:
+            self._report(changes)
+        return changes
+
+    def _report(self, changes):
+        if self.on_status is not None:
+            for signature, status, pair_id in changes:
+                try:
+                    self.on_status(signature, status, pair_id)
+                except Exception as e:
+                    self.log(f"Confirmation callback error: {str(e)}")
+        if self.journal is not None:
+            now = time.time()
+            updates = [(status, now, signature) for signature, status, _ in changes]
+            # Off the loop: record_confirmations waits for queued journal rows first
+            future = asyncio.get_running_loop().run_in_executor(None, self.journal.record_confirmations, updates)
+            future.add_done_callback(self._recorded)
+
+    def _recorded(self, future):
+        if not future.cancelled() and future.exception() is not None:
+            self.log(f"Confirmation journal write failed: {str(future.exception())}")
+
+    async def run(self):
+        """Poll until stop(); sleeps on an event while nothing is outstanding."""
+        self._wake = asyncio.Event()
+        self._stopped = False
+        while not self._stopped:
+            if not self.pending:
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+            try:
+                await self.poll()
+            except Exception as e:
+                self.log(f"Confirmation poll error: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    async def wait_settled(self, timeout: float = None):
+        """Wait until every tracked signature reached a final status (or timeout)."""
+        deadline = time.monotonic() + timeout if timeout else None
+        while self.pending:
+            if deadline and time.monotonic() > deadline:
+                return False
+            await asyncio.sleep(self.interval / 2)
+        return True
+
+    def stop(self):
+        self._stopped = True
+        if self._wake is not None:
+            self._wake.set()
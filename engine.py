@@ -0,0 +1,59 @@
+import asyncio
+import threading
+
+
+class AsyncEngine:
+    """
+    One asyncio event loop running in a background thread for the whole
+    life of the app. Coroutines are handed over with submit(), which is
+    safe to call from any thread and returns a concurrent.futures.Future.
+    """
+
+    def __init__(self, name: str = "asyncio-engine"):
+        self.name = name
+        self.loop = None
+        self._thread = None
+        self._started = threading.Event()
+
+    def start(self):
+        if self._thread is not None:
+            return self
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        self._started.wait()
+        return self
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._started.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            # Cancel whatever is still pending so nothing is left half-done
+            pending = asyncio.all_tasks(self.loop)
+            for task in pending:
+                task.cancel()
+            if pending:
+                self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+            self.loop.close()
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def submit(self, coro):
+        if not self.is_running():
+            coro.close()
+            raise RuntimeError("Engine is not running")
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def call_soon(self, callback, *args):
+        self.loop.call_soon_threadsafe(callback, *args)
+
+    def stop(self, timeout: float = 5):
+        if not self.is_running():
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+        self._thread = None
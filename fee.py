@@ -0,0 +1,121 @@
+"""
+Priority fee estimation from getRecentPrioritizationFees.
+
+    estimator = PriorityFeeEstimator(swap, percentile=0.75)
+    estimator.set_accounts(mints)     # the accounts our swaps lock
+    swap.fee_estimator = estimator    # fetch_and_execute now sizes fees itself
+
+The node reports the fee per slot for the last ~150 slots, in micro-lamports
+per compute unit. One sample is cached for `ttl` seconds and concurrent
+callers wait on the same request, so a batch of swaps shares one lookup.
+"""
+import asyncio
+import json
+import time
+from stats import percentile
+
+# getRecentPrioritizationFees takes at most this many addresses
+MAX_ACCOUNTS = 128
+
+
+def fees_json(resp):
+    """getRecentPrioritizationFees response -> list of prioritizationFee values."""
+    if hasattr(resp, "to_json"):
+        resp = json.loads(resp.to_json())
+    if isinstance(resp, dict) and "result" in resp:
+        resp = resp["result"]
+    return [int(item.get("prioritizationFee", 0)) for item in resp or []]
+
+
+async def get_recent_prioritization_fees(client, accounts=()):
+    """
+    getRecentPrioritizationFees over the AsyncClient's own HTTP session.
+    Neither solana-py nor solders wrap this method, so it is a raw JSON-RPC call.
+    """
+    from solana.rpc.core import RPCException
+    provider = client._provider
+    body = {
+        "jsonrpc": "2.0",
+        "id": 1,
+        "method": "getRecentPrioritizationFees",
+        "params": [list(accounts)] if accounts else []
+    }
+    response = await provider.session.post(provider.endpoint_uri, json=body, headers=provider.extra_headers)
+    response.raise_for_status()
+    resp = response.json()
+    if resp.get("error"):
+        # The node answered, the request itself is bad
+        raise RPCException(resp["error"])
+    return resp
+
+
+class PriorityFeeEstimator:
+    """
+    fee = percentile of recent per-CU prices * compute_units, in lamports,
+    never below `min_fee` and never above the cap passed to estimate()
+    (the pair's configured priorityFeeLamports) or `max_fee`.
+    """
+
+    def __init__(
+        self,
+        swap,
+        percentile: float = 0.75,
+        ttl: float = 10,
+        compute_units: int = 300_000,
+        min_fee: int = 1000,
+        max_fee: int = 5_000_000
+    ):
+        self.swap = swap
+        self.percentile = percentile
+        self.ttl = ttl
+        self.compute_units = compute_units
+        self.min_fee = min_fee
+        self.max_fee = max_fee
+        self.accounts = ()
+        self.lookups = 0
+        self._sample = None
+        self._sampled_at = 0
+        self._sample_key = None
+        self._inflight = None
+
+    def set_accounts(self, accounts):
+        """Accounts to sample for, e.g. every mint in the pair list. Replaced as a whole."""
+        accounts = tuple(sorted({a for a in accounts if a}))
+        # The RPC limit; the global fee market is the fallback
+        self.accounts = accounts if len(accounts) <= MAX_ACCOUNTS else ()
+
+    async def _lookup(self, accounts):
+        self.lookups += 1
+        with self.swap.metrics.span("rpc_prioritization_fees"):
+            resp = await self.swap._rpc_call(lambda client: get_recent_prioritization_fees(client, accounts))
+        return fees_json(resp)
+
+    async def _refresh(self, key):
+        fees = await self._lookup(key)
+        self._sample, self._sample_key, self._sampled_at = fees, key, time.monotonic()
+        return fees
+
+    async def sample(self):
+        """Recent per-CU fees for the current accounts, cached for ttl seconds."""
+        key = self.accounts
+        if self._sample is not None and key == self._sample_key and time.monotonic() - self._sampled_at < self.ttl:
+            return self._sample
+        # Single flight: everyone who misses the cache waits on the same request
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.ensure_future(self._refresh(key))
+        return await asyncio.shield(self._inflight)
+
+    def fee_from(self, fees, cap: int = None):
+        price = percentile(fees, self.percentile) or 0
+        fee = max(self.min_fee, price * self.compute_units // 1_000_000)
+        return int(min(fee, self.max_fee, cap if cap is not None else self.max_fee))
+
+    async def estimate(self, cap: int = None):
+        """Priority fee in lamports for the next swap; cap is the pair's maximum."""
+        try:
+            fees = await self.sample()
+        except Exception as e:
+            # No estimate: fall back to the configured value like before
+            print(f"Priority fee lookup failed: {str(e)}")
+            return int(cap if cap is not None else self.max_fee)
+        return self.fee_from(fees, cap)
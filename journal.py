@@ -0,0 +1,238 @@
+import queue
+import sqlite3
+import threading
+from stats import percentile
+from storage import DB_PATH, connect
+
+JOURNAL_COLUMNS = (
+    "pair_id", "request_id", "signature", "status", "error",
+    "input_mint", "output_mint", "in_amount", "out_amount",
+    "started_at", "quote_at", "signed_at", "execute_sent_at", "execute_returned_at",
+    "wallet"
+)
+
+# Filled in later by reconcile.Reconciler from the landed transaction
+FILL_COLUMNS = (
+    ("spent_amount", "INTEGER"),
+    ("received_amount", "INTEGER"),
+    ("fee_lamports", "INTEGER"),
+    ("slot", "INTEGER"),
+    ("block_time", "INTEGER"),
+    ("tx_error", "TEXT"),
+    ("reconciled_at", "REAL"),
+)
+
+# Address of the wallet that signed, several with wallets.WalletPool
+WALLET_COLUMNS = (
+    ("wallet", "TEXT"),
+)
+
+# Latest status from confirm.ConfirmationTracker
+CONFIRM_COLUMNS = (
+    ("confirmation", "TEXT"),
+    ("confirmation_at", "REAL"),
+)
+
+
+def init_journal(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS swaps (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            pair_id INTEGER,
+            request_id TEXT,
+            signature TEXT,
+            status TEXT,
+            error TEXT,
+            input_mint TEXT,
+            output_mint TEXT,
+            in_amount INTEGER,
+            out_amount INTEGER,
+            started_at REAL,
+            quote_at REAL,
+            signed_at REAL,
+            execute_sent_at REAL,
+            execute_returned_at REAL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS swaps_pair_time ON swaps (pair_id, started_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS swaps_signature ON swaps (signature)")
+    conn.execute("CREATE INDEX IF NOT EXISTS swaps_request_id ON swaps (request_id)")
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(swaps)")]
+    for name, kind in FILL_COLUMNS + CONFIRM_COLUMNS + WALLET_COLUMNS:
+        if name not in columns:
+            conn.execute(f"ALTER TABLE swaps ADD COLUMN {name} {kind}")
+    # Keeps the reconciler's "what is left" query cheap on a long journal
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS swaps_unreconciled ON swaps (id) "
+        "WHERE reconciled_at IS NULL AND signature IS NOT NULL"
+    )
+    conn.commit()
+
+
+class SwapJournal:
+    """
+    Append-only record of every swap in the `swaps` table of pairs.db.
+    record() only puts the row on a queue; a background thread writes
+    queued rows in batches, so journaling stays off the trade path.
+    Timestamps are unix seconds (time.time()).
+    """
+
+    def __init__(self, db_path: str = DB_PATH, batch_size: int = 200, flush_interval: float = 0.5):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        conn = connect(db_path)
+        init_journal(conn)
+        conn.close()
+        self._thread = threading.Thread(target=self._writer, name="swap-journal", daemon=True)
+        self._thread.start()
+
+    def record(self, **row):
+        """Queue one swap; unknown keys are ignored, missing ones stored as NULL."""
+        self._queue.put(tuple(row.get(column) for column in JOURNAL_COLUMNS))
+
+    def flush(self):
+        """Block until everything recorded so far is in the database."""
+        self._queue.join()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _writer(self):
+        conn = connect(self.db_path)
+        placeholders = ", ".join("?" for _ in JOURNAL_COLUMNS)
+        sql = f"INSERT INTO swaps ({', '.join(JOURNAL_COLUMNS)}) VALUES ({placeholders})"
+        stopping = False
+        while not stopping:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = [first]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            rows = [row for row in batch if row is not None]
+            stopping = len(rows) != len(batch)
+            try:
+                if rows:
+                    with conn:
+                        conn.executemany(sql, rows)
+            except sqlite3.Error as e:
+                print(f"Journal write failed: {str(e)}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+        conn.close()
+
+    def latency_stats(self, pair_id: int = None, since: float = None):
+        """
+        p50/p99 of quote latency (started -> quote received) and execute
+        latency (execute sent -> returned), in seconds, grouped by pair.
+        """
+        self.flush()
+        sql = "SELECT pair_id, quote_at - started_at, execute_returned_at - execute_sent_at FROM swaps WHERE 1=1"
+        args = []
+        if pair_id is not None:
+            sql += " AND pair_id=?"
+            args.append(pair_id)
+        if since is not None:
+            sql += " AND started_at>=?"
+            args.append(since)
+        grouped = {}
+        conn = connect(self.db_path)
+        try:
+            for pid, quote, execute in conn.execute(sql, args):
+                quotes, executes = grouped.setdefault(pid, ([], []))
+                if quote is not None:
+                    quotes.append(quote)
+                if execute is not None:
+                    executes.append(execute)
+        finally:
+            conn.close()
+        return {
+            pid: {
+                "count": max(len(quotes), len(executes)),
+                "quote_p50": percentile(quotes, 0.5),
+                "quote_p99": percentile(quotes, 0.99),
+                "execute_p50": percentile(executes, 0.5),
+                "execute_p99": percentile(executes, 0.99)
+            }
+            for pid, (quotes, executes) in grouped.items()
+        }
+
+    def unreconciled(self, limit: int = 1000, after_id: int = 0):
+        """Executed swaps whose fill is not known yet: (id, signature, input_mint, output_mint, execute_returned_at, wallet)."""
+        self.flush()
+        conn = connect(self.db_path)
+        try:
+            return list(conn.execute(
+                "SELECT id, signature, input_mint, output_mint, execute_returned_at, wallet FROM swaps "
+                "WHERE reconciled_at IS NULL AND signature IS NOT NULL AND id>? ORDER BY id LIMIT ?",
+                (after_id, limit)
+            ))
+        finally:
+            conn.close()
+
+    def record_fills(self, fills):
+        """fills: dicts with swap_id and the FILL_COLUMNS values, written in one transaction."""
+        if not fills:
+            return
+        names = [name for name, _ in FILL_COLUMNS]
+        sql = f"UPDATE swaps SET {', '.join(f'{name}=?' for name in names)} WHERE id=?"
+        conn = connect(self.db_path)
+        try:
+            with conn:
+                conn.executemany(sql, [tuple(fill.get(name) for name in names) + (fill["swap_id"],) for fill in fills])
+        finally:
+            conn.close()
+
+    def record_confirmations(self, updates):
+        """updates: (status, unix time, signature) tuples, written in one transaction."""
+        if not updates:
+            return
+        # The swap row itself may still be waiting in the queue
+        self.flush()
+        conn = connect(self.db_path)
+        try:
+            with conn:
+                conn.executemany("UPDATE swaps SET confirmation=?, confirmation_at=? WHERE signature=?", updates)
+        except sqlite3.Error as e:
+            print(f"Journal write failed: {str(e)}")
+        finally:
+            conn.close()
+
+    def pnl(self, pair_id: int = None, since: float = None):
+        """
+        Realized flows per (pair, input mint, output mint) from reconciled
+        swaps: total spent, total received and fees, in raw units.
+        """
+        self.flush()
+        sql = (
+            "SELECT pair_id, input_mint, output_mint, COUNT(*), SUM(spent_amount), SUM(received_amount), "
+            "SUM(fee_lamports), SUM(tx_error IS NOT NULL) FROM swaps WHERE reconciled_at IS NOT NULL"
+        )
+        args = []
+        if pair_id is not None:
+            sql += " AND pair_id=?"
+            args.append(pair_id)
+        if since is not None:
+            sql += " AND started_at>=?"
+            args.append(since)
+        sql += " GROUP BY pair_id, input_mint, output_mint"
+        conn = connect(self.db_path)
+        try:
+            return [
+                {
+                    "pair_id": pid, "input_mint": input_mint, "output_mint": output_mint,
+                    "count": count, "spent": spent or 0, "received": received or 0,
+                    "fees": fees or 0, "failed": failed or 0
+                }
+                for pid, input_mint, output_mint, count, spent, received, fees, failed in conn.execute(sql, args)
+            ]
+        finally:
+            conn.close()
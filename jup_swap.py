@@ -1,19 +1,76 @@
-import aiohttp
-from solders import message
-from solders.pubkey import Pubkey
-from solders.keypair import Keypair
-from solders.transaction import VersionedTransaction
+import asyncio
+import time
 from base64 import b64encode, b64decode
-from solana.rpc.async_api import AsyncClient
-from spl.token.instructions import get_associated_token_address
-from spl.token.constants import TOKEN_PROGRAM_ID
-from solders.signature import Signature
+from order_cache import OrderCache, order_key
+from ratelimit import backoff_delay
+from metrics import NULL_METRICS
+from mints import MintRegistry
+from singleflight import SingleFlight
+
+# aiohttp, solders, solana and spl are imported where they are first used,
+# importing them up front dominates the startup time (bench/bench_startup.py)
+
+SOL_MINT = "So11111111111111111111111111111111111111112"
+JUPITER_URL = "https://ultra-api.jup.ag"
+
+def preload():
+    """Import the whole wallet/RPC stack now, e.g. from a background thread."""
+    import aiohttp
+    import solders.transaction
+    import solders.keypair
+    import solana.rpc.types
+    import spl.token.instructions
+    import rpc_pool
+
+class JupiterHTTPError(Exception):
+    def __init__(self, status: int, body: str = ""):
+        super().__init__(f"Jupiter HTTP {status}: {body[:200]}")
+        self.status = status
+        self.body = body
+
+class SwapTimeout(Exception):
+    """A swap phase ("order" or "execute") ran past its timeout or the swap's deadline."""
+    def __init__(self, phase: str, timeout: float):
+        super().__init__(f"{phase} timed out after {max(timeout, 0):.1f}s")
+        self.phase = phase
+        self.timeout = timeout
+
+def is_retryable_status(status: int):
+    return status == 429 or status >= 500
+
+def is_executable(order: dict):
+    """An /order answer we can sign: no route or no balance comes back without these."""
+    return bool(order.get("transaction") and order.get("requestId"))
+
+def to_int(value, default=None):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
 
 class JupSwap:
     def __init__(
         self,
         private_key_str: str = None,
-        rpc_url: str = None
+        rpc_url=None,
+        pool_limit: int = 100,
+        pool_limit_per_host: int = 20,
+        dns_cache_ttl: int = 300,
+        keepalive_timeout: float = 60,
+        order_ttl: float = 20,
+        rate_limiter=None,
+        max_retries: int = 3,
+        hedge_reads: bool = False,
+        journal=None,
+        metrics=None,
+        jupiter_url: str = JUPITER_URL,
+        tracker=None,
+        fee_estimator=None,
+        mint_registry=None,
+        balance_ttl: float = 2,
+        order_timeout: float = 10,
+        execute_timeout: float = 30,
+        swap_timeout: float = 45
     ):
         if private_key_str is None:
             return "Private key is required"
@@ -22,19 +79,167 @@ class JupSwap:
        
         # if rpc_url is None:
         #     rpc_url = "https://api.mainnet-beta.solana.com/"
+        from solders.keypair import Keypair
         self.private_key = Keypair.from_base58_string(private_key_str)
-        self.rpc_url = rpc_url
+        # The wallet's address, Jupiter builds every order for it (taker)
+        self.pubkey = self.private_key.pubkey()
+        self.wallet = str(self.pubkey)
+        # One url or a list of them, reads are spread by rpc_pool.RpcPool
+        self.rpc_urls = [rpc_url] if isinstance(rpc_url, str) else list(rpc_url)
+        self.rpc_url = self.rpc_urls[0]
+        self.hedge_reads = hedge_reads
+        # Jupiter Ultra API base, point it at bench/stub_servers.py for offline runs
+        self.jupiter_url = jupiter_url.rstrip("/")
+        # Connection pool settings, the session itself is created lazily
+        # because aiohttp needs a running event loop
+        self.pool_limit = pool_limit
+        self.pool_limit_per_host = pool_limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self._session = None
+        self._rpc = None
+        self._loop = None
+        # Prefetched /order responses, see keep_orders_warm
+        self.orders = OrderCache(ttl=order_ttl)
+        self.max_order_age = order_ttl
+        self.prefetch_pairs = []
+        # Shared limiter for /order and /execute (ratelimit.TokenBucket)
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.retry_count = 0
+        # Per-phase limits (retries included) and the default deadline of a whole swap
+        self.order_timeout = order_timeout
+        self.execute_timeout = execute_timeout
+        self.swap_timeout = swap_timeout
+        # Optional journal.SwapJournal, every executed order is recorded there
+        self.journal = journal
+        # metrics.Metrics for per-phase spans and counters, off by default
+        self.metrics = metrics or NULL_METRICS
+        # Optional confirm.ConfirmationTracker, gets every executed signature
+        self.tracker = tracker
+        # Optional fee.PriorityFeeEstimator: the pair's fee becomes a cap
+        self.fee_estimator = fee_estimator
+        # Parsed mints, ATAs and decimals; in memory only unless one with a db is passed
+        self.mint_registry = mint_registry if mint_registry is not None else MintRegistry()
+        self.mint_registry.owner = self.pubkey
+        # Identical balance reads in flight share one RPC call, and the answer
+        # is reused for balance_ttl seconds unless one of our swaps lands first
+        self.reads = SingleFlight(ttl=balance_ttl, metrics=self.metrics, name="read_coalesce")
+        # Optional balance_stream.BalanceSubscriber: balances it knows are current
+        # size percent sells without an RPC read, see balance_of
+        self.balance_cache = None
+        # Prefetch /order calls in flight, a swap for the same key joins one
+        # instead of quoting again. Orders are single use, so never cached here.
+        self.quotes = SingleFlight(metrics=self.metrics, name="quote_coalesce")
 
-    async def fetch_and_execute(
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def _check_loop(self):
+        # Session and RPC client are bound to the loop they were created on.
+        # If we are called from another loop, the old ones can't be reused.
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._session = None
+            self._rpc = None
+            self._loop = loop
+            self.reads.clear()
+            self.quotes.clear()
+
+    def _get_session(self):
+        self._check_loop()
+        if self._session is None or self._session.closed:
+            import aiohttp
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_limit,
+                limit_per_host=self.pool_limit_per_host,
+                ttl_dns_cache=self.dns_cache_ttl,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers={"User-Agent": "Mozilla/5.0"}
+            )
+        return self._session
+
+    def _get_rpc(self):
+        self._check_loop()
+        if self._rpc is None:
+            from rpc_pool import RpcPool
+            self._rpc = RpcPool(self.rpc_urls, hedge=self.hedge_reads)
+        return self._rpc
+
+    async def _rpc_call(self, fn):
+        # fn(client) -> coroutine, run on the best endpoint of the pool
+        return await self._get_rpc().call(fn)
+
+    async def _with_timeout(self, phase: str, coro, timeout: float, deadline: float = None):
+        """Await coro for at most `timeout` seconds, less if the deadline (monotonic) comes first."""
+        if deadline is not None:
+            timeout = min(timeout, deadline - time.monotonic())
+        if timeout <= 0:
+            if asyncio.iscoroutine(coro):
+                coro.close()
+            else:
+                coro.cancel()
+            self.metrics.inc("swap_timeouts_total", phase=phase)
+            raise SwapTimeout(phase, timeout)
+        try:
+            return await asyncio.wait_for(coro, timeout)
+        except asyncio.TimeoutError:
+            self.metrics.inc("swap_timeouts_total", phase=phase)
+            raise SwapTimeout(phase, timeout) from None
+
+    async def _jup_request(self, method: str, url: str, **kwargs):
+        """
+        One Jupiter API call through the shared session and rate limiter.
+        429 and 5xx are retried with jittered backoff, anything else returns
+        the JSON body as is.
+        """
+        session = self._get_session()
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire()
+            async with session.request(method, url, **kwargs) as resp:
+                if not is_retryable_status(resp.status):
+                    return await resp.json(content_type=None)
+                error = JupiterHTTPError(resp.status, await resp.text())
+            if attempt >= self.max_retries:
+                raise error
+            self.retry_count += 1
+            self.metrics.inc("http_retries_total", status=error.status)
+            await asyncio.sleep(backoff_delay(attempt))
+            attempt += 1
+
+    async def close(self):
+        session, rpc = self._session, self._rpc
+        self._session = None
+        self._rpc = None
+        if session is not None and not session.closed:
+            await session.close()
+        if rpc is not None:
+            await rpc.close()
+
+    async def prepare_order(
         self,
         inputMint: str,
         outputMint: str,
         amount: int,
         slippageBps: int = 300,
-        priorityFeeLamports: int = 500000
+        priorityFeeLamports: int = 500000,
+        deadline: float = None
     ):
+        """
+        GET /order only. Returns the response dict with the request params and
+        fetch time attached, so it can be cached and executed later.
+        Raises SwapTimeout after order_timeout seconds or at `deadline`.
+        """
         url = (
-            "https://ultra-api.jup.ag/order"
+            f"{self.jupiter_url}/order"
             f"?inputMint={inputMint}"
             f"&outputMint={outputMint}"
             f"&amount={amount}"
@@ -46,67 +251,466 @@ class JupSwap:
             "&asLegacyTransaction=false"
             "&excludeDexes="
             "&excludeRouters="
-            "&taker=zswtZ86iSzSzmeDtQtEKX7WSHVcNDPkCTHDD1uMMbue"
+            f"&taker={self.wallet}"
+        )
+        started_at = time.time()
+        with self.metrics.span("order_http"):
+            data = await self._with_timeout("order", self._jup_request("GET", url), self.order_timeout, deadline)
+        data["_params"] = order_key(inputMint, outputMint, amount, slippageBps, priorityFeeLamports)
+        data["_fetched_at"] = time.monotonic()
+        data["_started_at"] = started_at
+        data["_quote_at"] = time.time()
+        data["_deadline"] = deadline
+        return data
+
+    async def sign_and_execute(self, order: dict, pair_id: int = None):
+        """
+        Sign a prepared order and POST it to /execute.
+        Orders older than max_order_age are re-quoted first, a late blockhash
+        would only make the transaction fail on chain. Past the order's
+        deadline nothing is sent at all.
+        """
+        if self.is_expired(order):
+            return self.expired(order, pair_id)
+        if self.is_stale(order):
+            self.metrics.inc("orders_requoted_total")
+            order = await self.prepare_order(*order["_params"], deadline=order.get("_deadline"))
+        if not is_executable(order):
+            return self.no_order(order, pair_id)
+        self.sign_order(order)
+        return await self.execute_order(order, pair_id=pair_id)
+
+    def is_stale(self, order: dict):
+        return time.monotonic() - order["_fetched_at"] > self.max_order_age
+
+    def is_expired(self, order: dict):
+        deadline = order.get("_deadline")
+        return deadline is not None and time.monotonic() >= deadline
+
+    def expired(self, order: dict, pair_id: int = None):
+        """Journal an order dropped at its deadline; returns the message for the user."""
+        self.metrics.inc("swaps_total", status="Expired")
+        self._journal(order, pair_id, status="Expired", error="deadline passed before /execute")
+        return "Expired: the quote is too old, swap dropped"
+
+    def no_order(self, order: dict, pair_id: int = None):
+        """Journal an /order answer without a transaction; returns the message for the user."""
+        self.metrics.inc("swaps_total", status="NoOrder")
+        self._journal(order, pair_id, status="NoOrder", error=order.get("error") or order.get("errorMessage"))
+        return "Такая транзакция недоступна, проверьте баланс"
+
+    def sign_order(self, order: dict):
+        """
+        CPU part only: decode, sign and re-encode the order's transaction.
+        The result is kept in order["_signed_transaction"] for execute_order.
+        """
+        from solders import message
+        from solders.transaction import VersionedTransaction
+        metrics = self.metrics
+        with metrics.span("decode"):
+            raw_bytes = b64decode(order["transaction"])
+        with metrics.span("from_bytes"):
+            raw_transaction = VersionedTransaction.from_bytes(raw_bytes)
+        with metrics.span("sign_message"):
+            signature = self.private_key.sign_message(message.to_bytes_versioned(raw_transaction.message))
+        with metrics.span("populate"):
+            signed_txn = VersionedTransaction.populate(raw_transaction.message, [signature])
+        with metrics.span("encode"):
+            order["_signed_transaction"] = b64encode(bytes(signed_txn)).decode("utf-8")
+        # Known before /execute answers, so a timed out swap can still be followed
+        order["_signature"] = str(signature)
+        order["_signed_at"] = time.time()
+        return order["_signed_transaction"]
+
+    async def execute_order(self, order: dict, pair_id: int = None):
+        """
+        POST a signed order to /execute, journal it and hand the signature to
+        the tracker. Dropped if the order's deadline has passed; the call is
+        limited to execute_timeout and the time left before the deadline.
+        """
+        if self.is_expired(order):
+            return self.expired(order, pair_id)
+        metrics = self.metrics
+        execute_url = f"{self.jupiter_url}/execute"
+        payload = {
+            "requestId": order["requestId"],
+            "signedTransaction": order["_signed_transaction"]
+        }
+        order["_execute_sent_at"] = time.time()
+        try:
+            with metrics.span("execute_http"):
+                result = await self._with_timeout(
+                    "execute", self._jup_request("POST", execute_url, json=payload),
+                    self.execute_timeout, order.get("_deadline")
+                )
+        except (SwapTimeout, asyncio.CancelledError) as e:
+            # The transaction may still land: keep its signature for the tracker and the reconciler
+            status = "Timeout" if isinstance(e, SwapTimeout) else "Cancelled"
+            self._sent_unanswered(order, pair_id, status, str(e) or status)
+            raise
+        except Exception as e:
+            order["_execute_returned_at"] = time.time()
+            self.reads.invalidate()
+            metrics.inc("swaps_total", status="Error")
+            self._journal(order, pair_id, status="Error", error=str(e))
+            raise
+        order["_execute_returned_at"] = time.time()
+        # Balances read before this swap are stale now
+        self.reads.invalidate()
+        metrics.inc("swaps_total", status="Success" if result.get("status") == "Success" else "Failed")
+        self._journal(order, pair_id, result=result)
+        if self.tracker is not None and result.get("signature"):
+            self.tracker.track(result["signature"], pair_id=pair_id)
+        print(result)
+        if result.get("status") == "Success":
+            msg = f"Succes: {result.get('signature')}"
+            msg += f"\nhttps://explorer.solana.com/tx/{result.get('signature')}"
+            msg += f"\n{self.jupiter_url}/tx/{result.get('signature')}"
+            return msg
+        else:
+            msg = f"Fail: {result.get('error', result)}"
+            msg += f"\nhttps://explorer.solana.com/tx/{result.get('signature') if result.get('signature') else 'unknown'}"
+            msg += f"\n{self.jupiter_url}/tx/{result.get('signature') if result.get('signature') else 'unknown'}"
+            return msg
+
+    def _sent_unanswered(self, order: dict, pair_id: int, status: str, error: str):
+        order["_execute_returned_at"] = time.time()
+        self.reads.invalidate()
+        self.metrics.inc("swaps_total", status=status)
+        signature = order.get("_signature")
+        self._journal(order, pair_id, status=status, error=error, signature=signature)
+        if self.tracker is not None and signature:
+            self.tracker.track(signature, pair_id=pair_id)
+
+    def _journal(
+        self,
+        order: dict,
+        pair_id: int = None,
+        result: dict = None,
+        status: str = None,
+        error: str = None,
+        signature: str = None
+    ):
+        # Hands the swap to the journal queue, never blocks the trade
+        if self.journal is None:
+            return
+        result = result or {}
+        inputMint, outputMint, amount = order["_params"][:3]
+        self.journal.record(
+            pair_id=pair_id,
+            request_id=order.get("requestId"),
+            signature=result.get("signature") or signature,
+            status=status or result.get("status"),
+            error=error or (str(result["error"]) if result.get("error") else None),
+            input_mint=inputMint,
+            output_mint=outputMint,
+            in_amount=to_int(result.get("inputAmountResult") or order.get("inAmount") or amount),
+            out_amount=to_int(result.get("outputAmountResult") or order.get("outAmount")),
+            started_at=order.get("_started_at"),
+            quote_at=order.get("_quote_at"),
+            signed_at=order.get("_signed_at"),
+            execute_sent_at=order.get("_execute_sent_at"),
+            execute_returned_at=order.get("_execute_returned_at"),
+            wallet=self.wallet
         )
-        headers = {"User-Agent": "Mozilla/5.0"}
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=headers) as resp:
-                data = await resp.json()
-                transaction_b64 = data.get("transaction")
-                request_id = data.get("requestId")
-                if not transaction_b64 or not request_id:
-                    msg = "Такая транзакция недоступна, проверьте баланс"
-                    return msg
-
-                raw_transaction = VersionedTransaction.from_bytes(b64decode(transaction_b64))
-                signature = self.private_key.sign_message(message.to_bytes_versioned(raw_transaction.message))
-                signed_txn = VersionedTransaction.populate(raw_transaction.message, [signature])
-                execute_url = "https://ultra-api.jup.ag/execute"
-                signed_txn_b64 = b64encode(bytes(signed_txn)).decode("utf-8")
-                payload = {
-                    "requestId": request_id,
-                    "signedTransaction": signed_txn_b64
-                }
-                async with session.post(execute_url, json=payload, headers=headers) as resp:
-                    result = await resp.json()
-                    print(result)
-                    if result.get("status") == "Success":
-                        msg = f"Succes: {result.get('signature')}"
-                        msg += f"\nhttps://explorer.solana.com/tx/{result.get('signature')}"
-                        msg += f"\nhttps://ultra-api.jup.ag/tx/{result.get('signature')}"
-                        return msg
-                    else:
-                        msg = f"Fail: {result.get('error', result)}"
-                        msg += f"\nhttps://explorer.solana.com/tx/{result.get('signature') if result.get('signature') else 'unknown'}"
-                        msg += f"\nhttps://ultra-api.jup.ag/tx/{result.get('signature') if result.get('signature') else 'unknown'}"
-                        return msg
+
+    async def fetch_and_execute(
+        self,
+        inputMint: str,
+        outputMint: str,
+        amount: int,
+        slippageBps: int = 300,
+        priorityFeeLamports: int = 500000,
+        pair_id: int = None,
+        timeout: float = None
+    ):
+        """
+        Quote (or take a prefetched order), sign and execute. The whole swap
+        has `timeout` seconds (swap_timeout by default): an order that is
+        still unsent by then is dropped, not executed late.
+        """
+        deadline = time.monotonic() + (timeout if timeout is not None else self.swap_timeout)
+        with self.metrics.span("swap"):
+            order = await self.get_order(inputMint, outputMint, amount, slippageBps, priorityFeeLamports, deadline=deadline)
+            return await self.sign_and_execute(order, pair_id=pair_id)
+
+    async def get_order(
+        self,
+        inputMint: str,
+        outputMint: str,
+        amount: int,
+        slippageBps: int = 300,
+        priorityFeeLamports: int = 500000,
+        deadline: float = None
+    ):
+        """
+        The /order for these params: prefetched if there is a fresh one,
+        otherwise quoted now. `deadline` (time.monotonic()) goes with the
+        order, execute_order drops it once that has passed.
+        """
+        if priorityFeeLamports == "auto":
+            if self.fee_estimator is None:
+                raise ValueError("priorityFeeLamports='auto' needs JupSwap(fee_estimator=...)")
+            priorityFeeLamports = self.fee_estimator.max_fee
+        key = order_key(inputMint, outputMint, amount, slippageBps, priorityFeeLamports)
+        order = self.orders.take(key)
+        self.metrics.inc("order_cache_total", result="miss" if order is None else "hit")
+        if order is None:
+            order = await self._join_prefetch(key, deadline)
+        if order is None:
+            order = await self._quote(key, deadline)
+        order["_deadline"] = deadline
+        return order
+
+    async def fetch_and_execute_percent(
+        self,
+        inputMint: str,
+        outputMint: str,
+        percent: float,
+        slippageBps: int = 300,
+        priorityFeeLamports: int = 500000,
+        pair_id: int = None,
+        guess: int = None,
+        timeout: float = None
+    ):
+        """
+        Sell `percent` % of the wallet's inputMint balance as it is right now,
+        see get_order_for_percent. Otherwise like fetch_and_execute.
+        """
+        deadline = time.monotonic() + (timeout if timeout is not None else self.swap_timeout)
+        with self.metrics.span("swap"):
+            order = await self.get_order_for_percent(
+                inputMint, outputMint, percent, slippageBps, priorityFeeLamports, guess=guess, deadline=deadline
+            )
+            if order is None:
+                return f"Nothing to sell: no {inputMint} in the wallet"
+            return await self.sign_and_execute(order, pair_id=pair_id)
+
+    async def get_order_for_percent(
+        self,
+        inputMint: str,
+        outputMint: str,
+        percent: float,
+        slippageBps: int = 300,
+        priorityFeeLamports: int = 500000,
+        guess: int = None,
+        deadline: float = None
+    ):
+        """
+        The /order for `percent` % of the current inputMint balance, or None
+        if that comes to nothing. `guess` is the amount from the last known
+        balance. Its /order is fetched while the balance is read, so an
+        unchanged balance costs no extra round trip. If the balance moved,
+        the order is quoted again for the exact amount.
+        """
+        order_task = None
+        if guess and guess > 0:
+            order_task = asyncio.ensure_future(
+                self.get_order(inputMint, outputMint, guess, slippageBps, priorityFeeLamports, deadline=deadline)
+            )
+            # Its error is ours only if we end up using it
+            order_task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        try:
+            balance = await self.balance_of(inputMint)
+        except BaseException:
+            if order_task is not None:
+                order_task.cancel()
+            raise
+        amount = int(balance * percent / 100)
+        if order_task is not None:
+            if amount == guess:
+                self.metrics.inc("jit_sizing_total", result="kept")
+                return await order_task
+            self.metrics.inc("jit_sizing_total", result="resized")
+            # Single use anyway, nobody else can take it
+            order_task.cancel()
+        if amount <= 0:
+            return None
+        return await self.get_order(inputMint, outputMint, amount, slippageBps, priorityFeeLamports, deadline=deadline)
+
+    async def balance_of(self, mint: str):
+        """
+        Raw balance of mint right now: from the live balance stream when it
+        has a current value, otherwise one RPC read that is not served from
+        the read cache (in-flight reads are still shared).
+        """
+        stream = self.balance_cache
+        version = None
+        if stream is not None:
+            amount = stream.cached(mint)
+            if amount is not None:
+                self.metrics.inc("jit_balance_total", source="stream")
+                return amount
+            version = stream.version(mint)
+        self.metrics.inc("jit_balance_total", source="rpc")
+        amount = await self.read_balance(mint)
+        if stream is not None:
+            stream.seed(mint, amount, version)
+        return amount
+
+    async def read_balance(self, mint: str):
+        """Raw balance of mint over RPC, never from the read cache (in-flight reads are still shared)."""
+        if mint == SOL_MINT:
+            resp = await self.reads.do(("balance",), self._get_balance, ttl=0)
+            return int(resp.value)
+        resp = await self.reads.do(("token_balance", mint), lambda: self._get_token_balance(mint), ttl=0)
+        return int(resp.value.amount)
+
+    async def _quote(self, key, deadline: float = None):
+        # The pair's fee is the cap when an estimator is set
+        return await self.prepare_order(*key[:4], await self.priority_fee(key[4]), deadline=deadline)
+
+    async def _join_prefetch(self, key, deadline: float = None):
+        """Wait for a prefetch /order already in flight for key and claim it, if nobody has."""
+        task = self.quotes.inflight(key)
+        if task is None:
+            return None
+        try:
+            order = await self._with_timeout("order", asyncio.shield(task), self.order_timeout, deadline)
+        except SwapTimeout:
+            raise
+        except Exception:
+            return None
+        if order.get("_claimed") or not is_executable(order):
+            return None
+        order["_claimed"] = True
+        # keep_orders_warm may have cached it already
+        self.orders.take(key)
+        self.metrics.inc("order_cache_total", result="joined")
+        return order
+
+    async def priority_fee(self, cap: int):
+        """The fee to quote with: estimated and capped at `cap` with an estimator, else `cap` itself."""
+        if self.fee_estimator is None:
+            return cap
+        with self.metrics.span("fee_estimate"):
+            return await self.fee_estimator.estimate(cap)
+
+    def set_prefetch_pairs(self, pairs):
+        """
+        pairs: iterable of (inputMint, outputMint, amount, slippageBps, priorityFeeLamports).
+        The list is replaced as a whole, so it is safe to call from another thread.
+        """
+        self.prefetch_pairs = [order_key(*p) for p in pairs if int(p[2]) > 0]
+
+    async def keep_orders_warm(self, concurrency: int = 8):
+        """
+        Background loop that re-quotes every prefetch pair before its cached
+        order expires. Runs until cancelled.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        refresh_after = self.orders.ttl / 2
+        failed_at = {}
+
+        async def warm(key):
+            async with semaphore:
+                try:
+                    # Cached under the pair's key, quoted with the current fee estimate
+                    order = await self.quotes.do(key, lambda: self._quote(key))
+                except Exception as e:
+                    print(f"Prefetch error for {key[0]} -> {key[1]}: {str(e)}")
+                    failed_at[key] = time.monotonic()
+                    return
+                if order.get("_claimed"):
+                    # A swap took it while it was in flight
+                    failed_at.pop(key, None)
+                elif is_executable(order):
+                    self.orders.put(key, order)
+                    failed_at.pop(key, None)
+                else:
+                    # No route / no balance, don't hammer /order for it
+                    failed_at[key] = time.monotonic()
+
+        while True:
+            now = time.monotonic()
+            stale = []
+            for key in self.prefetch_pairs:
+                if now - failed_at.get(key, 0) < refresh_after:
+                    continue
+                age = self.orders.age(key)
+                if age is None or age > refresh_after:
+                    stale.append(key)
+            if stale:
+                await asyncio.gather(*(warm(key) for key in stale))
+            self.orders.evict()
+            await asyncio.sleep(1)
 
     async def get_balance(self):
-        client = AsyncClient(self.rpc_url)
-        resp = await client.get_balance(self.private_key.pubkey())
-        await client.close()
+        return await self.reads.do(("balance",), self._get_balance)
+
+    async def _get_balance(self):
+        owner = self.private_key.pubkey()
+        with self.metrics.span("rpc_balance"):
+            resp = await self._rpc_call(lambda client: client.get_balance(owner))
         return resp
     async def get_token_balance(self, pubkey: str):
-        client = AsyncClient(self.rpc_url)
-        pubkey_owner =self.private_key.pubkey()
         
       
-        if  pubkey=='So11111111111111111111111111111111111111112':
+        if  pubkey==SOL_MINT:
             balance = await self.get_balance()
             return balance
-        resp_token =  get_associated_token_address(pubkey_owner,Pubkey.from_string(pubkey))
-        resp = await client.get_token_account_balance(resp_token)
-        await client.close()
+        return await self.reads.do(("token_balance", pubkey), lambda: self._get_token_balance(pubkey))
+
+    async def _get_token_balance(self, pubkey: str):
+        with self.metrics.span("ata_derive"):
+            resp_token = self.mint_registry.ata(pubkey, self.pubkey)
+        with self.metrics.span("rpc_token_balance"):
+            resp = await self._rpc_call(lambda client: client.get_token_account_balance(resp_token))
         return resp
+
+    async def get_all_balances(self):
+        """
+        Snapshot of the whole wallet in three RPC calls that run concurrently:
+        getBalance for SOL and getTokenAccountsByOwner for the SPL token and
+        the Token-2022 program. Returns {mint: raw amount}, SOL is keyed by SOL_MINT in lamports.
+        Mints without a token account are simply absent.
+        """
+        # Callers may edit their copy
+        return dict(await self.reads.do(("all_balances",), self._get_all_balances))
+
+    async def _get_all_balances(self):
+        owner = self.private_key.pubkey()
+        from solana.rpc.types import TokenAccountOpts
+        from spl.token.constants import TOKEN_PROGRAM_ID, TOKEN_2022_PROGRAM_ID
+
+        def token_accounts(program):
+            opts = TokenAccountOpts(program_id=program)
+            return self._rpc_call(lambda client: client.get_token_accounts_by_owner_json_parsed(owner, opts))
+
+        sol_resp, *token_resps = await asyncio.gather(
+            self._rpc_call(lambda client: client.get_balance(owner)),
+            token_accounts(TOKEN_PROGRAM_ID),
+            token_accounts(TOKEN_2022_PROGRAM_ID)
+        )
+        balances = {SOL_MINT: int(sol_resp.value)}
+        for keyed in (keyed for resp in token_resps for keyed in resp.value):
+            info = keyed.account.data.parsed.get("info", {})
+            mint = info.get("mint")
+            # Wrapped SOL accounts are not the native balance we swap with
+            if not mint or mint == SOL_MINT:
+                continue
+            amount = int(info.get("tokenAmount", {}).get("amount", 0))
+            # A wallet can hold several accounts of one mint, sum them up
+            balances[mint] = balances.get(mint, 0) + amount
+        return balances
      #   return None
 
 
-def extract_received_amount(txn_result, mint):
+def extract_received_amount(txn_result, mint, owner=None):
     """
     Get how many tokens of mint were received in the transaction.
     txn_result — result of client.get_transaction(...)
     mint — mint token string
+    owner — wallet address; only its accounts are counted (recommended,
+    without it a pool account of the same mint can be picked up)
     """
+    if owner is not None:
+        from reconcile import balance_deltas, transaction_json
+        tx = transaction_json(txn_result)
+        if not tx or not tx.get("meta"):
+            return None
+        return balance_deltas(tx, str(owner))[0].get(mint, 0)
+
     meta = None
     if isinstance(txn_result, dict):
         meta = txn_result.get("result", {}).get("meta")
@@ -166,3 +770,8 @@ def extract_received_amount(txn_result, mint):
 #
 #     asyncio.run(main())
 
+
+if __name__ == "__main__":
+    # python -m jup_swap run --db pairs.db, see runner.py
+    from runner import main
+    raise SystemExit(main())
@@ -0,0 +1,88 @@
+"""
+Bounded log buffer between the workers and the GUI console.
+
+    sink = LogSink(capacity=5000, path="console.log")
+    sink.info("Pair added")          # any thread, O(1), never touches Qt
+    lines = sink.drain()             # GUI timer, every 100 ms: one append
+
+Memory is capped by `capacity` no matter how long the session runs; lines
+that pile up faster than the console drains them are dropped oldest first
+and counted. With a path, every line also goes to a size-rotated file.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from logging import DEBUG, INFO, WARNING, ERROR
+from logging.handlers import RotatingFileHandler
+
+LEVELS = {"Debug": DEBUG, "Info": INFO, "Warning": WARNING, "Error": ERROR}
+
+
+class LogSink:
+    def __init__(self, capacity: int = 5000, level: int = INFO, path: str = None,
+                 max_bytes: int = 5 * 1024 * 1024, backup_count: int = 3):
+        self.capacity = capacity
+        self.level = level
+        # Every record, for re-filtering the console when the level changes
+        self.history = deque(maxlen=capacity)
+        # Records not shown yet
+        self.pending = deque(maxlen=capacity)
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self.file_log = None
+        if path:
+            handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+            self.file_log = logging.getLogger(f"jupswap.console.{id(self)}")
+            self.file_log.propagate = False
+            self.file_log.setLevel(DEBUG)
+            self.file_log.addHandler(handler)
+
+    def log(self, msg, level: int = INFO):
+        line = f"[{time.strftime('%H:%M:%S')}] {msg}"
+        with self._lock:
+            self.history.append((level, line))
+            if level >= self.level:
+                if len(self.pending) == self.pending.maxlen:
+                    self.dropped += 1
+                self.pending.append(line)
+        if self.file_log is not None:
+            self.file_log.log(level, msg)
+
+    def debug(self, msg):
+        self.log(msg, DEBUG)
+
+    def info(self, msg):
+        self.log(msg, INFO)
+
+    def warning(self, msg):
+        self.log(msg, WARNING)
+
+    def error(self, msg):
+        self.log(msg, ERROR)
+
+    def drain(self):
+        """Lines logged since the last drain, at or above the level, oldest first."""
+        with self._lock:
+            lines = list(self.pending)
+            self.pending.clear()
+            dropped, self.dropped = self.dropped, 0
+        if dropped:
+            lines.insert(0, f"... {dropped} older lines dropped")
+        return lines
+
+    def set_level(self, level: int):
+        """Change the threshold; returns the buffered lines that pass it, to redraw the console."""
+        with self._lock:
+            self.level = level
+            self.pending.clear()
+            self.dropped = 0
+            return [line for lvl, line in self.history if lvl >= level]
+
+    def close(self):
+        if self.file_log is not None:
+            for handler in list(self.file_log.handlers):
+                handler.close()
+                self.file_log.removeHandler(handler)
+            self.file_log = None
@@ -1,320 +1,283 @@
 import sys
 import asyncio
-import sqlite3
 import os
+import time
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
-    QPushButton, QTextEdit, QListWidget, QMessageBox, QListWidgetItem, QScrollArea, QFileDialog
+    QPushButton, QPlainTextEdit, QComboBox, QMessageBox, QFileDialog, QCheckBox
 )
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QTimer
-from jup_swap import JupSwap
+from PyQt5.QtCore import QObject, pyqtSignal, QTimer
+from PyQt5.QtGui import QTextCursor
+from jup_swap import JupSwap, preload
+from engine import AsyncEngine
+from storage import DB_PATH, PairStore, is_valid_mint
+from journal import SwapJournal
+from scheduler import SwapScheduler
+from pipeline import SwapPipeline
+from ratelimit import TokenBucket
+from pair_table import PairTableModel, PairTableView
+from log_sink import LEVELS, LogSink
+from confirm import ConfirmationTracker
+from fee import PriorityFeeEstimator
+from mints import MintRegistry
+from monitor import QuoteMonitor, TriggerStore
 
-DB_PATH = "./pairs.db"
 PK_PATH = "./private_key.txt"
-
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS pairs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            inputMint TEXT,
-            outputMint TEXT,
-            amount INTEGER,
-            slippageBps INTEGER,
-            priorityFeeLamports INTEGER
-        )
-    """)
-    conn.commit()
-    conn.close()
-
-class Worker(QThread):
+# Optional list of RPC endpoints, one url per line
+RPC_PATH = "./rpc_urls.txt"
+
+# Single asyncio loop shared by all swaps and balance requests
+ENGINE = AsyncEngine()
+# Swap scheduler limits: concurrent swaps and Jupiter requests per second
+MAX_IN_FLIGHT = 8
+JUP_RATE_LIMIT = 10
+# Price trigger polling: /order calls per second at most, seconds between polls
+MONITOR_RATE = 4
+MONITOR_MIN_INTERVAL = 1
+MONITOR_MAX_INTERVAL = 15
+# Buy/Sell clicks jump ahead of queued Run All Swaps jobs
+MANUAL_PRIORITY = 1000000
+# Console: lines kept in memory, flush period in ms, rotated log file (None to disable)
+CONSOLE_LINES = 5000
+CONSOLE_FLUSH_MS = 100
+LOG_PATH = "./console.log"
+
+async def preload_wallet_stack():
+    # Runs on the engine thread so the window shows before solders/solana load
+    preload()
+
+def parse_balance(balance):
+    # get_balance returns lamports in .value, get_token_balance returns
+    # a token amount object with .amount
+    try:
+        if hasattr(balance, "value") and hasattr(balance.value, "amount"):
+            return int(balance.value.amount)
+        elif isinstance(balance, dict):
+            return int(balance.get("result", {}).get("value", {}).get("amount", 0))
+        elif hasattr(balance, "value"):
+            return int(balance.value)
+    except Exception:
+        pass
+    return 0
+
+class Worker(QObject):
+    """Runs one swap on the shared engine loop and reports back via signals."""
     result_signal = pyqtSignal(str)
-    balance_signal = pyqtSignal(str)
+    finished = pyqtSignal()
 
-    def __init__(self, swap, inputMint, outputMint, amount, slippageBps, priorityFeeLamports):
+    def __init__(self, swap, inputMint, outputMint, amount, slippageBps, priorityFeeLamports, scheduler=None, priority=0, pair_id=None, sell_percent=None):
         super().__init__()
+        self.pair_id = pair_id
+        # Set for sells: amount is then only the guess from the last known balance
+        self.sell_percent = sell_percent
         self.swap = swap
+        self.scheduler = scheduler
+        self.priority = priority
         self.inputMint = inputMint
         self.outputMint = outputMint
         self.amount = amount
         self.slippageBps = slippageBps
         self.priorityFeeLamports = priorityFeeLamports
+        self.future = None
 
-    def run(self):
-        try:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            result = loop.run_until_complete(
-                self.swap.fetch_and_execute(
+    def start(self):
+        def job():
+            if self.sell_percent is not None:
+                return self.swap.fetch_and_execute_percent(
                     inputMint=self.inputMint,
                     outputMint=self.outputMint,
-                    amount=self.amount,
+                    percent=self.sell_percent,
                     slippageBps=self.slippageBps,
-                    priorityFeeLamports=self.priorityFeeLamports
+                    priorityFeeLamports=self.priorityFeeLamports,
+                    pair_id=self.pair_id,
+                    guess=self.amount
                 )
+            return self.swap.fetch_and_execute(
+                inputMint=self.inputMint,
+                outputMint=self.outputMint,
+                amount=self.amount,
+                slippageBps=self.slippageBps,
+                priorityFeeLamports=self.priorityFeeLamports,
+                pair_id=self.pair_id
             )
-            self.result_signal.emit(str(result))
+        if self.scheduler is not None:
+            coro = self.scheduler.submit(job, self.priority)
+        else:
+            coro = job()
+        self.future = ENGINE.submit(coro)
+        self.future.add_done_callback(self._done)
+
+    def isRunning(self):
+        return self.future is not None and not self.future.done()
+
+    def cancel(self):
+        # Never blocks: the swap's task is cancelled on the engine thread,
+        # /order or /execute in flight is aborted there and _done reports it
+        if self.future is not None:
+            self.future.cancel()
+
+    def _done(self, future):
+        # Called on the engine thread, signals are queued to the GUI thread
+        if future.cancelled():
+            self.result_signal.emit(f"Swap {self.inputMint} → {self.outputMint} cancelled")
+            self.finished.emit()
+            return
+        try:
+            self.result_signal.emit(str(future.result()))
         except Exception as e:
             self.result_signal.emit(f"Worker error: {str(e)}")
+        self.finished.emit()
 
-class BalanceWorker(QThread):
+class BalanceWorker(QObject):
     balance_signal = pyqtSignal(str, int)
+    error_signal = pyqtSignal(str)
+    finished = pyqtSignal()
 
     def __init__(self, swap, mint):
         super().__init__()
         self.swap = swap
         self.mint = mint
+        self.future = None
 
-    def run(self):
-        try:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-         #   print(self.mint)
-            if self.mint != "So11111111111111111111111111111111111111112":
-                balance = loop.run_until_complete(self.swap.get_token_balance(self.mint))
-            else:
-                balance = loop.run_until_complete(self.swap.get_balance())
-            amount = 0
-            try:
-                if hasattr(balance, "value") and hasattr(balance.value, "amount"):
-                    amount = int(balance.value.amount)
-                elif isinstance(balance, dict):
-                    amount = int(balance.get("result", {}).get("value", {}).get("amount", 0))
-                elif hasattr(balance, "value"):
-                    amount = int(balance.value)
-            except Exception:
-                amount = 0
-            self.balance_signal.emit(self.mint, amount)
-        except Exception as e:
-            # Ошибка потока, выводим в консоль, не закрываем приложение
-            main_win = None
-            parent = self.parent()
-            while parent and not isinstance(parent, MainWindow):
-                parent = parent.parent()
-            main_win = parent
-            if main_win:
-                main_win.console.append(f"BalanceWorker error: {str(e)}")
-            self.balance_signal.emit(self.mint, 0)
-
-class PairWidget(QWidget):
-    def __init__(self, swap, pair, parent=None):
-        super().__init__(parent)
-        self.swap = swap
-        self.pair = list(pair)
-        self.current_balance = 0
-        self.worker = None
-        self.balance_thread = None
-        self.balance_timer = None
-        self.init_ui()
-
-    def get_main_window(self):
-        # Поиск главного окна для доступа к консоли
-        parent = self.parent()
-        while parent and not isinstance(parent, MainWindow):
-            parent = parent.parent()
-        return parent
+    def start(self):
+        if self.mint != "So11111111111111111111111111111111111111112":
+            coro = self.swap.get_token_balance(self.mint)
+        else:
+            coro = self.swap.get_balance()
+        self.future = ENGINE.submit(coro)
+        self.future.add_done_callback(self._done)
 
-    def get_console(self):
-        # Поиск консоли главного окна
-        main_win = self.get_main_window()
-        if main_win:
-            return main_win.console
-        return None
+    def isRunning(self):
+        return self.future is not None and not self.future.done()
 
-    def init_ui(self):
-        layout = QHBoxLayout()
-        # Editable fields for all parameters
-        self.id_label = QLabel(f"ID:{self.pair[0]}")
-        layout.addWidget(self.id_label)
-        self.inputMint_edit = QLineEdit(self.pair[1])
-        self.inputMint_edit.setFixedWidth(180)
-        layout.addWidget(QLabel("Input:"))
-        layout.addWidget(self.inputMint_edit)
-        self.outputMint_edit = QLineEdit(self.pair[2])
-        self.outputMint_edit.setFixedWidth(180)
-        layout.addWidget(QLabel("Output:"))
-        layout.addWidget(self.outputMint_edit)
-        self.amount_edit = QLineEdit(str(self.pair[3]))
-        self.amount_edit.setFixedWidth(80)
-        layout.addWidget(QLabel("Amount:"))
-        layout.addWidget(self.amount_edit)
-        self.slippage_edit = QLineEdit(str(self.pair[4]))
-        self.slippage_edit.setFixedWidth(60)
-        layout.addWidget(QLabel("Slippage:"))
-        layout.addWidget(self.slippage_edit)
-        self.priority_edit = QLineEdit(str(self.pair[5]))
-        self.priority_edit.setFixedWidth(80)
-        layout.addWidget(QLabel("Priority:"))
-        layout.addWidget(self.priority_edit)
-
-        self.balance_label = QLabel("Balance: ...")
-        layout.addWidget(self.balance_label)
-        self.update_btn = QPushButton("Update Balance")
-        self.update_btn.clicked.connect(self.update_balance)
-        layout.addWidget(self.update_btn)
-
-        # Sell controls (for non-SOL tokens)
-        if self.pair[1] != "So11111111111111111111111111111111111111112":
-            self.percent_edit = QLineEdit("100")
-            self.percent_edit.setFixedWidth(40)
-            layout.addWidget(QLabel("Sell %:"))
-            layout.addWidget(self.percent_edit)
-            self.sell_btn = QPushButton("Sell")
-            self.sell_btn.clicked.connect(self.sell_token)
-            layout.addWidget(self.sell_btn)
-            # Автообновление баланса
-            self.balance_timer = QTimer(self)
-            self.balance_timer.timeout.connect(self.update_balance)
-            self.balance_timer.start(10000)  # 3 секунды
-        else:
-            # BUY button for SOL
-            self.buy_btn = QPushButton("Buy")
-            self.buy_btn.clicked.connect(self.buy_token)
-            layout.addWidget(self.buy_btn)
+    def _done(self, future):
+        try:
+            amount = parse_balance(future.result())
+        except Exception as e:
+            # Ошибка запроса, выводим в консоль, не закрываем приложение
+            self.error_signal.emit(f"BalanceWorker error: {str(e)}")
+            amount = 0
+        self.balance_signal.emit(self.mint, amount)
+        self.finished.emit()
 
-        # Save changes button
-        self.save_btn = QPushButton("Save")
-        self.save_btn.clicked.connect(self.save_changes)
-        layout.addWidget(self.save_btn)
+class ImportWorker(QObject):
+    """Streams a pairs file into the store on a worker thread of the engine."""
+    log_signal = pyqtSignal(str)
+    done_signal = pyqtSignal(str, int, int, int)
 
-        # Delete button
-        self.delete_btn = QPushButton("Delete")
-        self.delete_btn.clicked.connect(self.delete_pair)
-        layout.addWidget(self.delete_btn)
+    def __init__(self, store, fname):
+        super().__init__()
+        self.store = store
+        self.fname = fname
+        self.future = None
+
+    def start(self):
+        self.future = ENGINE.submit(self._run())
+        self.future.add_done_callback(self._done)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            lambda: self.store.import_pairs(
+                self.fname,
+                on_skip=self.log_signal.emit,
+                on_progress=lambda n: self.log_signal.emit(f"Imported {n} pairs...")
+            )
+        )
 
-        self.setLayout(layout)
+    def isRunning(self):
+        return self.future is not None and not self.future.done()
 
-    def update_balance(self):
-        mint = self.inputMint_edit.text().strip()
-        console = self.get_console()
-        if console:
-            console.append(f"Updating balance for {mint}...")
+    def _done(self, future):
         try:
-            if not mint:
-                if console:
-                    console.append("Input Mint required!")
-                return
-            
-            if not self.swap:
-                if console:
-                    console.append("Set private key first!")
-                return
-            # Безопасно останавливаем предыдущий поток
-            try:
-                if hasattr(self, "balance_worker") and self.balance_worker is not None and self.balance_worker.isRunning():
-                    self.balance_worker.quit()
-                    self.balance_worker.wait()
-            except Exception as e:
-                if console:
-                    console.append(f"Thread stop error: {str(e)}")
-            if console:
-                console.append(f"Getting balance for {mint}...")
-            self.balance_worker = BalanceWorker(self.swap, mint)
-            self.balance_worker.balance_signal.connect(self.show_balance)
-            self.balance_worker.finished.connect(lambda: console.append(f"BalanceWorker for {mint} finished") if console else None)
-            self.balance_worker.start()
+            imported, duplicates, skipped = future.result()
         except Exception as e:
-            if console:
-                console.append(f"Update balance error: {str(e)}")
+            self.log_signal.emit(f"Import failed: {str(e)}")
+            imported = duplicates = skipped = 0
+        self.done_signal.emit(self.fname, imported, duplicates, skipped)
 
-    def cleanup_balance_thread(self):
-        self.balance_thread = None
+class EngineBridge(QObject):
+    """Carries callbacks from the engine thread (balance stream, scheduler logs, confirmations) to the GUI."""
+    balance_signal = pyqtSignal(str, int)
+    log_signal = pyqtSignal(str)
+    # signature, status, pair id (None for swaps outside the pair table)
+    confirm_signal = pyqtSignal(str, str, object)
+    mints_signal = pyqtSignal()
+    ready_signal = pyqtSignal()
+
+class SnapshotWorker(QObject):
+    """Fetches every wallet balance at once for the periodic refresh."""
+    balances_signal = pyqtSignal(dict)
+    error_signal = pyqtSignal(str)
+    finished = pyqtSignal()
+
+    def __init__(self, swap):
+        super().__init__()
+        self.swap = swap
+        self.future = None
 
-    def show_balance(self, mint, amount):
-        self.balance_label.setText(f"Balance: {amount}")
-        self.current_balance = amount
+    def start(self):
+        self.future = ENGINE.submit(self.swap.get_all_balances())
+        self.future.add_done_callback(self._done)
 
-    def sell_token(self):
-        percent = float(self.percent_edit.text())
-        # Баланс всегда актуальный, учитываем Sell%
-        amount = int(self.current_balance * percent / 100)
-        inputMint = self.inputMint_edit.text().strip()
-        outputMint = self.outputMint_edit.text().strip()
-        slippage = int(self.slippage_edit.text())
-        priority = int(self.priority_edit.text())
-        main_win = self.get_main_window()
-        if main_win:
-            main_win.console.append(f"Selling {amount} of {inputMint} ({percent}%)")
-            if self.worker is not None and self.worker.isRunning():
-                self.worker.quit()
-                self.worker.wait()
-            self.worker = Worker(
-                self.swap,
-                inputMint, outputMint, amount,
-                slippage, priority
-            )
-            self.worker.result_signal.connect(main_win.console.append)
-            self.worker.finished.connect(self.cleanup_worker)
-            self.worker.start()
+    def isRunning(self):
+        return self.future is not None and not self.future.done()
 
-    def buy_token(self):
-        amount = int(self.amount_edit.text())
-        inputMint = self.inputMint_edit.text().strip()
-        outputMint = self.outputMint_edit.text().strip()
-        slippage = int(self.slippage_edit.text())
-        priority = int(self.priority_edit.text())
-        main_win = self.get_main_window()
-        if main_win:
-            main_win.console.append(f"Buying {amount} of {inputMint}")
-            if self.worker is not None and self.worker.isRunning():
-                self.worker.quit()
-                self.worker.wait()
-            self.worker = Worker(
-                self.swap,
-                inputMint, outputMint, amount,
-                slippage, priority
-            )
-            self.worker.result_signal.connect(main_win.console.append)
-            self.worker.finished.connect(self.cleanup_worker)
-            self.worker.start()
-
-    def cleanup_worker(self):
-        self.worker = None
-
-    def save_changes(self):
-        # Сохраняем изменения в БД
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute(
-            "UPDATE pairs SET inputMint=?, outputMint=?, amount=?, slippageBps=?, priorityFeeLamports=? WHERE id=?",
-            (
-                self.inputMint_edit.text().strip(),
-                self.outputMint_edit.text().strip(),
-                int(self.amount_edit.text()),
-                int(self.slippage_edit.text()),
-                int(self.priority_edit.text()),
-                self.pair[0]
-            )
-        )
-        conn.commit()
-        conn.close()
-        main_win = self.get_main_window()
-        if main_win:
-            main_win.console.append(f"Pair {self.pair[0]} updated.")
-
-    def delete_pair(self):
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute("DELETE FROM pairs WHERE id=?", (self.pair[0],))
-        conn.commit()
-        conn.close()
-        main_win = self.get_main_window()
-        if main_win:
-            main_win.console.append(f"Pair {self.pair[0]} deleted.")
-            main_win.load_pairs()
+    def _done(self, future):
+        try:
+            self.balances_signal.emit(future.result())
+        except Exception as e:
+            self.error_signal.emit(f"Balance refresh error: {str(e)}")
+        self.finished.emit()
 
 class MainWindow(QWidget):
     def __init__(self):
         super().__init__()
+        ENGINE.start()
         self.swap = None
+        # Swap and balance workers in flight, kept referenced until they finish
+        self.workers = set()
+        self.pair_balance_workers = {}
+        self.snapshot_worker = None
+        self.balance_stream = None
+        self.last_snapshot_at = 0
+        self.prefetch_future = None
+        self.monitor_future = None
         self.private_key_str = ''
         self.setWindowTitle("Jupiter Swap GUI")
         self.setGeometry(100, 100, 900, 600)
+        self.store = PairStore(DB_PATH)
+        # Take-profit / stop-loss / limit rules, see monitor.py
+        self.triggers = TriggerStore(DB_PATH)
+        self.mint_registry = MintRegistry(DB_PATH)
+        self.log_sink = LogSink(capacity=CONSOLE_LINES, path=LOG_PATH)
         self.init_ui()
-        init_db()
-        self.load_private_key()
+        self.engine_bridge = EngineBridge()
+        self.engine_bridge.balance_signal.connect(self.on_stream_balance)
+        self.engine_bridge.log_signal.connect(self.log_sink.info)
+        self.engine_bridge.confirm_signal.connect(self.on_confirmation)
+        self.engine_bridge.mints_signal.connect(self.pair_model.refresh_balances)
+        self.tracker = None
+        self.fee_estimator = None
+        self.scheduler = SwapScheduler(max_in_flight=MAX_IN_FLIGHT, log=self.engine_bridge.log_signal.emit)
+        # Run All Swaps: quotes of the next pairs overlap /execute of the earlier ones
+        self.pipeline = SwapPipeline(
+            None, quote_concurrency=MAX_IN_FLIGHT, execute_concurrency=MAX_IN_FLIGHT,
+            queue_size=MAX_IN_FLIGHT * 2, log=self.engine_bridge.log_signal.emit
+        )
+        self.pipeline_future = None
+        self.rate_limiter = TokenBucket(JUP_RATE_LIMIT)
+        self.journal = SwapJournal(DB_PATH)
+        self.import_worker = None
         self.load_pairs()
+        # Кошелёк загружаем после импорта тяжёлых модулей в фоне
+        self.engine_bridge.ready_signal.connect(self.load_private_key)
+        ENGINE.submit(preload_wallet_stack()).add_done_callback(lambda f: self.engine_bridge.ready_signal.emit())
+        # Один общий опрос балансов для всех пар
+        self.balance_timer = QTimer(self)
+        self.balance_timer.timeout.connect(self.refresh_balances)
+        self.balance_timer.start(10000)
 
     def init_ui(self):
         layout = QVBoxLayout()
@@ -358,15 +321,14 @@ class MainWindow(QWidget):
         form_layout.addWidget(self.priority_edit)
         layout.addLayout(form_layout)
 
-        # Pair widgets area (scrollable)
-        self.pair_area = QScrollArea()
-        self.pair_area.setWidgetResizable(True)
-        self.pair_container = QWidget()
-        self.pair_layout = QVBoxLayout()
-        self.pair_container.setLayout(self.pair_layout)
-        self.pair_area.setWidget(self.pair_container)
+        # Pair table: double-click a cell to edit, edits are saved right away
+        self.pair_model = PairTableModel(self.store, self, registry=self.mint_registry)
+        self.pair_view = PairTableView(self.pair_model)
+        self.pair_view.trade_delegate.clicked.connect(self.trade_pair)
+        self.pair_view.refresh_delegate.clicked.connect(self.update_pair_balance)
+        self.pair_view.delete_delegate.clicked.connect(self.delete_pair)
         layout.addWidget(QLabel("Token pairs:"))
-        layout.addWidget(self.pair_area)
+        layout.addWidget(self.pair_view)
 
         # Buttons
         btn_layout = QHBoxLayout()
@@ -374,32 +336,167 @@ class MainWindow(QWidget):
         self.add_btn.clicked.connect(self.add_pair)
         self.run_btn = QPushButton("Run All Swaps")
         self.run_btn.clicked.connect(self.run_all_swaps)
+        self.cancel_btn = QPushButton("Cancel Swaps")
+        self.cancel_btn.clicked.connect(self.cancel_swaps)
         self.import_btn = QPushButton("Import Pairs")
         self.import_btn.clicked.connect(self.import_pairs)
         btn_layout.addWidget(self.add_btn)
         btn_layout.addWidget(self.run_btn)
+        btn_layout.addWidget(self.cancel_btn)
         btn_layout.addWidget(self.import_btn)
+        self.prefetch_check = QCheckBox("Prefetch quotes")
+        self.prefetch_check.toggled.connect(self.toggle_prefetch)
+        btn_layout.addWidget(self.prefetch_check)
+        # Priority fee from recent network fees, the pair's Priority Fee becomes the maximum
+        self.auto_fee_check = QCheckBox("Auto priority fee")
+        self.auto_fee_check.toggled.connect(self.toggle_auto_fee)
+        btn_layout.addWidget(self.auto_fee_check)
+        # Executes pairs whose price crosses a trigger from the triggers table
+        self.monitor_check = QCheckBox("Watch triggers")
+        self.monitor_check.toggled.connect(self.toggle_monitor)
+        btn_layout.addWidget(self.monitor_check)
         layout.addLayout(btn_layout)
 
-        # Console
-        self.console = QTextEdit()
+        # Console: lines go through log_sink and are appended in one batch per tick
+        console_header = QHBoxLayout()
+        console_header.addWidget(QLabel("Console:"))
+        console_header.addStretch()
+        self.level_combo = QComboBox()
+        self.level_combo.addItems(list(LEVELS))
+        self.level_combo.setCurrentText("Info")
+        self.level_combo.currentTextChanged.connect(self.set_console_level)
+        console_header.addWidget(self.level_combo)
+        layout.addLayout(console_header)
+        self.console = QPlainTextEdit()
         self.console.setReadOnly(True)
-        layout.addWidget(QLabel("Console:"))
+        self.console.setMaximumBlockCount(CONSOLE_LINES)
         layout.addWidget(self.console)
+        self.console_timer = QTimer(self)
+        self.console_timer.timeout.connect(self.flush_console)
+        self.console_timer.start(CONSOLE_FLUSH_MS)
+        self.pair_model.log_signal.connect(self.log_sink.info)
+        self.pair_model.pairs_changed.connect(self.pairs_changed)
 
         self.setLayout(layout)
 
+    def closeEvent(self, event):
+        self.balance_timer.stop()
+        self.stop_balance_stream()
+        self.stop_prefetch()
+        self.stop_monitor()
+        self.stop_tracker()
+        if self.pipeline_future is not None:
+            self.pipeline_future.cancel()
+        try:
+            ENGINE.submit(self.scheduler.close()).result(timeout=2)
+        except Exception:
+            pass
+        if self.swap is not None:
+            try:
+                ENGINE.submit(self.swap.close()).result(timeout=5)
+            except Exception:
+                pass
+        ENGINE.stop()
+        self.journal.close()
+        self.store.close()
+        self.console_timer.stop()
+        self.log_sink.close()
+        super().closeEvent(event)
+
+    def flush_console(self):
+        lines = self.log_sink.drain()
+        if lines:
+            self.console.appendPlainText("\n".join(lines))
+
+    def set_console_level(self, name):
+        self.console.setPlainText("\n".join(self.log_sink.set_level(LEVELS[name])))
+        self.console.moveCursor(QTextCursor.End)
+
+    def load_rpc_urls(self):
+        if not os.path.exists(RPC_PATH):
+            return None
+        with open(RPC_PATH, "r") as f:
+            urls = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+        return urls or None
+
+    def make_swap(self, pk):
+        swap = JupSwap(
+            private_key_str=pk,
+            rpc_url=self.load_rpc_urls(),
+            rate_limiter=self.rate_limiter,
+            hedge_reads=True,
+            journal=self.journal,
+            mint_registry=self.mint_registry
+        )
+        self.scheduler.swap = swap
+        self.pipeline.swap = swap
+        # Every executed signature is polled in batches until it settles
+        self.stop_tracker()
+        self.tracker = swap.tracker = ConfirmationTracker(
+            swap,
+            on_status=self.engine_bridge.confirm_signal.emit,
+            journal=self.journal,
+            log=self.engine_bridge.log_signal.emit
+        )
+        ENGINE.submit(self.tracker.run())
+        self.fee_estimator = PriorityFeeEstimator(swap)
+        self.fee_estimator.set_accounts(self.pair_model.all_mints())
+        if self.auto_fee_check.isChecked():
+            swap.fee_estimator = self.fee_estimator
+        self.load_mints(swap)
+        return swap
+
+    def load_mints(self, swap=None):
+        # Decimals/symbols for new mints in one getMultipleAccounts, then redraw balances
+        swap = swap or self.swap
+        if swap is None or not self.mint_registry.missing(self.pair_model.all_mints()):
+            return
+        future = ENGINE.submit(self.mint_registry.ensure(swap, self.pair_model.all_mints()))
+        future.add_done_callback(lambda f: self.engine_bridge.mints_signal.emit())
+
+    def toggle_auto_fee(self, enabled):
+        if self.swap is None:
+            return
+        self.swap.fee_estimator = self.fee_estimator if enabled else None
+        self.log_sink.info("Auto priority fee " + ("on: pair Priority Fee is the maximum." if enabled else "off."))
+
+    def stop_tracker(self):
+        if self.tracker is not None:
+            ENGINE.call_soon(self.tracker.stop)
+            self.tracker = None
+
+    def on_confirmation(self, signature, status, pair_id):
+        level = self.log_sink.warning if status in ("failed", "expired") else self.log_sink.info
+        level(f"Swap {signature[:12]}... {status}" + (f" (pair {pair_id})" if pair_id is not None else ""))
+        if pair_id is not None:
+            self.pair_model.set_status(pair_id, status)
+
     def set_private_key(self):
         pk = self.pk_edit.text().strip()
         if not pk:
             QMessageBox.warning(self, "Error", "Private key required!")
             return
         self.private_key_str = pk
-        self.swap = JupSwap(private_key_str=pk)
+        old_swap, self.swap = self.swap, self.make_swap(pk)
         # Save private key to file
         with open(PK_PATH, "w") as f:
             f.write(pk)
-        self.console.append("Private key set and saved.")
+        self.log_sink.info("Private key set and saved.")
+        self.start_balance_stream()
+        self.start_prefetch()
+        self.start_monitor()
+        self.refresh_balances()
+        if old_swap is not None:
+            self.close_swap(old_swap)
+
+    def close_swap(self, swap):
+        # Queued behind the cancels of its prefetch/monitor tasks, never waits on the GUI thread
+        ENGINE.submit(swap.close()).add_done_callback(self._swap_closed)
+
+    def _swap_closed(self, future):
+        # Called on the engine thread
+        if not future.cancelled() and future.exception() is not None:
+            self.engine_bridge.log_signal.emit(f"Closing the previous wallet failed: {str(future.exception())}")
 
     def load_private_key(self):
         if os.path.exists(PK_PATH):
@@ -408,8 +505,9 @@ class MainWindow(QWidget):
                 if pk:
                     self.private_key_str = pk
                     self.pk_edit.setText(pk)
-                    self.swap = JupSwap(private_key_str=pk)
-                    self.console.append("Private key loaded from file.")
+                    self.swap = self.make_swap(pk)
+                    self.log_sink.info("Private key loaded from file.")
+                    self.start_balance_stream()
 
     def add_pair(self):
         inputMint = self.inputMint_edit.text().strip()
@@ -423,64 +521,122 @@ class MainWindow(QWidget):
         if not self.swap:
             QMessageBox.warning(self, "Error", "Set private key first!")
             return
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute("INSERT INTO pairs (inputMint, outputMint, amount, slippageBps, priorityFeeLamports) VALUES (?, ?, ?, ?, ?)",
-                  (inputMint, outputMint, int(amount), int(slippage), int(priority)))
-        conn.commit()
-        conn.close()
-        self.load_pairs()
-        self.console.append(f"Pair added: {inputMint} -> {outputMint} amount={amount}")
+        if not is_valid_mint(inputMint) or not is_valid_mint(outputMint):
+            QMessageBox.warning(self, "Error", "Invalid mint address!")
+            return
+        pair_id = self.store.add_pair(inputMint, outputMint, int(amount), int(slippage), int(priority))
+        if pair_id is None:
+            self.log_sink.warning(f"Pair already exists: {inputMint} -> {outputMint} amount={amount}")
+            return
+        self.pair_model.append_pair(self.store.get_pair(pair_id))
+        self.refresh_balances()
+        self.log_sink.info(f"Pair added: {inputMint} -> {outputMint} amount={amount}")
 
     def load_pairs(self):
-        # Отображаем пары как виджеты, а не как элементы списка
-        # Очищаем layout
-        while self.pair_layout.count():
-            item = self.pair_layout.takeAt(0)
-            widget = item.widget()
-            if widget:
-                widget.deleteLater()
-        self.pair_widgets = []
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        for row in c.execute("SELECT id, inputMint, outputMint, amount, slippageBps, priorityFeeLamports FROM pairs"):
-            widget = PairWidget(self.swap, row, parent=self.pair_container)
-            self.pair_widgets.append(widget)
-            self.pair_layout.addWidget(widget)
-        conn.close()
+        # Full reload only at startup and after an import, edits are incremental
+        self.pair_model.set_pairs(self.store.load_pairs())
+        self.refresh_balances()
+
+    def pairs_changed(self):
+        self.watch_pair_mints()
+        self.update_prefetch()
+        if self.fee_estimator is not None:
+            self.fee_estimator.set_accounts(self.pair_model.all_mints())
+        self.load_mints()
+
+    def start_worker(self, row, params, priority, label, sell_percent=None):
+        inputMint, outputMint, amount, slippage, fee = params
+        self.log_sink.info(label)
+        worker = Worker(
+            self.swap, inputMint, outputMint, amount, slippage, fee,
+            scheduler=self.scheduler, priority=priority,
+            pair_id=self.pair_model.pair(row)[0], sell_percent=sell_percent
+        )
+        worker.result_signal.connect(self.log_sink.info)
+        worker.finished.connect(lambda: self.workers.discard(worker))
+        self.workers.add(worker)
+        worker.start()
+
+    def trade_pair(self, row):
+        if not self.swap:
+            self.log_sink.warning("Set private key first!")
+            return
+        params = self.pair_model.swap_params(row)
+        inputMint, amount = params[0], params[2]
+        percent = None
+        if self.pair_model.is_sell(row):
+            # The amount is sized again from the balance at swap time
+            percent = self.pair_model.sell_percent.get(self.pair_model.pair(row)[0], 100)
+            label = f"Selling {percent}% of {inputMint} (~{amount})"
+        else:
+            label = f"Buying {amount} of {inputMint}"
+        self.start_worker(row, params, MANUAL_PRIORITY, label, sell_percent=percent)
+
+    def update_pair_balance(self, row):
+        mint = self.pair_model.pair(row)[1]
+        if not self.swap:
+            self.log_sink.warning("Set private key first!")
+            return
+        # Предыдущий запрос ещё идёт, не плодим новые
+        worker = self.pair_balance_workers.get(mint)
+        if worker is not None and worker.isRunning():
+            return
+        self.log_sink.debug(f"Getting balance for {mint}...")
+        worker = BalanceWorker(self.swap, mint)
+        worker.balance_signal.connect(self.pair_model.set_balance)
+        worker.error_signal.connect(self.log_sink.error)
+        worker.finished.connect(lambda: self.pair_balance_workers.pop(mint, None))
+        self.pair_balance_workers[mint] = worker
+        worker.start()
+
+    def delete_pair(self, row):
+        pair_id = self.pair_model.pair(row)[0]
+        self.store.delete_pair(pair_id)
+        self.pair_model.remove_row(row)
+        self.log_sink.info(f"Pair {pair_id} deleted.")
 
     def run_all_swaps(self):
-        # Останавливаем все предыдущие воркеры, если они есть
-        for widget in self.pair_widgets:
+        if not self.swap:
+            self.log_sink.warning("Set private key first!")
+            return
+        if self.pipeline_future is not None and not self.pipeline_future.done():
+            self.log_sink.warning("Previous Run All Swaps is still running")
+            return
+        # Все свапы уходят в общий engine loop одним конвейером
+        jobs = []
+        for row in range(self.pair_model.rowCount()):
             try:
-                if hasattr(widget, "worker") and widget.worker is not None and widget.worker.isRunning():
-                    widget.worker.quit()
-                    widget.worker.wait()
-                inputMint = widget.inputMint_edit.text().strip()
-                outputMint = widget.outputMint_edit.text().strip()
-                amount = int(widget.amount_edit.text())
-                slippage = int(widget.slippage_edit.text())
-                priority = int(widget.priority_edit.text())
-                # Учитываем процент продажи если есть
-                if hasattr(widget, "percent_edit"):
-                    try:
-                        percent = float(widget.percent_edit.text())
-                        amount = int(widget.current_balance * percent / 100)
-                    except Exception:
-                        percent = 100
-                self.console.append(
-                    f"Running swap: {inputMint} → {outputMint} | Amount: {amount} | Slippage: {slippage} | Priority: {priority}"
-                )
-                widget.worker = Worker(self.swap, inputMint, outputMint, amount, slippage, priority)
-                widget.worker.result_signal.connect(self.console.append)
-                widget.worker.finished.connect(widget.cleanup_worker)
-                widget.worker.start()
+                params = self.pair_model.swap_params(row)
             except Exception as e:
-                self.console.append(f"run_all_swaps error: {str(e)}")
+                self.log_sink.error(f"run_all_swaps error: {str(e)}")
+                continue
+            inputMint, outputMint, amount, slippage, priority = params
+            self.log_sink.info(f"Running swap: {inputMint} → {outputMint} | Amount: {amount} | Slippage: {slippage} | Priority: {priority}")
+            pair_id = self.pair_model.pair(row)[0]
+            job = (params, pair_id, self.pair_model.swap_priority(row))
+            if self.pair_model.is_sell(row):
+                # Sized from the balance when quoted, amount above is the guess
+                job += (self.pair_model.sell_percent.get(pair_id, 100),)
+            jobs.append(job)
+        log = self.engine_bridge.log_signal.emit
+        self.pipeline_future = ENGINE.submit(
+            self.pipeline.run(jobs, on_result=lambda pair_id, result: log(f"Pair {pair_id}: {result}"))
+        )
+
+    def cancel_swaps(self):
+        """Cancel every swap not executed yet; returns right away."""
+        workers = [w for w in self.workers if w.isRunning()]
+        for worker in workers:
+            worker.cancel()
+        running = self.pipeline_future is not None and not self.pipeline_future.done()
+        if running:
+            self.pipeline_future.cancel()
+        if workers or running:
+            self.log_sink.warning(f"Cancelling {len(workers)} swaps{' and Run All Swaps' if running else ''}")
 
     def update_balance(self):
         mint = self.inputMint_edit.text().strip()
-        self.console.append(f"Updating balance for {mint}...")
+        self.log_sink.debug(f"Updating balance for {mint}...")
         try:
             if not mint:
                 QMessageBox.warning(self, "Error", "Input Mint required!")
@@ -489,60 +645,167 @@ class MainWindow(QWidget):
             if not self.swap:
                 QMessageBox.warning(self, "Error", "Set private key first!")
                 return
-            # Безопасно останавливаем предыдущий поток
-            try:
-                if hasattr(self, "balance_worker") and self.balance_worker is not None and self.balance_worker.isRunning():
-                    self.balance_worker.quit()
-                    self.balance_worker.wait()
-            except Exception as e:
-                self.console.append(f"Thread stop error: {str(e)}")
-            self.console.append(f"Getting balance for {mint}...")
+            # Предыдущий запрос ещё идёт, не плодим новые
+            if hasattr(self, "balance_worker") and self.balance_worker is not None and self.balance_worker.isRunning():
+                return
+            self.log_sink.debug(f"Getting balance for {mint}...")
             self.balance_worker = BalanceWorker(self.swap, mint)
             self.balance_worker.balance_signal.connect(self.show_balance)
-            self.balance_worker.finished.connect(lambda: self.console.append(f"BalanceWorker for {mint} finished"))
+            self.balance_worker.error_signal.connect(self.log_sink.error)
+            self.balance_worker.finished.connect(lambda: self.log_sink.debug(f"BalanceWorker for {mint} finished"))
             self.balance_worker.start()
         except Exception as e:
-            self.console.append(f"Update balance error: {str(e)}")
+            self.log_sink.error(f"Update balance error: {str(e)}")
+
+    def toggle_prefetch(self, enabled):
+        if enabled:
+            self.start_prefetch()
+        else:
+            self.stop_prefetch()
+
+    def start_prefetch(self):
+        # Keeps /order responses warm so Run All Swaps only signs and executes
+        self.stop_prefetch()
+        if not self.swap or not self.prefetch_check.isChecked():
+            return
+        self.update_prefetch()
+        self.prefetch_future = ENGINE.submit(self.swap.keep_orders_warm())
+        self.log_sink.info("Quote prefetch started.")
+
+    def stop_prefetch(self):
+        if self.prefetch_future is not None:
+            self.prefetch_future.cancel()
+            self.prefetch_future = None
+            self.log_sink.info("Quote prefetch stopped.")
+
+    def toggle_monitor(self, enabled):
+        if enabled:
+            self.start_monitor()
+        else:
+            self.stop_monitor()
+
+    def start_monitor(self):
+        self.stop_monitor()
+        if not self.swap or not self.monitor_check.isChecked():
+            return
+        log = self.engine_bridge.log_signal.emit
+        monitor = QuoteMonitor(
+            self.swap, self.store, self.triggers,
+            sell_percent=lambda pair_id: self.pair_model.sell_percent.get(pair_id, 100),
+            min_interval=MONITOR_MIN_INTERVAL,
+            max_interval=MONITOR_MAX_INTERVAL,
+            rate_limiter=TokenBucket(MONITOR_RATE),
+            on_fire=lambda pair_id, kind, price, result: log(f"Pair {pair_id}: {kind} at {price:.6g}\n{result}"),
+            log=log
+        )
+        self.monitor_future = ENGINE.submit(monitor.run())
+        self.log_sink.info("Trigger monitor started.")
+
+    def stop_monitor(self):
+        if self.monitor_future is not None:
+            self.monitor_future.cancel()
+            self.monitor_future = None
+            self.log_sink.info("Trigger monitor stopped.")
+
+    def update_prefetch(self):
+        if not self.swap:
+            return
+        params = []
+        for row in range(self.pair_model.rowCount()):
+            try:
+                params.append(self.pair_model.swap_params(row))
+            except Exception:
+                continue
+        self.swap.set_prefetch_pairs(params)
+
+    def start_balance_stream(self):
+        self.stop_balance_stream()
+        if not self.swap:
+            return
+        from balance_stream import BalanceSubscriber
+        self.balance_stream = BalanceSubscriber(
+            self.swap,
+            on_balance=self.engine_bridge.balance_signal.emit,
+            on_status=self.engine_bridge.log_signal.emit
+        )
+        self.balance_stream.mints = set(self.pair_mints())
+        # Sells read current balances from the stream instead of the RPC
+        self.swap.balance_cache = self.balance_stream
+        ENGINE.submit(self.balance_stream.run())
+
+    def stop_balance_stream(self):
+        stream, self.balance_stream = self.balance_stream, None
+        if stream is None:
+            return
+        # The stream's own swap: set_private_key has already replaced self.swap
+        if stream.swap.balance_cache is stream:
+            stream.swap.balance_cache = None
+        # Never waits on the GUI thread, the socket is closed on the engine loop
+        ENGINE.submit(stream.stop()).add_done_callback(self._balance_stream_stopped)
+
+    def _balance_stream_stopped(self, future):
+        # Called on the engine thread
+        if not future.cancelled() and future.exception() is not None:
+            self.engine_bridge.log_signal.emit(f"Balance stream stop failed: {str(future.exception())}")
+
+    def pair_mints(self):
+        return self.pair_model.mints()
+
+    def watch_pair_mints(self):
+        if self.balance_stream is not None:
+            ENGINE.submit(self.balance_stream.update_mints(self.pair_mints()))
+
+    def on_stream_balance(self, mint, amount):
+        self.pair_model.set_balance(mint, amount)
+        self.update_prefetch()
+
+    def refresh_balances(self):
+        # One snapshot of the wallet, fanned out to every pair row
+        if not self.swap or not self.pair_model.rowCount():
+            return
+        # With a live stream polling is only a slow resync
+        if self.balance_stream is not None and self.balance_stream.connected:
+            if time.monotonic() - self.last_snapshot_at < 60:
+                return
+        if self.snapshot_worker is not None and self.snapshot_worker.isRunning():
+            return
+        self.snapshot_worker = SnapshotWorker(self.swap)
+        self.snapshot_worker.balances_signal.connect(self.fan_out_balances)
+        self.snapshot_worker.error_signal.connect(self.log_sink.error)
+        self.snapshot_worker.start()
+
+    def fan_out_balances(self, balances):
+        self.last_snapshot_at = time.monotonic()
+        self.pair_model.set_balances(balances)
+        self.update_prefetch()
 
     def show_balance(self, mint, amount):
-        self.console.append(f"Balance for {mint}: {amount}")
+        self.log_sink.info(f"Balance for {mint}: {amount}")
         self.amount_edit.setText(str(amount))
 
     def import_pairs(self):
-        # Пример формата:
-        # inputMint,outputMint,amount,slippageBps,priorityFeeLamports
+        # Пример формата (swapPriority необязателен):
+        # inputMint,outputMint,amount,slippageBps,priorityFeeLamports[,swapPriority]
         # So11111111111111111111111111111111111111112,EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v,10000,300,500000
         # JUPyiwrYJFskUPiHa7hkeR8VUtAeFoSYbKedZNsDvCN,So11111111111111111111111111111111111111112,5000,200,400000
         fname, _ = QFileDialog.getOpenFileName(self, "Import pairs from file", "", "Text Files (*.txt);;All Files (*)")
         if not fname:
             return
-        try:
-            with open(fname, "r") as f:
-                lines = f.readlines()
-            conn = sqlite3.connect(DB_PATH)
-            c = conn.cursor()
-            imported = 0
-            for line in lines:
-                line = line.strip()
-                if not line or line.startswith("#"):
-                    continue
-                parts = line.split(",")
-                if len(parts) < 5:
-                    self.console.append(f"Skipped line (wrong format): {line}")
-                    continue
-                inputMint, outputMint, amount, slippage, priority = parts[:5]
-                try:
-                    c.execute("INSERT INTO pairs (inputMint, outputMint, amount, slippageBps, priorityFeeLamports) VALUES (?, ?, ?, ?, ?)",
-                              (inputMint, outputMint, int(amount), int(slippage), int(priority)))
-                    imported += 1
-                except Exception as e:
-                    self.console.append(f"Import error: {str(e)}")
-            conn.commit()
-            conn.close()
-            self.load_pairs()
-            self.console.append(f"Imported {imported} pairs from {fname}")
-        except Exception as e:
-            self.console.append(f"Import failed: {str(e)}")
+        if self.import_worker is not None and self.import_worker.isRunning():
+            self.log_sink.warning("Import already running.")
+            return
+        # Импорт идёт в фоновом потоке, UI не блокируется
+        self.import_btn.setEnabled(False)
+        self.log_sink.info(f"Importing pairs from {fname}...")
+        self.import_worker = ImportWorker(self.store, fname)
+        self.import_worker.log_signal.connect(self.log_sink.info)
+        self.import_worker.done_signal.connect(self.import_finished)
+        self.import_worker.start()
+
+    def import_finished(self, fname, imported, duplicates, skipped):
+        self.import_btn.setEnabled(True)
+        self.load_pairs()
+        self.log_sink.info(f"Imported {imported} pairs from {fname} ({duplicates} duplicates, {skipped} skipped)")
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
@@ -0,0 +1,223 @@
+"""
+Timing spans, counters and histograms for JupSwap.
+
+    metrics = Metrics()
+    metrics.add_hook(lambda phase, seconds, labels, error: ...)
+    swap = JupSwap(private_key_str=pk, metrics=metrics)
+    print(metrics.to_prometheus())
+
+JupSwap defaults to NULL_METRICS, whose span() hands back one shared no-op
+object, so disabled instrumentation costs a method call per phase.
+"""
+import bisect
+import json
+import os
+import threading
+import time
+
+# Seconds, tuned for HTTP round trips and signing
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+PHASE_HISTOGRAM = "phase_seconds"
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Span:
+    __slots__ = ("metrics", "phase", "labels", "started")
+
+    def __init__(self, metrics, phase, labels):
+        self.metrics = metrics
+        self.phase = phase
+        self.labels = labels
+        self.started = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.record_span(self.phase, time.perf_counter() - self.started, self.labels, exc)
+        return False
+
+
+class Metrics:
+    enabled = True
+
+    def __init__(self, prefix: str = "jupswap", buckets=DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = buckets
+        self.counters = {}
+        self.histograms = {}
+        self.hooks = []
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook):
+        """hook(phase, seconds, labels, error) is called after every span."""
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+
+    def span(self, phase: str, **labels):
+        return Span(self, phase, labels)
+
+    def record_span(self, phase, seconds, labels, error=None):
+        self.observe(PHASE_HISTOGRAM, seconds, phase=phase, **labels)
+        if error is not None:
+            self.inc("phase_errors_total", phase=phase, **labels)
+        for hook in self.hooks:
+            try:
+                hook(phase, seconds, labels, error)
+            except Exception as e:
+                print(f"Metrics hook error: {str(e)}")
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in self.counters.items()
+                ],
+                "histograms": [
+                    {
+                        "name": name,
+                        "labels": dict(labels),
+                        "buckets": list(h.buckets),
+                        "counts": list(h.counts),
+                        "sum": h.sum,
+                        "count": h.count
+                    }
+                    for (name, labels), h in self.histograms.items()
+                ]
+            }
+
+    def to_json(self):
+        return json.dumps(self.snapshot())
+
+    def to_prometheus(self):
+        def fmt_labels(labels, extra=()):
+            items = list(labels) + list(extra)
+            if not items:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+        lines = []
+        with self._lock:
+            typed = set()
+            for (name, labels), value in sorted(self.counters.items()):
+                full = f"{self.prefix}_{name}"
+                if full not in typed:
+                    lines.append(f"# TYPE {full} counter")
+                    typed.add(full)
+                lines.append(f"{full}{fmt_labels(labels)} {value}")
+            for (name, labels), h in sorted(self.histograms.items()):
+                full = f"{self.prefix}_{name}"
+                if full not in typed:
+                    lines.append(f"# TYPE {full} histogram")
+                    typed.add(full)
+                cumulative = 0
+                for bound, count in zip(list(h.buckets) + ["+Inf"], h.counts):
+                    cumulative += count
+                    lines.append(f"{full}_bucket{fmt_labels(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{full}_sum{fmt_labels(labels)} {h.sum}")
+                lines.append(f"{full}_count{fmt_labels(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class NullMetrics:
+    """Drop-in for Metrics when instrumentation is off."""
+    enabled = False
+    _span = _NullSpan()
+
+    def span(self, phase, **labels):
+        return self._span
+
+    def inc(self, name, value=1, **labels):
+        pass
+
+    def observe(self, name, value, **labels):
+        pass
+
+    def add_hook(self, hook):
+        raise RuntimeError("Metrics are disabled, pass metrics=Metrics() to JupSwap")
+
+
+NULL_METRICS = NullMetrics()
+
+
+def write_metrics_file(metrics, path: str):
+    """Atomically write the metrics, JSON if the path ends in .json, else Prometheus text."""
+    text = metrics.to_json() if path.endswith(".json") else metrics.to_prometheus()
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+async def export_metrics_file(metrics, path: str, interval: float = 10):
+    """Rewrite `path` every `interval` seconds until cancelled (node_exporter textfile style)."""
+    import asyncio
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            write_metrics_file(metrics, path)
+    finally:
+        write_metrics_file(metrics, path)
+
+
+async def serve_metrics(metrics, host: str = "127.0.0.1", port: int = 9108):
+    """Start a /metrics (Prometheus) and /metrics.json endpoint. Returns the aiohttp runner to clean up."""
+    from aiohttp import web
+
+    async def prometheus(request):
+        return web.Response(text=metrics.to_prometheus(), content_type="text/plain")
+
+    async def as_json(request):
+        return web.Response(text=metrics.to_json(), content_type="application/json")
+
+    app = web.Application()
+    app.router.add_get("/metrics", prometheus)
+    app.router.add_get("/metrics.json", as_json)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
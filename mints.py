@@ -0,0 +1,225 @@
+"""
+Per-mint metadata shared by balance polling, the balance stream and the UI.
+
+    registry = MintRegistry(DB_PATH)
+    swap = JupSwap(private_key_str=pk, mint_registry=registry)
+    await registry.ensure(swap, mints)    # one getMultipleAccounts per 100 unknown mints
+    registry.ata(mint)                    # parsed once, derived once
+    registry.format_amount(mint, raw)     # "1.25 USDC"
+
+Decimals, symbol and token program are persisted in the `mints` table of
+pairs.db. The parsed Pubkey and the associated token account are derived
+on first use and kept in memory.
+"""
+import asyncio
+import json
+import sqlite3
+import time
+from storage import connect
+
+SOL_MINT = "So11111111111111111111111111111111111111112"
+
+# getMultipleAccounts takes at most this many addresses
+MAX_ACCOUNTS = 100
+
+# Mint accounts carry no symbol, these cover the common ones without Metaplex lookups
+KNOWN_SYMBOLS = {
+    SOL_MINT: "SOL",
+    "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v": "USDC",
+    "Es9vMFrzaCERmJfrF4H2FYD4KCoNkY11McCe8BenwNYB": "USDT",
+    "JUPyiwrYJFskUPiHa7hkeR8VUtAeFoSYbKedZNsDvCN": "JUP",
+}
+
+
+def init_mints(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS mints (
+            mint TEXT PRIMARY KEY,
+            decimals INTEGER,
+            symbol TEXT,
+            program TEXT,
+            owner TEXT,
+            ata TEXT,
+            updated_at REAL
+        )
+    """)
+    conn.commit()
+
+
+class MintInfo:
+    __slots__ = ("mint", "decimals", "symbol", "program", "owner", "_ata", "_pubkey", "_other_atas")
+
+    def __init__(self, mint, decimals=None, symbol=None, program=None, owner=None, ata=None):
+        self.mint = mint
+        self.decimals = decimals
+        self.symbol = symbol or KNOWN_SYMBOLS.get(mint)
+        self.program = program
+        self.owner = owner
+        self._ata = ata
+        self._pubkey = None
+        # ATAs of the other wallets of a wallets.WalletPool, memory only
+        self._other_atas = {}
+
+    @property
+    def pubkey(self):
+        if self._pubkey is None:
+            from solders.pubkey import Pubkey
+            self._pubkey = Pubkey.from_string(self.mint)
+        return self._pubkey
+
+    def ata_for(self, owner, primary: bool = True):
+        """
+        Associated token account of `owner` (a Pubkey), derived once per owner.
+        Only the primary wallet's ATA is stored in the table, other wallets
+        of a wallets.WalletPool are kept in memory.
+        """
+        owner_str = str(owner)
+        if not primary and owner_str != self.owner:
+            ata = self._other_atas.get(owner_str)
+            if ata is None:
+                ata = self._other_atas[owner_str] = self._derive(owner)
+            return ata
+        if self._ata is None or self.owner != owner_str:
+            self._ata = self._derive(owner)
+            self.owner = owner_str
+        elif isinstance(self._ata, str):
+            # Loaded from the table as text
+            from solders.pubkey import Pubkey
+            self._ata = Pubkey.from_string(self._ata)
+        return self._ata
+
+    def _derive(self, owner):
+        from solders.pubkey import Pubkey
+        from spl.token.constants import TOKEN_PROGRAM_ID
+        from spl.token.instructions import get_associated_token_address
+        # Not fetched by ensure() yet: assume the classic token program
+        program = Pubkey.from_string(self.program) if self.program else TOKEN_PROGRAM_ID
+        return get_associated_token_address(owner, self.pubkey, token_program_id=program)
+
+    def reset_atas(self):
+        """The token program changed, every ATA has to be derived again."""
+        self._ata = None
+        self._other_atas = {}
+
+
+def parse_mint_account(value):
+    """One getMultipleAccounts (jsonParsed) entry -> (decimals, symbol, program), or None."""
+    if not value:
+        return None
+    data = value.get("data")
+    if not isinstance(data, dict):
+        return None
+    info = (data.get("parsed") or {}).get("info") or {}
+    if "decimals" not in info:
+        return None
+    symbol = None
+    for extension in info.get("extensions") or []:
+        # Token-2022 mints can carry their metadata inline
+        if extension.get("extension") == "tokenMetadata":
+            symbol = (extension.get("state") or {}).get("symbol")
+    return int(info["decimals"]), symbol, value.get("owner")
+
+
+class MintRegistry:
+    """
+    In-memory map mint -> MintInfo, backed by the `mints` table when a
+    db_path is given (db_path=None keeps it in memory only).
+    """
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path
+        self.owner = None
+        self._mints = {}
+        if db_path:
+            conn = connect(db_path)
+            try:
+                init_mints(conn)
+                for mint, decimals, symbol, program, owner, ata, _ in conn.execute("SELECT * FROM mints"):
+                    self._mints[mint] = MintInfo(mint, decimals, symbol, program, owner, ata)
+            finally:
+                conn.close()
+
+    def get(self, mint: str):
+        info = self._mints.get(mint)
+        if info is None:
+            info = self._mints[mint] = MintInfo(mint, 9 if mint == SOL_MINT else None)
+        return info
+
+    def ata(self, mint: str, owner=None):
+        """Associated token account for `mint` of `owner`, by default the registry's own wallet."""
+        if owner is None or self.owner is None:
+            return self.get(mint).ata_for(owner or self.owner)
+        return self.get(mint).ata_for(owner, primary=str(owner) == str(self.owner))
+
+    def decimals(self, mint: str):
+        return self.get(mint).decimals
+
+    def missing(self, mints):
+        return [m for m in dict.fromkeys(mints) if m != SOL_MINT and self.get(m).decimals is None]
+
+    async def ensure(self, swap, mints):
+        """Fetch decimals/program for every mint not known yet, in bulk. Returns how many were added."""
+        missing = self.missing(mints)
+        if not missing:
+            return 0
+        chunks = [missing[i:i + MAX_ACCOUNTS] for i in range(0, len(missing), MAX_ACCOUNTS)]
+        results = await asyncio.gather(*(self._fetch(swap, chunk) for chunk in chunks), return_exceptions=True)
+        added = []
+        for chunk, values in zip(chunks, results):
+            # solders parse panics are BaseException, not Exception
+            if isinstance(values, BaseException):
+                print(f"getMultipleAccounts failed: {str(values)}")
+                continue
+            for mint, value in zip(chunk, values):
+                parsed = parse_mint_account(value)
+                if parsed is None:
+                    continue
+                info = self.get(mint)
+                info.decimals, symbol, info.program = parsed
+                info.symbol = symbol or info.symbol
+                info.reset_atas()
+                if self.owner is not None:
+                    info.ata_for(self.owner)  # derive now so the table has it too
+                added.append(info)
+        if added and self.db_path:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._save, added)
+        return len(added)
+
+    async def _fetch(self, swap, mints):
+        pubkeys = [self.get(m).pubkey for m in mints]
+        with swap.metrics.span("rpc_multiple_accounts"):
+            resp = await swap._rpc_call(lambda client: client.get_multiple_accounts_json_parsed(pubkeys))
+        if hasattr(resp, "to_json"):
+            resp = json.loads(resp.to_json())
+        return (resp.get("result") or {}).get("value") or []
+
+    def _save(self, infos):
+        now = time.time()
+        rows = []
+        for info in infos:
+            ata = info._ata
+            rows.append((info.mint, info.decimals, info.symbol, info.program, info.owner, str(ata) if ata else None, now))
+        conn = connect(self.db_path)
+        try:
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO mints VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        except sqlite3.Error as e:
+            print(f"Mint registry write failed: {str(e)}")
+        finally:
+            conn.close()
+
+    def format_amount(self, mint: str, raw: int):
+        """Raw amount -> "1.25 USDC"; raw digits if the decimals are not known yet."""
+        info = self.get(mint)
+        if info.decimals is None:
+            return str(raw)
+        # Integer math, a float loses digits on large raw amounts
+        raw = int(raw)
+        whole, fraction = divmod(abs(raw), 10 ** info.decimals)
+        text = f"{'-' if raw < 0 else ''}{whole:,}"
+        if info.decimals > 0:
+            fraction = f"{fraction:0{info.decimals}d}".rstrip("0")
+            if fraction:
+                text += f".{fraction}"
+        return f"{text} {info.symbol}" if info.symbol else text
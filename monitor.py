@@ -0,0 +1,319 @@
+"""
+Price triggers: poll /order for every pair that has one and execute the
+pair as soon as its price crosses the trigger.
+
+    triggers = TriggerStore(DB_PATH)
+    triggers.add(pair_id, "stop_loss", 0.85)
+    monitor = QuoteMonitor(swap, PairStore(DB_PATH), triggers, on_fire=...)
+    asyncio.ensure_future(monitor.run())
+
+Price is what the pair's /order gives: output tokens per 1 input token, in
+UI units (decimals from the mint registry).
+
+    take_profit  fires when price >= target
+    limit        fires when price >= target (a limit buy when input is SOL)
+    stop_loss    fires when price <= target
+
+The order that crossed the trigger is signed and executed right away, no
+second quote. Triggers are one-shot: once the swap is sent every trigger
+of that pair is disarmed, so a take-profit/stop-loss bracket closes as one.
+If nothing went out (quote expired, /execute failed) the triggers stay armed.
+Pairs are polled more often the closer their price is to a trigger.
+"""
+import asyncio
+import time
+from storage import DB_PATH, connect
+from order_cache import order_key
+from jup_swap import SOL_MINT, SwapTimeout, is_executable
+
+TRIGGER_KINDS = ("take_profit", "stop_loss", "limit")
+TRIGGER_COLUMNS = "id, pair_id, kind, price"
+
+
+def init_triggers(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS triggers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            pair_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            price REAL NOT NULL,
+            enabled INTEGER DEFAULT 1,
+            created_at REAL,
+            fired_at REAL,
+            fired_price REAL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS triggers_enabled ON triggers (pair_id) WHERE enabled=1")
+    conn.commit()
+
+
+def is_sent(result):
+    """True if a sign_and_execute result means the transaction went out (and may land)."""
+    if isinstance(result, SwapTimeout):
+        return result.phase == "execute"
+    return isinstance(result, str) and result.startswith("Succes")
+
+
+def is_triggered(kind: str, target: float, price: float):
+    if kind == "stop_loss":
+        return price <= target
+    return price >= target
+
+
+class TriggerStore:
+    """The triggers table of pairs.db; a short-lived connection per call, like MintRegistry."""
+
+    def __init__(self, db_path: str = DB_PATH):
+        self.db_path = db_path
+        conn = connect(db_path)
+        try:
+            init_triggers(conn)
+        finally:
+            conn.close()
+
+    def _execute(self, sql, args=()):
+        conn = connect(self.db_path)
+        try:
+            with conn:
+                cur = conn.execute(sql, args)
+                return cur.lastrowid, cur.fetchall()
+        finally:
+            conn.close()
+
+    def add(self, pair_id: int, kind: str, price: float):
+        """Returns the new trigger id."""
+        if kind not in TRIGGER_KINDS:
+            raise ValueError(f"unknown trigger kind {kind}, expected one of {', '.join(TRIGGER_KINDS)}")
+        if price <= 0:
+            raise ValueError("trigger price must be positive")
+        return self._execute(
+            "INSERT INTO triggers (pair_id, kind, price, created_at) VALUES (?, ?, ?, ?)",
+            (int(pair_id), kind, float(price), time.time())
+        )[0]
+
+    def load(self):
+        """Armed triggers as (id, pair_id, kind, price)."""
+        return self._execute(f"SELECT {TRIGGER_COLUMNS} FROM triggers WHERE enabled=1 ORDER BY id")[1]
+
+    def history(self, pair_id: int = None):
+        """Every trigger: (id, pair_id, kind, price, enabled, fired_at, fired_price)."""
+        sql = f"SELECT {TRIGGER_COLUMNS}, enabled, fired_at, fired_price FROM triggers"
+        if pair_id is not None:
+            return self._execute(sql + " WHERE pair_id=? ORDER BY id", (pair_id,))[1]
+        return self._execute(sql + " ORDER BY id")[1]
+
+    def fired(self, trigger_id: int, pair_id: int, price: float):
+        """Record the firing and disarm every trigger of the pair."""
+        conn = connect(self.db_path)
+        try:
+            with conn:
+                conn.execute(
+                    "UPDATE triggers SET fired_at=?, fired_price=? WHERE id=?",
+                    (time.time(), price, trigger_id)
+                )
+                conn.execute("UPDATE triggers SET enabled=0 WHERE pair_id=? AND enabled=1", (pair_id,))
+        finally:
+            conn.close()
+
+    def delete(self, trigger_id: int):
+        self._execute("DELETE FROM triggers WHERE id=?", (trigger_id,))
+
+
+class QuoteMonitor:
+    """
+    Polls each pair with armed triggers every min_interval..max_interval
+    seconds: min_interval within `near` (relative distance) of a trigger,
+    max_interval from 10x that distance on. Polls share in-flight /order
+    calls with keep_orders_warm and go through the swap's rate limiter,
+    plus the monitor's own `rate_limiter` if given, so monitoring cannot
+    take the whole Jupiter budget. Orders that did not trigger are left in
+    swap.orders for a manual swap of the same pair.
+    sell_percent(pair_id) sizes pairs that do not sell SOL from the wallet
+    balance of the round, like the Sell % column.
+    on_fire(pair_id, kind, price, result) is called after each execution.
+    """
+
+    def __init__(
+        self,
+        swap,
+        store,
+        triggers,
+        sell_percent=None,
+        min_interval: float = 1,
+        max_interval: float = 15,
+        near: float = 0.01,
+        concurrency: int = 4,
+        rate_limiter=None,
+        reload_interval: float = 5,
+        on_fire=None,
+        log=print
+    ):
+        self.swap = swap
+        self.store = store
+        self.triggers = triggers
+        self.sell_percent = sell_percent or (lambda pair_id: 100)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.near = near
+        self.concurrency = concurrency
+        self.rate_limiter = rate_limiter
+        self.reload_interval = reload_interval
+        self.on_fire = on_fire
+        self.log = log
+        self.prices = {}
+        self.polls = 0
+        self._pairs = {}
+        self._rules = {}
+        self._due = {}
+        self._firing = set()
+        # Fired trigger ids, in case a reload read them just before they were disarmed
+        self._spent = set()
+        self._fire_tasks = set()
+        self._loaded_at = 0
+
+    async def _reload(self):
+        loop = asyncio.get_running_loop()
+        pairs = await loop.run_in_executor(None, self.store.load_pairs)
+        rules = {}
+        for trigger in await loop.run_in_executor(None, self.triggers.load):
+            if trigger[0] in self._spent:
+                continue
+            rules.setdefault(trigger[1], []).append(trigger)
+        self._pairs = {p[0]: p for p in pairs if p[0] in rules}
+        self._rules = rules
+        self._due = {pid: self._due.get(pid, 0) for pid in self._pairs}
+        self._loaded_at = time.monotonic()
+        await self.swap.mint_registry.ensure(self.swap, [m for p in self._pairs.values() for m in (p[1], p[2])])
+
+    def price_of(self, order: dict):
+        """Output per 1 input in UI units, or None without amounts or decimals."""
+        inputMint, outputMint = order["_params"][:2]
+        in_amount = int(order.get("inAmount") or 0)
+        out_amount = int(order.get("outAmount") or 0)
+        registry = self.swap.mint_registry
+        in_decimals, out_decimals = registry.decimals(inputMint), registry.decimals(outputMint)
+        if not in_amount or in_decimals is None or out_decimals is None:
+            return None
+        return (out_amount / 10 ** out_decimals) / (in_amount / 10 ** in_decimals)
+
+    def next_interval(self, price: float, rules):
+        distance = min(abs(price - rule[3]) / rule[3] for rule in rules)
+        share = min(1.0, max(0.0, distance - self.near) / (self.near * 9))
+        return self.min_interval + (self.max_interval - self.min_interval) * share
+
+    def _amount(self, pair, balances):
+        pair_id, inputMint, _, amount = pair[:4]
+        if inputMint == SOL_MINT:
+            return int(amount)
+        return int(balances.get(inputMint, 0) * self.sell_percent(pair_id) / 100)
+
+    async def poll(self, pair, balances):
+        """Quote one pair and fire its first crossed trigger. Returns the price, or None."""
+        pair_id, inputMint, outputMint, _, slippage, fee = pair[:6]
+        amount = self._amount(pair, balances)
+        if amount <= 0:
+            return None
+        swap = self.swap
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire()
+        # Sells are sized from the round's balance snapshot; always a fresh
+        # quote, a cached order would show the same price until it expires
+        key = order_key(inputMint, outputMint, amount, slippage, fee)
+        with swap.metrics.span("monitor_quote"):
+            order = await swap.quotes.do(key, lambda: swap._quote(key))
+        self.polls += 1
+        if order.get("_claimed") or not is_executable(order):
+            return None
+        price = self.price_of(order)
+        if price is None:
+            return None
+        self.prices[pair_id] = price
+        rules = self._rules.get(pair_id, [])
+        for rule in rules:
+            if is_triggered(rule[2], rule[3], price):
+                order["_claimed"] = True
+                swap.orders.take(key)
+                self._firing.add(pair_id)
+                task = asyncio.ensure_future(self._fire(pair_id, rule, price, order))
+                # The loop only keeps a weak reference to running tasks
+                self._fire_tasks.add(task)
+                task.add_done_callback(self._fired)
+                return price
+        # Not this time: a manual click on the pair can still use it
+        swap.orders.put(key, order)
+        self._due[pair_id] = time.monotonic() + self.next_interval(price, rules)
+        return price
+
+    async def _fire(self, pair_id, rule, price, order):
+        swap = self.swap
+        trigger_id, _, kind, target = rule
+        rule_ids = {r[0] for r in self._rules.get(pair_id, [])}
+        # Out of the polling right away, a slow /execute must not let the next poll fire again
+        self._spent.update(rule_ids)
+        self._rules.pop(pair_id, None)
+        self._pairs.pop(pair_id, None)
+        swap.metrics.inc("triggers_fired_total", kind=kind)
+        self.log(f"Pair {pair_id}: {kind} at {price:.6g} (target {target:.6g}), executing")
+        loop = asyncio.get_running_loop()
+        try:
+            order["_deadline"] = time.monotonic() + swap.swap_timeout
+            result = await swap.sign_and_execute(order, pair_id=pair_id)
+        except asyncio.CancelledError:
+            # Stopped mid-swap: the transaction may be out, never fire it twice
+            self.triggers.fired(trigger_id, pair_id, price)
+            raise
+        except Exception as e:
+            result = e
+        finally:
+            self._firing.discard(pair_id)
+        if is_sent(result):
+            await loop.run_in_executor(None, self.triggers.fired, trigger_id, pair_id, price)
+        else:
+            # Nothing went out: the rules are still armed in the table, the next reload brings them back
+            swap.metrics.inc("triggers_rearmed_total", kind=kind)
+            self._spent -= rule_ids
+            self._loaded_at = 0
+        if self.on_fire is not None:
+            self.on_fire(pair_id, kind, price, result)
+        else:
+            self.log(f"Pair {pair_id}: {result}")
+
+    def _fired(self, task):
+        self._fire_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.log(f"Trigger execution failed: {str(task.exception())}")
+
+    async def run(self):
+        """Poll until cancelled. Trigger and pair edits are picked up every reload_interval seconds."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def one(pair, balances):
+            async with semaphore:
+                try:
+                    await self.poll(pair, balances)
+                except Exception as e:
+                    self.log(f"Monitor error for pair {pair[0]}: {str(e)}")
+                    self._due[pair[0]] = time.monotonic() + self.max_interval
+
+        while True:
+            if time.monotonic() - self._loaded_at > self.reload_interval:
+                try:
+                    await self._reload()
+                except Exception as e:
+                    self.log(f"Monitor reload failed: {str(e)}")
+            now = time.monotonic()
+            due = [p for pid, p in self._pairs.items() if self._due.get(pid, 0) <= now and pid not in self._firing]
+            if due:
+                for pair in due:
+                    # Until poll() sets the real one, e.g. after an error
+                    self._due[pair[0]] = now + self.max_interval
+                balances = {}
+                if any(p[1] != SOL_MINT for p in due):
+                    try:
+                        balances = await self.swap.get_all_balances()
+                    except Exception as e:
+                        # Sells are skipped this round
+                        self.log(f"Monitor balance read failed: {str(e)}")
+                await asyncio.gather(*(one(pair, balances) for pair in due))
+            wake = min(self._due.values(), default=time.monotonic() + self.reload_interval)
+            await asyncio.sleep(min(max(wake - time.monotonic(), 0.05), self.reload_interval))
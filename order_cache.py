@@ -0,0 +1,58 @@
+import time
+from collections import OrderedDict
+
+
+def order_key(inputMint, outputMint, amount, slippageBps, priorityFeeLamports):
+    return (inputMint, outputMint, int(amount), int(slippageBps), int(priorityFeeLamports))
+
+
+class OrderCache:
+    """
+    Small TTL + LRU cache of /order responses keyed by order_key(...).
+    An order carries a single-use requestId, so take() removes it.
+    """
+
+    def __init__(self, ttl: float = 20, max_size: int = 1000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._orders = OrderedDict()
+
+    def __len__(self):
+        return len(self._orders)
+
+    def age(self, key):
+        order = self._orders.get(key)
+        if order is None:
+            return None
+        return time.monotonic() - order["_fetched_at"]
+
+    def put(self, key, order):
+        self._orders[key] = order
+        self._orders.move_to_end(key)
+        self.evict()
+
+    def get(self, key):
+        age = self.age(key)
+        if age is None:
+            return None
+        if age > self.ttl:
+            del self._orders[key]
+            return None
+        self._orders.move_to_end(key)
+        return self._orders[key]
+
+    def take(self, key):
+        order = self.get(key)
+        if order is not None:
+            del self._orders[key]
+        return order
+
+    def evict(self):
+        now = time.monotonic()
+        for key in [k for k, o in self._orders.items() if now - o["_fetched_at"] > self.ttl]:
+            del self._orders[key]
+        while len(self._orders) > self.max_size:
+            self._orders.popitem(last=False)
+
+    def clear(self):
+        self._orders.clear()
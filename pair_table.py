@@ -0,0 +1,273 @@
+"""
+Model/view pair list for the GUI.
+
+PairTableModel holds the rows of the pairs table plus the live balances;
+QTableView only paints the rows on screen, so thousands of pairs cost one
+tuple each instead of a row of widgets. Edits are written to the PairStore
+as soon as a cell is committed.
+"""
+import sqlite3
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QEvent, pyqtSignal
+from PyQt5.QtWidgets import QApplication, QStyle, QStyledItemDelegate, QStyleOptionButton, QTableView, QHeaderView, QAbstractItemView
+from storage import is_valid_mint
+
+SOL_MINT = "So11111111111111111111111111111111111111112"
+
+# Row layout from PairStore.load_pairs
+ID, INPUT, OUTPUT, AMOUNT, SLIPPAGE, PRIORITY_FEE, SWAP_PRIORITY = range(7)
+
+COLUMNS = (
+    ("ID", ID),
+    ("Input Mint", INPUT),
+    ("Output Mint", OUTPUT),
+    ("Amount", AMOUNT),
+    ("Slippage", SLIPPAGE),
+    ("Priority Fee", PRIORITY_FEE),
+    ("Run Order", SWAP_PRIORITY),
+    ("Balance", None),
+    ("Last Swap", None),
+    ("Sell %", None),
+    ("", None),  # Buy / Sell
+    ("", None),  # Update balance
+    ("", None),  # Delete
+)
+COL_BALANCE, COL_STATUS, COL_PERCENT, COL_TRADE, COL_REFRESH, COL_DELETE = 7, 8, 9, 10, 11, 12
+
+
+class PairTableModel(QAbstractTableModel):
+    """Pairs from the store, with balances and Sell % kept alongside."""
+    log_signal = pyqtSignal(str)
+    # Rows added, removed or edited: mints to watch and prefetch params may differ
+    pairs_changed = pyqtSignal()
+
+    def __init__(self, store, parent=None, registry=None):
+        super().__init__(parent)
+        self.store = store
+        # mints.MintRegistry for decimals/symbols, raw amounts without it
+        self.registry = registry
+        self.rows = []
+        self.balances = {}
+        # pair id -> Sell %, not persisted, like the old per-row field
+        self.sell_percent = {}
+        # pair id -> confirmation status of its latest swap
+        self.statuses = {}
+
+    # Qt model interface
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return COLUMNS[section][0]
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        column = index.column()
+        field = COLUMNS[column][1]
+        if (field is not None and field != ID) or (column == COL_PERCENT and self.is_sell(index.row())):
+            flags |= Qt.ItemIsEditable
+        return flags
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self.rows[index.row()]
+        column = index.column()
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            field = COLUMNS[column][1]
+            if field is not None:
+                return row[field] if role == Qt.EditRole else str(row[field] if row[field] is not None else 0)
+            if column == COL_BALANCE:
+                balance = self.balances.get(row[INPUT])
+                if balance is None:
+                    return "..."
+                return self.registry.format_amount(row[INPUT], balance) if self.registry is not None else str(balance)
+            if column == COL_STATUS:
+                return self.statuses.get(row[ID], "")
+            if column == COL_PERCENT:
+                return str(self.sell_percent.get(row[ID], 100)) if self.is_sell(index.row()) else ""
+            if column == COL_TRADE:
+                return "Sell" if self.is_sell(index.row()) else "Buy"
+            if column == COL_REFRESH:
+                return "Update Balance"
+            if column == COL_DELETE:
+                return "Delete"
+        if role == Qt.ToolTipRole and column in (INPUT, OUTPUT):
+            return row[column]
+        if role == Qt.ToolTipRole and column == COL_BALANCE and row[INPUT] in self.balances:
+            return f"{self.balances[row[INPUT]]} raw"
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.EditRole or not index.isValid():
+            return False
+        row_no = index.row()
+        row = self.rows[row_no]
+        column = index.column()
+        value = str(value).strip()
+        try:
+            if column == COL_PERCENT:
+                self.sell_percent[row[ID]] = float(value)
+                self.dataChanged.emit(index, index)
+                self.pairs_changed.emit()
+                return True
+            field = COLUMNS[column][1]
+            if field in (INPUT, OUTPUT):
+                if not is_valid_mint(value):
+                    raise ValueError(f"invalid mint address {value}")
+            else:
+                value = int(value)
+        except ValueError as e:
+            self.log_signal.emit(f"Pair {row[ID]} not saved: {str(e)}")
+            return False
+        if row[field] == value:
+            return False
+        updated = list(row)
+        updated[field] = value
+        try:
+            self.store.update_pair(updated[ID], *updated[INPUT:SWAP_PRIORITY], swapPriority=updated[SWAP_PRIORITY])
+        except sqlite3.IntegrityError:
+            self.log_signal.emit(f"Pair {row[ID]} not saved: the same pair already exists.")
+            return False
+        self.rows[row_no] = tuple(updated)
+        self.log_signal.emit(f"Pair {row[ID]} updated.")
+        if field == INPUT:
+            # Buy/Sell, balance and Sell % all depend on the input mint
+            self.dataChanged.emit(self.index(row_no, 0), self.index(row_no, len(COLUMNS) - 1))
+        else:
+            self.dataChanged.emit(index, index)
+        self.pairs_changed.emit()
+        return True
+
+    # Rows
+
+    def set_pairs(self, pairs):
+        """Replace every row, for the first load and after a bulk import."""
+        self.beginResetModel()
+        self.rows = [tuple(p) for p in pairs]
+        ids = {p[ID] for p in self.rows}
+        self.sell_percent = {k: v for k, v in self.sell_percent.items() if k in ids}
+        self.endResetModel()
+        self.pairs_changed.emit()
+
+    def append_pair(self, pair):
+        position = len(self.rows)
+        self.beginInsertRows(QModelIndex(), position, position)
+        self.rows.append(tuple(pair))
+        self.endInsertRows()
+        self.pairs_changed.emit()
+
+    def remove_row(self, row_no: int):
+        pair_id = self.rows[row_no][ID]
+        self.beginRemoveRows(QModelIndex(), row_no, row_no)
+        del self.rows[row_no]
+        self.endRemoveRows()
+        self.sell_percent.pop(pair_id, None)
+        self.statuses.pop(pair_id, None)
+        self.pairs_changed.emit()
+
+    def pair(self, row_no: int):
+        return self.rows[row_no]
+
+    def is_sell(self, row_no: int):
+        return self.rows[row_no][INPUT] != SOL_MINT
+
+    def mints(self):
+        return {row[INPUT] for row in self.rows if row[INPUT]}
+
+    def all_mints(self):
+        """Input and output mints, the accounts the swaps touch."""
+        return {mint for row in self.rows for mint in (row[INPUT], row[OUTPUT]) if mint}
+
+    # Balances
+
+    def set_balance(self, mint, amount):
+        self.balances[mint] = amount
+        self._balances_changed()
+
+    def set_balances(self, balances):
+        """Wallet snapshot: mints missing from it have a zero balance."""
+        self.balances = {mint: balances.get(mint, 0) for mint in self.mints()}
+        self._balances_changed()
+
+    def refresh_balances(self):
+        """Redraw balances, e.g. once mint decimals arrive."""
+        self._balances_changed()
+
+    def _balances_changed(self):
+        self._column_changed(COL_BALANCE)
+
+    def _column_changed(self, column):
+        # One signal for the whole column, the view repaints only what is visible
+        if self.rows:
+            self.dataChanged.emit(self.index(0, column), self.index(len(self.rows) - 1, column))
+
+    def set_status(self, pair_id, status):
+        self.statuses[pair_id] = status
+        self._column_changed(COL_STATUS)
+
+    # Swaps
+
+    def swap_params(self, row_no: int):
+        """(inputMint, outputMint, amount, slippage, priority) as Run All Swaps would use them."""
+        row = self.rows[row_no]
+        amount = row[AMOUNT]
+        # Продажа считается от текущего баланса и Sell %
+        if self.is_sell(row_no):
+            percent = self.sell_percent.get(row[ID], 100)
+            amount = int(self.balances.get(row[INPUT], 0) * percent / 100)
+        return row[INPUT], row[OUTPUT], amount, row[SLIPPAGE], row[PRIORITY_FEE]
+
+    def swap_priority(self, row_no: int):
+        return int(self.rows[row_no][SWAP_PRIORITY] or 0)
+
+
+class ButtonDelegate(QStyledItemDelegate):
+    """Paints the cell text as a push button and emits clicked(row); no widget per row."""
+    clicked = pyqtSignal(int)
+
+    def paint(self, painter, option, index):
+        button = QStyleOptionButton()
+        button.rect = option.rect.adjusted(2, 2, -2, -2)
+        button.text = index.data() or ""
+        button.state = QStyle.State_Enabled | QStyle.State_Raised
+        QApplication.style().drawControl(QStyle.CE_PushButton, button, painter)
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.MouseButtonRelease and option.rect.contains(event.pos()):
+            self.clicked.emit(index.row())
+            return True
+        return event.type() in (QEvent.MouseButtonPress, QEvent.MouseButtonDblClick)
+
+
+class PairTableView(QTableView):
+    def __init__(self, model, parent=None):
+        super().__init__(parent)
+        self.setModel(model)
+        self.trade_delegate = ButtonDelegate(self)
+        self.refresh_delegate = ButtonDelegate(self)
+        self.delete_delegate = ButtonDelegate(self)
+        self.setItemDelegateForColumn(COL_TRADE, self.trade_delegate)
+        self.setItemDelegateForColumn(COL_REFRESH, self.refresh_delegate)
+        self.setItemDelegateForColumn(COL_DELETE, self.delete_delegate)
+        self.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.setEditTriggers(QAbstractItemView.DoubleClicked | QAbstractItemView.EditKeyPressed | QAbstractItemView.SelectedClicked)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        # Fixed row heights and column widths: no per-row size hints to compute
+        vertical = self.verticalHeader()
+        vertical.setSectionResizeMode(QHeaderView.Fixed)
+        vertical.setDefaultSectionSize(28)
+        vertical.hide()
+        header = self.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.Interactive)
+        for column, width in ((ID, 50), (INPUT, 180), (OUTPUT, 180), (AMOUNT, 90), (SLIPPAGE, 70),
+                              (PRIORITY_FEE, 90), (SWAP_PRIORITY, 70), (COL_BALANCE, 110), (COL_STATUS, 80), (COL_PERCENT, 55),
+                              (COL_TRADE, 60), (COL_REFRESH, 110), (COL_DELETE, 60)):
+            self.setColumnWidth(column, width)
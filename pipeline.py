@@ -0,0 +1,203 @@
+"""
+Staged quote -> sign -> execute pipeline for batch runs.
+
+    pipeline = SwapPipeline(swap, quote_concurrency=8, execute_concurrency=8)
+    results = await pipeline.run([(params, pair_id, priority), ...])
+
+params are (inputMint, outputMint, amount, slippageBps, priorityFeeLamports),
+like PairTableModel.swap_params(). A job may add a fourth item, the Sell %:
+the amount in params is then only the guess from the last balance snapshot
+and the order is sized from the balance at quote time. Every stage has its own workers and the
+stages are joined by bounded queues. While pair N waits for /execute, pair
+N+1 is already being quoted. When execution falls behind, the full queues
+stop the quoting, so orders do not pile up and go stale.
+"""
+import asyncio
+import time
+from jup_swap import is_executable
+
+
+class Job:
+    __slots__ = ("params", "pair_id", "priority", "percent", "future", "order")
+
+    def __init__(self, params, pair_id, priority, future, percent=None):
+        self.params = params
+        self.pair_id = pair_id
+        self.priority = priority or 0
+        self.percent = percent
+        self.future = future
+        self.order = None
+
+
+class SwapPipeline:
+    """
+    quote_concurrency workers call JupSwap.get_order (prefetched orders
+    are used as usual). The signing stage runs JupSwap.sign_order on the
+    loop, or hands orders to `signer` (wallets.SignerPool) with
+    sign_concurrency of them out at once, so signing runs in worker
+    processes. execute_concurrency workers POST to /execute. queue_size
+    bounds both hand-over queues. Higher priority jobs are quoted first.
+    Every order gets swap.swap_timeout seconds from the moment its quote
+    starts; whatever is still queued by then is dropped, not executed late.
+    on_result(pair_id, result) is called as each swap finishes, where
+    result is the message or the exception.
+    """
+
+    def __init__(
+        self,
+        swap,
+        quote_concurrency: int = 8,
+        execute_concurrency: int = 8,
+        queue_size: int = 16,
+        log=print,
+        signer=None,
+        sign_concurrency: int = None
+    ):
+        self.swap = swap
+        self.quote_concurrency = quote_concurrency
+        self.execute_concurrency = execute_concurrency
+        self.queue_size = queue_size
+        self.signer = signer
+        if sign_concurrency is None:
+            sign_concurrency = signer.workers if signer is not None else 1
+        self.sign_concurrency = sign_concurrency
+        self.log = log
+        self.running = False
+
+    async def run(self, jobs, on_result=None):
+        """
+        jobs: iterable of (params, pair_id, priority) or (params, pair_id,
+        priority, sell_percent). Results come back in input order.
+        """
+        loop = asyncio.get_running_loop()
+        items = [Job(job[0], job[1], job[2], loop.create_future(), *job[3:4]) for job in jobs]
+        if not items:
+            return []
+        if on_result is not None:
+            for job in items:
+                job.future.add_done_callback(lambda f, pid=job.pair_id: self._report(on_result, pid, f))
+
+        pending = asyncio.Queue()
+        # sorted() is stable, equal priorities keep input order
+        for job in sorted(items, key=lambda j: -j.priority):
+            pending.put_nowait(job)
+        to_sign = asyncio.Queue(self.queue_size)
+        to_execute = asyncio.Queue(self.queue_size)
+
+        quoters = [asyncio.ensure_future(self._quote_stage(pending, to_sign)) for _ in range(self.quote_concurrency)]
+        signers = [asyncio.ensure_future(self._sign_stage(to_sign, to_execute)) for _ in range(self.sign_concurrency)]
+        executors = [asyncio.ensure_future(self._execute_stage(to_execute)) for _ in range(self.execute_concurrency)]
+
+        async def close_stages():
+            # Each stage is told to stop once the one before it is done
+            await asyncio.gather(*quoters)
+            for _ in signers:
+                await to_sign.put(None)
+            await asyncio.gather(*signers)
+            for _ in executors:
+                await to_execute.put(None)
+
+        closer = asyncio.ensure_future(close_stages())
+        tasks = quoters + signers + executors + [closer]
+        started = time.monotonic()
+        self.running = True
+        try:
+            results = await asyncio.gather(*(job.future for job in items), return_exceptions=True)
+        finally:
+            self.running = False
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for job in items:
+                job.future.cancel()
+        elapsed = time.monotonic() - started
+        if self.log:
+            failed = sum(isinstance(r, Exception) for r in results)
+            self.log(f"Pipeline: {len(items)} swaps, {failed} failed, {elapsed:.2f}s ({len(items) / elapsed:.2f} swaps/s)")
+        return results
+
+    def _report(self, on_result, pair_id, future):
+        if future.cancelled():
+            return
+        error = future.exception()
+        try:
+            on_result(pair_id, error if error is not None else future.result())
+        except Exception as e:
+            self.log(f"Pipeline callback error: {str(e)}")
+
+    @staticmethod
+    def _fail(job, error):
+        if not job.future.done():
+            job.future.set_exception(error)
+
+    @staticmethod
+    def _finish(job, result):
+        if not job.future.done():
+            job.future.set_result(result)
+
+    async def _quote_stage(self, pending, to_sign):
+        swap = self.swap
+        while not pending.empty():
+            job = pending.get_nowait()
+            try:
+                deadline = time.monotonic() + swap.swap_timeout
+                with swap.metrics.span("pipeline_quote"):
+                    if job.percent is None:
+                        job.order = await swap.get_order(*job.params, deadline=deadline)
+                    else:
+                        inputMint, outputMint, guess, slippageBps, priorityFeeLamports = job.params
+                        job.order = await swap.get_order_for_percent(
+                            inputMint, outputMint, job.percent, slippageBps, priorityFeeLamports,
+                            guess=guess, deadline=deadline
+                        )
+            except Exception as e:
+                self._fail(job, e)
+                continue
+            if job.order is None:
+                self._finish(job, f"Nothing to sell: no {job.params[0]} in the wallet")
+                continue
+            if not is_executable(job.order):
+                self._finish(job, swap.no_order(job.order, job.pair_id))
+                continue
+            # Blocks while the signer and executors are behind
+            await to_sign.put(job)
+
+    async def _sign_stage(self, to_sign, to_execute):
+        swap = self.swap
+        while True:
+            job = await to_sign.get()
+            if job is None:
+                return
+            if swap.is_expired(job.order):
+                self._finish(job, swap.expired(job.order, job.pair_id))
+                continue
+            try:
+                with swap.metrics.span("pipeline_sign"):
+                    if self.signer is not None:
+                        await self.signer.sign(swap, job.order)
+                    else:
+                        swap.sign_order(job.order)
+            except Exception as e:
+                self._fail(job, e)
+                continue
+            await to_execute.put(job)
+            # Let the executors pick it up before the next signature
+            await asyncio.sleep(0)
+
+    async def _execute_stage(self, to_execute):
+        swap = self.swap
+        while True:
+            job = await to_execute.get()
+            if job is None:
+                return
+            try:
+                with swap.metrics.span("pipeline_execute"):
+                    if swap.is_stale(job.order):
+                        # Sat in the queues too long, sign_and_execute quotes again if time is left
+                        result = await swap.sign_and_execute(job.order, pair_id=job.pair_id)
+                    else:
+                        result = await swap.execute_order(job.order, pair_id=job.pair_id)
+            except Exception as e:
+                self._fail(job, e)
+                continue
+            self._finish(job, result)
@@ -0,0 +1,157 @@
+"""
+Fill reconciliation: what a landed swap actually spent and received.
+
+    reconciler = Reconciler(swap, journal)
+    done = await reconciler.run_pending()
+
+Signatures from the swap journal are fetched with getTransaction
+concurrently (bounded by `concurrency`), the token balances of each
+transaction are indexed by (accountIndex, owner, mint) in one pass, and
+only accounts owned by our wallet are counted, so pool and router
+accounts of the same mint never leak into the numbers. SOL is measured
+from the wallet's lamports plus any wSOL it owns, fee excluded.
+"""
+import asyncio
+import json
+import time
+
+SOL_MINT = "So11111111111111111111111111111111111111112"
+
+
+def transaction_json(resp):
+    """getTransaction response (solders object or parsed JSON) -> the `result` dict, or None."""
+    if resp is None:
+        return None
+    if hasattr(resp, "to_json"):
+        resp = json.loads(resp.to_json())
+    if isinstance(resp, dict) and "result" in resp:
+        return resp["result"]
+    return resp
+
+
+def account_keys(tx):
+    """Static keys then lookup-table keys, in accountIndex order."""
+    message = tx.get("transaction", {}).get("message", {})
+    keys = [k["pubkey"] if isinstance(k, dict) else k for k in message.get("accountKeys", [])]
+    loaded = (tx.get("meta") or {}).get("loadedAddresses") or {}
+    return keys + list(loaded.get("writable", [])) + list(loaded.get("readonly", []))
+
+
+def token_balance_index(meta):
+    """{(accountIndex, owner, mint): [pre, post]} over pre/postTokenBalances, one pass each."""
+    index = {}
+    for slot, field in ((0, "preTokenBalances"), (1, "postTokenBalances")):
+        for bal in meta.get(field) or []:
+            key = (bal.get("accountIndex"), bal.get("owner"), bal.get("mint"))
+            amounts = index.get(key)
+            if amounts is None:
+                amounts = index[key] = [0, 0]
+            amounts[slot] = int(bal["uiTokenAmount"]["amount"])
+    return index
+
+
+def balance_deltas(tx, owner: str):
+    """
+    Net change per mint for `owner` in one transaction, raw units.
+    SOL_MINT covers native lamports (fee added back when owner paid it)
+    plus wSOL accounts the owner holds. Returns (deltas, fee).
+    """
+    meta = tx.get("meta") or {}
+    deltas = {}
+    for (_, account_owner, mint), (pre, post) in token_balance_index(meta).items():
+        if account_owner == owner and post != pre:
+            deltas[mint] = deltas.get(mint, 0) + post - pre
+    fee = int(meta.get("fee") or 0)
+    keys = account_keys(tx)
+    if owner in keys:
+        i = keys.index(owner)
+        lamports = meta["postBalances"][i] - meta["preBalances"][i]
+        if i == 0:
+            lamports += fee  # the fee payer is always the first key
+        deltas[SOL_MINT] = deltas.get(SOL_MINT, 0) + lamports
+    return deltas, fee
+
+
+def fill_from_transaction(tx, owner: str, input_mint: str, output_mint: str):
+    """Journal fill columns for one swap transaction."""
+    deltas, fee = balance_deltas(tx, owner)
+    meta = tx.get("meta") or {}
+    err = meta.get("err")
+    return {
+        "spent_amount": max(0, -deltas.get(input_mint, 0)),
+        "received_amount": max(0, deltas.get(output_mint, 0)),
+        "fee_lamports": fee,
+        "slot": tx.get("slot"),
+        "block_time": tx.get("blockTime"),
+        "tx_error": json.dumps(err) if err is not None else None,
+        "reconciled_at": time.time()
+    }
+
+
+class Reconciler:
+    """
+    Reads executed swaps from a journal.SwapJournal, fetches their
+    transactions through JupSwap's RPC pool and writes the fills back.
+    A signature the node does not know yet stays pending until
+    `give_up_after` seconds after execution, then it is closed as missing.
+    """
+
+    def __init__(self, swap, journal, concurrency: int = 16, give_up_after: float = 600, log=print):
+        self.swap = swap
+        self.journal = journal
+        self.concurrency = concurrency
+        self.give_up_after = give_up_after
+        self.log = log
+
+    async def fetch_transaction(self, signature: str):
+        from solders.signature import Signature
+        sig = Signature.from_string(signature)
+        with self.swap.metrics.span("rpc_get_transaction"):
+            resp = await self.swap._rpc_call(
+                lambda client: client.get_transaction(sig, encoding="json", max_supported_transaction_version=0)
+            )
+        return transaction_json(resp)
+
+    async def reconcile(self, rows):
+        """
+        rows: (swap_id, signature, input_mint, output_mint, execute_returned_at, wallet).
+        Rows journaled before the wallet column count for this swap's wallet.
+        Returns the fills written.
+        """
+        default_owner = self.swap.wallet
+        semaphore = asyncio.Semaphore(self.concurrency)
+        now = time.time()
+
+        async def one(row):
+            swap_id, signature, input_mint, output_mint, executed_at, owner = row
+            async with semaphore:
+                try:
+                    tx = await self.fetch_transaction(signature)
+                except Exception as e:
+                    self.log(f"getTransaction failed for {signature}: {str(e)}")
+                    return None
+            if tx is None:
+                if executed_at is not None and now - executed_at > self.give_up_after:
+                    return {"swap_id": swap_id, "tx_error": "not found", "reconciled_at": now}
+                return None
+            fill = fill_from_transaction(tx, owner or default_owner, input_mint, output_mint)
+            fill["swap_id"] = swap_id
+            return fill
+
+        fills = [fill for fill in await asyncio.gather(*(one(row) for row in rows)) if fill]
+        if fills:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self.journal.record_fills, fills)
+        return fills
+
+    async def run_pending(self, limit: int = 1000):
+        """Reconcile everything the journal has not reconciled yet, `limit` swaps per round."""
+        loop = asyncio.get_running_loop()
+        total = []
+        after_id = 0
+        while True:
+            rows = await loop.run_in_executor(None, self.journal.unreconciled, limit, after_id)
+            if not rows:
+                return total
+            after_id = rows[-1][0]
+            total.extend(await self.reconcile(rows))
@@ -0,0 +1,178 @@
+import asyncio
+import time
+from collections import deque
+import httpx
+from solana.exceptions import SolanaRpcException
+from solana.rpc.async_api import AsyncClient
+from solana.rpc.core import RPCException
+from stats import percentile
+
+# Errors that say something about the endpoint. SolanaRpcException is how
+# solana-py wraps httpx errors. Anything else is the caller's own bug or a
+# parse failure and must not get a healthy node ejected.
+TRANSPORT_ERRORS = (httpx.HTTPError, SolanaRpcException, OSError, asyncio.TimeoutError)
+
+
+class RpcEndpoint:
+    """One RPC node with its client and rolling latency/error statistics."""
+
+    def __init__(self, url: str, window: int = 100):
+        self.url = url
+        self.client = None
+        self.latencies = deque(maxlen=window)
+        self.error_rate = 0.0
+        self.consecutive_errors = 0
+        self.ejected_until = 0
+
+    def get_client(self):
+        if self.client is None:
+            self.client = AsyncClient(self.url)
+        return self.client
+
+    def record_success(self, latency: float):
+        self.latencies.append(latency)
+        self.error_rate *= 0.9
+        self.consecutive_errors = 0
+
+    def record_error(self, latency: float):
+        self.latencies.append(latency)
+        self.error_rate = self.error_rate * 0.9 + 0.1
+        self.consecutive_errors += 1
+
+    def p95(self):
+        return percentile(self.latencies, 0.95)
+
+    def score(self):
+        # Lower is better. Unknown endpoints score as fast so they get tried.
+        median = percentile(self.latencies, 0.5) or 0.0
+        return median * (1 + 4 * self.error_rate)
+
+    async def close(self):
+        client, self.client = self.client, None
+        if client is not None:
+            await client.close()
+
+
+class RpcPool:
+    """
+    Several RPC endpoints behind one call(). Reads go to the endpoint with
+    the best rolling score and fail over to the next one on transport errors
+    (TRANSPORT_ERRORS); any other error is raised as is and not held against
+    the endpoint.
+    With hedge=True a second read is fired at the next-best endpoint if the
+    first one is slower than its own p95, and the first answer wins.
+    An endpoint with `eject_after` errors in a row is skipped for
+    `readmit_after` seconds and then given another chance.
+    """
+
+    def __init__(
+        self,
+        urls,
+        hedge: bool = False,
+        hedge_min_delay: float = 0.05,
+        hedge_default_delay: float = 0.3,
+        eject_after: int = 3,
+        readmit_after: float = 30
+    ):
+        if isinstance(urls, str):
+            urls = [urls]
+        self.endpoints = [RpcEndpoint(url) for url in urls]
+        if not self.endpoints:
+            raise ValueError("At least one RPC endpoint is required")
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_default_delay = hedge_default_delay
+        self.eject_after = eject_after
+        self.readmit_after = readmit_after
+        self.hedged_count = 0
+
+    def ranked(self):
+        now = time.monotonic()
+        healthy = []
+        for endpoint in self.endpoints:
+            if endpoint.ejected_until and endpoint.ejected_until <= now:
+                # Back on probation: one more error ejects it again
+                endpoint.ejected_until = 0
+                endpoint.consecutive_errors = self.eject_after - 1
+            if not endpoint.ejected_until:
+                healthy.append(endpoint)
+        if not healthy:
+            # Everything is down, better to try than to fail outright
+            healthy = list(self.endpoints)
+        return sorted(healthy, key=lambda e: e.score())
+
+    async def _attempt(self, endpoint, fn):
+        started = time.monotonic()
+        try:
+            result = await fn(endpoint.get_client())
+        except RPCException:
+            # The node answered, the request itself is bad
+            endpoint.record_success(time.monotonic() - started)
+            raise
+        except TRANSPORT_ERRORS:
+            endpoint.record_error(time.monotonic() - started)
+            if endpoint.consecutive_errors >= self.eject_after:
+                endpoint.ejected_until = time.monotonic() + self.readmit_after
+            raise
+        endpoint.record_success(time.monotonic() - started)
+        return result
+
+    def _hedge_delay(self, endpoint):
+        p95 = endpoint.p95()
+        if p95 is None or len(endpoint.latencies) < 10:
+            return self.hedge_default_delay
+        return max(self.hedge_min_delay, p95)
+
+    async def call(self, fn):
+        """fn(client) -> coroutine, e.g. lambda c: c.get_balance(pubkey)."""
+        candidates = self.ranked()
+        last_error = None
+        while candidates:
+            primary = candidates.pop(0)
+            if not (self.hedge and candidates):
+                try:
+                    return await self._attempt(primary, fn)
+                except TRANSPORT_ERRORS as e:
+                    last_error = e
+                    continue
+            secondary = candidates.pop(0)
+            tasks = [asyncio.ensure_future(self._attempt(primary, fn))]
+            try:
+                done, _ = await asyncio.wait(tasks, timeout=self._hedge_delay(primary))
+                if not done:
+                    self.hedged_count += 1
+                    tasks.append(asyncio.ensure_future(self._attempt(secondary, fn)))
+                pending = set(tasks)
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        if task.exception() is None:
+                            return task.result()
+                        if not isinstance(task.exception(), TRANSPORT_ERRORS):
+                            raise task.exception()
+                        last_error = task.exception()
+            finally:
+                for task in tasks:
+                    if not task.done():
+                        task.cancel()
+                    elif not task.cancelled():
+                        task.exception()  # mark as retrieved
+            if len(tasks) == 1:
+                # The hedge never fired, so the secondary is still untried
+                candidates.insert(0, secondary)
+        raise last_error
+
+    def stats(self):
+        return [
+            {
+                "url": e.url,
+                "p50": percentile(e.latencies, 0.5),
+                "p95": e.p95(),
+                "error_rate": round(e.error_rate, 3),
+                "ejected": bool(e.ejected_until)
+            }
+            for e in self.endpoints
+        ]
+
+    async def close(self):
+        await asyncio.gather(*(e.close() for e in self.endpoints), return_exceptions=True)
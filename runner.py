@@ -0,0 +1,405 @@
+"""
+Headless runner for the pairs in pairs.db, no PyQt involved.
+
+    python -m jup_swap run --db pairs.db
+    python -m jup_swap run --db pairs.db --daemon --interval 300
+    python -m jup_swap stats --db pairs.db
+    python -m jup_swap reconcile --db pairs.db
+    python -m jup_swap pnl --db pairs.db
+    python -m jup_swap trigger add 3 stop_loss 0.85
+    python -m jup_swap monitor --db pairs.db
+"""
+import argparse
+import asyncio
+import os
+import signal
+import time
+from jup_swap import JUPITER_URL, JupSwap, SOL_MINT
+from ratelimit import TokenBucket
+from wallets import WalletPool, read_keys
+from storage import DB_PATH, PairStore
+from journal import SwapJournal
+from metrics import Metrics, export_metrics_file, serve_metrics
+from reconcile import Reconciler
+from confirm import ConfirmationTracker
+from fee import PriorityFeeEstimator
+from mints import MintRegistry
+from monitor import TRIGGER_KINDS, QuoteMonitor, TriggerStore
+
+PK_PATH = "./private_key.txt"
+
+
+def log(msg):
+    print(f"[{time.strftime('%H:%M:%S')}] {msg}", flush=True)
+
+
+def read_private_key(path: str):
+    with open(path, "r") as f:
+        pk = f.read().strip()
+    if not pk:
+        raise SystemExit(f"Private key file {path} is empty")
+    return pk
+
+
+async def run_once(pool, store, sell_percent: float, **pipeline_kwargs):
+    pairs = store.load_pairs()
+    if not pairs:
+        log(f"No pairs in {store.db_path}")
+        return []
+    swap = pool.primary
+    if swap.fee_estimator is not None:
+        # One fee sample for the whole run, over every mint it touches
+        swap.fee_estimator.set_accounts(m for p in pairs for m in (p[1], p[2]))
+    # Decimals and ATAs for mints seen for the first time, one bulk lookup
+    registry = swap.mint_registry
+    await registry.ensure(swap, [m for p in pairs for m in (p[1], p[2])])
+    # Sells are sized from the wallet like the GUI does, one snapshot per wallet
+    balances = {}
+    if any(p[1] != SOL_MINT for p in pairs):
+        snapshots = await asyncio.gather(*(wallet.get_all_balances() for wallet in pool))
+        balances = dict(zip(pool, snapshots))
+
+    jobs = []
+    labels = []
+    for index, (pair_id, inputMint, outputMint, amount, slippage, priority, swap_priority) in enumerate(pairs):
+        wallet = pool.wallet_for(pair_id, index)
+        job = (wallet, (inputMint, outputMint, amount, slippage, priority), pair_id, swap_priority)
+        if inputMint != SOL_MINT:
+            amount = int(balances[wallet].get(inputMint, 0) * sell_percent / 100)
+            # The snapshot amount is a guess, the sell is sized again when quoted
+            job = (wallet, (inputMint, outputMint, amount, slippage, priority), pair_id, swap_priority, sell_percent)
+        if amount <= 0:
+            log(f"Pair {pair_id}: nothing to swap for {inputMint}, skipped")
+            continue
+        jobs.append(job)
+        label = f"Pair {pair_id}: {inputMint} → {outputMint} | Amount: {registry.format_amount(inputMint, amount)}"
+        if len(pool) > 1:
+            label += f" | Wallet: {wallet.wallet}"
+        labels.append(label)
+
+    # Per wallet: quotes for the next pairs overlap /execute of the earlier ones
+    results = await pool.run(jobs, **pipeline_kwargs)
+    for label, result in zip(labels, results):
+        log(f"{label}\n{result}")
+    return results
+
+
+async def run(args):
+    store = PairStore(args.db)
+    journal = SwapJournal(args.db)
+    metrics = Metrics() if (args.metrics_file or args.metrics_port) else None
+    keys = read_keys(args.wallets) if args.wallets else [read_private_key(args.key_file)]
+    signers = args.signers if args.signers is not None else (0 if len(keys) == 1 else None)
+    pool = WalletPool(
+        keys,
+        policy=args.shard,
+        signer_workers=signers,
+        log=log,
+        rpc_url=args.rpc or None,
+        rate_limiter=TokenBucket(args.rate),
+        hedge_reads=len(args.rpc or []) > 1,
+        journal=journal,
+        metrics=metrics,
+        mint_registry=MintRegistry(args.db),
+        jupiter_url=args.jupiter_url,
+        order_timeout=args.order_timeout,
+        execute_timeout=args.execute_timeout,
+        swap_timeout=args.swap_timeout
+    )
+    swap = pool.primary
+    pipeline_kwargs = dict(
+        quote_concurrency=args.concurrency, execute_concurrency=args.concurrency,
+        queue_size=args.queue_size or args.concurrency * 2
+    )
+    # Fee sample, confirmations and reconciliation are shared by every wallet
+    if args.auto_fee:
+        estimator = PriorityFeeEstimator(swap, percentile=args.fee_percentile / 100)
+        for wallet in pool:
+            wallet.fee_estimator = estimator
+    reconciler = Reconciler(swap, journal, log=log) if args.reconcile else None
+    tracker = None
+    if args.confirm:
+        tracker = ConfirmationTracker(
+            swap, journal=journal, log=log,
+            on_status=lambda sig, status, pair_id: log(f"Pair {pair_id}: {sig[:12]}... {status}")
+        )
+        for wallet in pool:
+            wallet.tracker = tracker
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: Ctrl+C still raises KeyboardInterrupt
+
+    background = []
+    if tracker is not None:
+        background.append(asyncio.ensure_future(tracker.run()))
+    if args.metrics_file:
+        background.append(asyncio.ensure_future(export_metrics_file(metrics, args.metrics_file)))
+    metrics_server = await serve_metrics(metrics, port=args.metrics_port) if args.metrics_port else None
+
+    try:
+        async with pool:
+            while True:
+                try:
+                    await run_once(pool, store, args.sell_percent, **pipeline_kwargs)
+                except Exception as e:
+                    log(f"Run failed: {str(e)}")
+                if tracker is not None and not args.daemon:
+                    if not await tracker.wait_settled(timeout=tracker.expire_after + 30):
+                        log(f"{tracker.outstanding} swaps still unconfirmed")
+                if reconciler is not None:
+                    # Picks up this run's swaps once they land, earlier ones right away
+                    try:
+                        fills = await reconciler.run_pending()
+                        if fills:
+                            log(f"Reconciled {len(fills)} swaps")
+                    except Exception as e:
+                        log(f"Reconcile failed: {str(e)}")
+                if not args.daemon:
+                    break
+                log(f"Next run in {args.interval}s")
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=args.interval)
+                    break
+                except asyncio.TimeoutError:
+                    pass
+    finally:
+        for task in background:
+            task.cancel()
+        await asyncio.gather(*background, return_exceptions=True)
+        if metrics_server is not None:
+            await metrics_server.cleanup()
+        journal.close()
+        store.close()
+    return 0
+
+
+def print_stats(args):
+    journal = SwapJournal(args.db)
+    since = time.time() - args.hours * 3600 if args.hours else None
+    try:
+        stats = journal.latency_stats(pair_id=args.pair, since=since)
+    finally:
+        journal.close()
+    if not stats:
+        print("No swaps recorded")
+        return 0
+
+    def ms(value):
+        return f"{value * 1000:8.0f}" if value is not None else "       -"
+
+    print(f"{'pair':>6} {'swaps':>6} {'quote p50':>10} {'quote p99':>10} {'exec p50':>10} {'exec p99':>10}  (ms)")
+    for pair_id, row in sorted(stats.items(), key=lambda item: (item[0] is None, item[0] or 0)):
+        print(
+            f"{str(pair_id):>6} {row['count']:>6} {ms(row['quote_p50']):>10} {ms(row['quote_p99']):>10} "
+            f"{ms(row['execute_p50']):>10} {ms(row['execute_p99']):>10}"
+        )
+    return 0
+
+
+async def reconcile(args):
+    journal = SwapJournal(args.db)
+    swap = JupSwap(private_key_str=read_private_key(args.key_file), rpc_url=args.rpc or None)
+    try:
+        async with swap:
+            fills = await Reconciler(swap, journal, concurrency=args.concurrency, log=log).run_pending()
+    finally:
+        journal.close()
+    failed = sum(1 for fill in fills if fill.get("tx_error"))
+    log(f"Reconciled {len(fills)} swaps ({failed} failed or not found)")
+    return 0
+
+
+async def monitor(args):
+    store = PairStore(args.db)
+    journal = SwapJournal(args.db)
+    swap = JupSwap(
+        private_key_str=read_private_key(args.key_file),
+        rpc_url=args.rpc or None,
+        rate_limiter=TokenBucket(args.rate),
+        hedge_reads=len(args.rpc or []) > 1,
+        journal=journal,
+        mint_registry=MintRegistry(args.db),
+        jupiter_url=args.jupiter_url
+    )
+    if args.auto_fee:
+        swap.fee_estimator = PriorityFeeEstimator(swap, percentile=args.fee_percentile / 100)
+    quote_monitor = QuoteMonitor(
+        swap, store, TriggerStore(args.db),
+        sell_percent=lambda pair_id: args.sell_percent,
+        min_interval=args.min_interval,
+        max_interval=args.max_interval,
+        rate_limiter=TokenBucket(args.poll_rate),
+        log=log
+    )
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+    log(f"Watching triggers in {args.db}")
+    try:
+        async with swap:
+            task = asyncio.ensure_future(quote_monitor.run())
+            await stop.wait()
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+    finally:
+        journal.close()
+        store.close()
+    log(f"{quote_monitor.polls} quotes polled")
+    return 0
+
+
+def manage_triggers(args):
+    triggers = TriggerStore(args.db)
+    if args.action == "add":
+        try:
+            trigger_id = triggers.add(args.pair, args.kind, args.price)
+        except ValueError as e:
+            raise SystemExit(str(e))
+        print(f"Trigger {trigger_id}: pair {args.pair} {args.kind} at {args.price}")
+    elif args.action == "delete":
+        triggers.delete(args.id)
+        print(f"Trigger {args.id} deleted")
+    else:
+        rows = triggers.history(args.pair)
+        if not rows:
+            print("No triggers")
+            return 0
+        print(f"{'id':>5s} {'pair':>6s} {'kind':12s} {'price':>14s} {'armed':>6s} {'fired at':>20s} {'fired price':>14s}")
+        for trigger_id, pair_id, kind, price, enabled, fired_at, fired_price in rows:
+            fired = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(fired_at)) if fired_at else "-"
+            fired_price = f"{fired_price:.6g}" if fired_price is not None else "-"
+            print(f"{trigger_id:5d} {pair_id:6d} {kind:12s} {price:14.6g} {'yes' if enabled else 'no':>6s} {fired:>20s} {fired_price:>14s}")
+    return 0
+
+
+def print_pnl(args):
+    journal = SwapJournal(args.db)
+    since = time.time() - args.hours * 3600 if args.hours else None
+    try:
+        rows = journal.pnl(pair_id=args.pair, since=since)
+    finally:
+        journal.close()
+    if not rows:
+        print("No reconciled swaps, run `python -m jup_swap reconcile` first")
+        return 0
+    print(f"{'pair':>6} {'swaps':>6} {'failed':>6} {'spent':>16} {'received':>16} {'fees (lamports)':>16}  input -> output")
+    for row in sorted(rows, key=lambda r: (r["pair_id"] is None, r["pair_id"] or 0)):
+        print(
+            f"{str(row['pair_id']):>6} {row['count']:>6} {row['failed']:>6} {row['spent']:>16} {row['received']:>16} "
+            f"{row['fees']:>16}  {row['input_mint']} -> {row['output_mint']}"
+        )
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m jup_swap", description="Headless Jupiter swap runner")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_cmd = commands.add_parser("run", help="execute every pair from the database")
+    run_cmd.add_argument("--db", default=DB_PATH, help="SQLite file with the pairs table")
+    run_cmd.add_argument("--key-file", default=PK_PATH, help="file with the base58 private key")
+    run_cmd.add_argument("--wallets", help="file with one base58 private key per line, pairs are spread over them")
+    run_cmd.add_argument("--shard", choices=("pair", "round_robin"), default="pair", help="how pairs are assigned to --wallets")
+    run_cmd.add_argument("--signers", type=int, help="signing processes, 0 signs on the event loop (default: 0 for one wallet, one per CPU otherwise)")
+    run_cmd.add_argument("--rpc", action="append", help="RPC endpoint, repeat for several")
+    run_cmd.add_argument("--jupiter-url", default=JUPITER_URL, help="Jupiter Ultra API base URL")
+    run_cmd.add_argument("--concurrency", type=int, default=8, help="quotes and executes in flight, each")
+    run_cmd.add_argument("--queue-size", type=int, help="signed orders waiting for /execute, default 2x --concurrency")
+    run_cmd.add_argument("--rate", type=float, default=10, help="max Jupiter requests per second")
+    run_cmd.add_argument("--order-timeout", type=float, default=10, help="seconds for /order, retries included")
+    run_cmd.add_argument("--execute-timeout", type=float, default=30, help="seconds for /execute, retries included")
+    run_cmd.add_argument("--swap-timeout", type=float, default=45, help="deadline of a swap from its quote; unsent orders are dropped after it")
+    run_cmd.add_argument("--sell-percent", type=float, default=100, help="share of the balance sold for non-SOL pairs")
+    run_cmd.add_argument("--daemon", action="store_true", help="keep running and repeat every --interval seconds")
+    run_cmd.add_argument("--interval", type=float, default=60, help="seconds between runs in daemon mode")
+    run_cmd.add_argument("--metrics-file", help="write metrics here every 10s (.json for JSON, else Prometheus text)")
+    run_cmd.add_argument("--metrics-port", type=int, help="serve /metrics on 127.0.0.1:PORT")
+    run_cmd.add_argument("--auto-fee", action="store_true", help="priority fee from recent network fees, capped by each pair's fee")
+    run_cmd.add_argument("--fee-percentile", type=float, default=75, help="percentile of recent fees used with --auto-fee")
+    run_cmd.add_argument("--confirm", action="store_true", help="track executed swaps until finalized, failed or expired")
+    run_cmd.add_argument("--reconcile", action="store_true", help="after every run, record the landed fills of executed swaps")
+
+    stats_cmd = commands.add_parser("stats", help="p50/p99 quote and execute latency per pair from the swap journal")
+    stats_cmd.add_argument("--db", default=DB_PATH, help="SQLite file with the swaps table")
+    stats_cmd.add_argument("--pair", type=int, help="only this pair id")
+    stats_cmd.add_argument("--hours", type=float, help="only swaps from the last N hours")
+
+    reconcile_cmd = commands.add_parser("reconcile", help="fetch landed transactions and record spent/received amounts")
+    reconcile_cmd.add_argument("--db", default=DB_PATH, help="SQLite file with the swaps table")
+    reconcile_cmd.add_argument("--key-file", default=PK_PATH, help="file with the base58 private key (wallet address)")
+    reconcile_cmd.add_argument("--rpc", action="append", help="RPC endpoint, repeat for several")
+    reconcile_cmd.add_argument("--concurrency", type=int, default=16, help="getTransaction calls in flight")
+
+    pnl_cmd = commands.add_parser("pnl", help="spent/received totals per pair from reconciled swaps")
+    pnl_cmd.add_argument("--db", default=DB_PATH, help="SQLite file with the swaps table")
+    pnl_cmd.add_argument("--pair", type=int, help="only this pair id")
+    pnl_cmd.add_argument("--hours", type=float, help="only swaps from the last N hours")
+
+    monitor_cmd = commands.add_parser("monitor", help="poll quotes and execute pairs whose price crosses a trigger")
+    monitor_cmd.add_argument("--db", default=DB_PATH, help="SQLite file with the pairs and triggers tables")
+    monitor_cmd.add_argument("--key-file", default=PK_PATH, help="file with the base58 private key")
+    monitor_cmd.add_argument("--rpc", action="append", help="RPC endpoint, repeat for several")
+    monitor_cmd.add_argument("--jupiter-url", default=JUPITER_URL, help="Jupiter Ultra API base URL")
+    monitor_cmd.add_argument("--rate", type=float, default=10, help="max Jupiter requests per second, executions included")
+    monitor_cmd.add_argument("--poll-rate", type=float, default=4, help="max /order polls per second")
+    monitor_cmd.add_argument("--min-interval", type=float, default=1, help="seconds between polls of a pair near its trigger")
+    monitor_cmd.add_argument("--max-interval", type=float, default=15, help="seconds between polls of a pair far from its trigger")
+    monitor_cmd.add_argument("--sell-percent", type=float, default=100, help="share of the balance sold for non-SOL pairs")
+    monitor_cmd.add_argument("--auto-fee", action="store_true", help="priority fee from recent network fees, capped by each pair's fee")
+    monitor_cmd.add_argument("--fee-percentile", type=float, default=75, help="percentile of recent fees used with --auto-fee")
+
+    trigger_cmd = commands.add_parser("trigger", help="add, list or delete price triggers")
+    trigger_cmd.add_argument("--db", default=DB_PATH, help="SQLite file with the triggers table")
+    actions = trigger_cmd.add_subparsers(dest="action", required=True)
+    add_cmd = actions.add_parser("add", help="arm a trigger; price is output tokens per 1 input token")
+    add_cmd.add_argument("pair", type=int, help="pair id")
+    add_cmd.add_argument("kind", choices=TRIGGER_KINDS)
+    add_cmd.add_argument("price", type=float)
+    list_cmd = actions.add_parser("list", help="all triggers, fired ones included")
+    list_cmd.add_argument("--pair", type=int, help="only this pair id")
+    delete_cmd = actions.add_parser("delete", help="remove a trigger")
+    delete_cmd.add_argument("id", type=int, help="trigger id")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "run":
+        key_file = args.wallets or args.key_file
+        if not os.path.exists(key_file):
+            raise SystemExit(f"Private key file {key_file} not found")
+        try:
+            return asyncio.run(run(args))
+        except KeyboardInterrupt:
+            return 130
+    if args.command == "stats":
+        return print_stats(args)
+    if args.command == "reconcile":
+        if not os.path.exists(args.key_file):
+            raise SystemExit(f"Private key file {args.key_file} not found")
+        return asyncio.run(reconcile(args))
+    if args.command == "pnl":
+        return print_pnl(args)
+    if args.command == "monitor":
+        if not os.path.exists(args.key_file):
+            raise SystemExit(f"Private key file {args.key_file} not found")
+        try:
+            return asyncio.run(monitor(args))
+        except KeyboardInterrupt:
+            return 130
+    if args.command == "trigger":
+        return manage_triggers(args)
+    return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
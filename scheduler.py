@@ -0,0 +1,108 @@
+import asyncio
+import itertools
+import time
+
+
+class SwapScheduler:
+    """
+    Runs swap coroutines with at most `max_in_flight` at once.
+    Jobs are zero-argument coroutine functions; higher priority runs first,
+    equal priorities keep submit order. Queue depth and throughput are
+    reported through `log` every `report_interval` seconds while busy.
+    Rate limiting and 429/5xx retries happen inside JupSwap, see
+    JupSwap(rate_limiter=..., max_retries=...).
+    """
+
+    def __init__(self, max_in_flight: int = 8, log=print, report_interval: float = 5, swap=None):
+        self.max_in_flight = max_in_flight
+        self.log = log
+        self.report_interval = report_interval
+        self.swap = swap
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self._queue = None
+        self._workers = []
+        self._reporter = None
+        self._seq = itertools.count()
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _ensure_started(self):
+        if self._workers:
+            return
+        self._queue = asyncio.PriorityQueue()
+        self._workers = [asyncio.ensure_future(self._worker()) for _ in range(self.max_in_flight)]
+        if self.log and self.report_interval:
+            self._reporter = asyncio.ensure_future(self._report())
+
+    async def submit(self, factory, priority: int = 0):
+        """Queue a job and wait for its result."""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((-priority, next(self._seq), factory, future))
+        return await future
+
+    async def run(self, jobs):
+        """jobs: iterable of (factory, priority). Results come back in input order."""
+        return await asyncio.gather(
+            *(self.submit(factory, priority) for factory, priority in jobs),
+            return_exceptions=True
+        )
+
+    async def _worker(self):
+        while True:
+            _, _, factory, future = await self._queue.get()
+            if future.cancelled():
+                self._queue.task_done()
+                continue
+            self.in_flight += 1
+            # Cancelling the submitter (e.g. Worker.cancel()) cancels the running job too
+            task = asyncio.ensure_future(factory())
+            future.add_done_callback(lambda f, t=task: t.cancel() if f.cancelled() else None)
+            try:
+                await asyncio.wait((task,))
+            except asyncio.CancelledError:
+                # close(): the worker itself is going away
+                task.cancel()
+                future.cancel()
+                raise
+            finally:
+                self.in_flight -= 1
+                self.completed += 1
+                self._queue.task_done()
+            if task.cancelled():
+                future.cancel()
+            elif task.exception() is not None:
+                self.failed += 1
+                if not future.done():
+                    future.set_exception(task.exception())
+            elif not future.done():
+                future.set_result(task.result())
+
+    async def _report(self):
+        last_completed = self.completed
+        last_time = time.monotonic()
+        while True:
+            await asyncio.sleep(self.report_interval)
+            now = time.monotonic()
+            done = self.completed - last_completed
+            if done or self.queue_depth or self.in_flight:
+                rate = done / (now - last_time)
+                retries = getattr(self.swap, "retry_count", 0)
+                self.log(
+                    f"Scheduler: queue={self.queue_depth} in_flight={self.in_flight} "
+                    f"done={self.completed} failed={self.failed} retries={retries} {rate:.2f} swaps/s"
+                )
+            last_completed = self.completed
+            last_time = now
+
+    async def close(self):
+        tasks = self._workers + ([self._reporter] if self._reporter else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._reporter = None
@@ -0,0 +1,69 @@
+import asyncio
+import time
+
+
+class SingleFlight:
+    """
+    Concurrent calls with the same key share one in-flight coroutine, and
+    its result is served from cache for `ttl` seconds afterwards.
+    invalidate() drops cached results and detaches in-flight calls, so the
+    next caller after e.g. our own swap starts a fresh request.
+    Errors are shared with whoever is waiting but never cached.
+    """
+
+    def __init__(self, ttl: float = 0, metrics=None, name: str = "singleflight"):
+        self.ttl = ttl
+        self.metrics = metrics
+        self.name = name
+        self._inflight = {}
+        self._results = {}
+
+    def _count(self, key, result):
+        if self.metrics is not None:
+            self.metrics.inc(f"{self.name}_total", kind=key[0] if isinstance(key, tuple) else key, result=result)
+
+    def inflight(self, key):
+        """The task currently running for `key`, or None."""
+        task = self._inflight.get(key)
+        return task if task is not None and not task.done() else None
+
+    async def do(self, key, fn, ttl: float = None):
+        """fn() -> coroutine; run it once for everyone asking for `key` right now."""
+        ttl = self.ttl if ttl is None else ttl
+        if ttl:
+            cached = self._results.get(key)
+            if cached is not None and time.monotonic() - cached[1] < ttl:
+                self._count(key, "cached")
+                return cached[0]
+        task = self.inflight(key)
+        if task is not None:
+            self._count(key, "joined")
+            return await asyncio.shield(task)
+        self._count(key, "miss")
+        task = asyncio.ensure_future(fn())
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._finished(key, t, ttl))
+        return await asyncio.shield(task)
+
+    def _finished(self, key, task, ttl):
+        # Retrieve the error even if every waiter is gone
+        failed = task.cancelled() or task.exception() is not None
+        if self._inflight.get(key) is not task:
+            return  # invalidated while running, don't cache a stale answer
+        del self._inflight[key]
+        if ttl and not failed:
+            self._results[key] = (task.result(), time.monotonic())
+
+    def invalidate(self, match=None):
+        """Forget everything, or only keys for which match(key) is true."""
+        if match is None:
+            self._results.clear()
+            self._inflight.clear()
+            return
+        for store in (self._results, self._inflight):
+            for key in [k for k in store if match(k)]:
+                del store[key]
+
+    def clear(self):
+        self._results.clear()
+        self._inflight.clear()
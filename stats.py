@@ -0,0 +1,7 @@
+def percentile(values, q: float):
+    """Nearest-rank percentile of `values` for q in [0, 1], None if empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))
+    return ordered[index]
@@ -0,0 +1,172 @@
+import csv
+import sqlite3
+import threading
+from functools import lru_cache
+
+DB_PATH = "./pairs.db"
+
+PAIR_COLUMNS = "id, inputMint, outputMint, amount, slippageBps, priorityFeeLamports, swapPriority"
+# A pair is the same pair if all of its swap parameters match
+PAIR_KEY = "inputMint, outputMint, amount, slippageBps, priorityFeeLamports"
+
+INSERT_PAIR = (
+    "INSERT OR IGNORE INTO pairs (inputMint, outputMint, amount, slippageBps, priorityFeeLamports, swapPriority) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+
+B58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+B58_INDEX = {ch: i for i, ch in enumerate(B58_ALPHABET)}
+
+
+@lru_cache(maxsize=65536)
+def is_valid_mint(mint: str):
+    """True if `mint` is base58 that decodes to exactly 32 bytes (a pubkey)."""
+    if not 32 <= len(mint) <= 44:
+        return False
+    n = 0
+    for ch in mint:
+        index = B58_INDEX.get(ch)
+        if index is None:
+            return False
+        n = n * 58 + index
+    leading_zeros = len(mint) - len(mint.lstrip("1"))
+    return leading_zeros + (n.bit_length() + 7) // 8 == 32
+
+
+def connect(db_path: str = DB_PATH):
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def init_db(conn):
+    c = conn.cursor()
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS pairs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            inputMint TEXT,
+            outputMint TEXT,
+            amount INTEGER,
+            slippageBps INTEGER,
+            priorityFeeLamports INTEGER
+        )
+    """)
+    # Older databases: add the run order column for the scheduler
+    columns = [row[1] for row in c.execute("PRAGMA table_info(pairs)")]
+    if "swapPriority" not in columns:
+        c.execute("ALTER TABLE pairs ADD COLUMN swapPriority INTEGER DEFAULT 0")
+    indexes = [row[1] for row in c.execute("PRAGMA index_list(pairs)")]
+    if "pairs_unique" not in indexes:
+        # Drop duplicates left by earlier imports before the index can exist
+        c.execute(f"DELETE FROM pairs WHERE id NOT IN (SELECT MIN(id) FROM pairs GROUP BY {PAIR_KEY})")
+        c.execute(f"CREATE UNIQUE INDEX pairs_unique ON pairs ({PAIR_KEY})")
+    conn.commit()
+
+
+def parse_pair_row(parts):
+    """
+    CSV fields -> insert tuple, or raises ValueError with the reason.
+    Format: inputMint,outputMint,amount,slippageBps,priorityFeeLamports[,swapPriority]
+    """
+    if len(parts) < 5:
+        raise ValueError("wrong format")
+    inputMint, outputMint = parts[0].strip(), parts[1].strip()
+    if not is_valid_mint(inputMint):
+        raise ValueError(f"bad input mint {inputMint}")
+    if not is_valid_mint(outputMint):
+        raise ValueError(f"bad output mint {outputMint}")
+    swap_priority = parts[5] if len(parts) > 5 and parts[5].strip() else 0
+    return (inputMint, outputMint, int(parts[2]), int(parts[3]), int(parts[4]), int(swap_priority))
+
+
+class PairStore:
+    """
+    The pairs table behind one long-lived WAL connection.
+    The GUI and the headless runner both go through this. Calls are
+    serialized with a lock, so one store can be shared between threads.
+    """
+
+    def __init__(self, db_path: str = DB_PATH):
+        self.db_path = db_path
+        self.conn = connect(db_path)
+        self._lock = threading.RLock()
+        with self._lock:
+            init_db(self.conn)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def load_pairs(self):
+        """All pairs as (id, inputMint, outputMint, amount, slippageBps, priorityFeeLamports, swapPriority)."""
+        with self._lock:
+            return list(self.conn.execute(f"SELECT {PAIR_COLUMNS} FROM pairs ORDER BY id"))
+
+    def get_pair(self, pair_id: int):
+        with self._lock:
+            return self.conn.execute(f"SELECT {PAIR_COLUMNS} FROM pairs WHERE id=?", (pair_id,)).fetchone()
+
+    def add_pair(self, inputMint, outputMint, amount, slippageBps, priorityFeeLamports, swapPriority=0):
+        """Returns the new pair id, or None if the same pair already exists."""
+        with self._lock, self.conn:
+            cur = self.conn.execute(INSERT_PAIR, (inputMint, outputMint, int(amount), int(slippageBps), int(priorityFeeLamports), int(swapPriority)))
+            return cur.lastrowid if cur.rowcount else None
+
+    def update_pair(self, pair_id, inputMint, outputMint, amount, slippageBps, priorityFeeLamports, swapPriority=None):
+        # Raises sqlite3.IntegrityError if the edit makes it a duplicate
+        sql = "UPDATE pairs SET inputMint=?, outputMint=?, amount=?, slippageBps=?, priorityFeeLamports=?"
+        args = [inputMint, outputMint, int(amount), int(slippageBps), int(priorityFeeLamports)]
+        if swapPriority is not None:
+            sql += ", swapPriority=?"
+            args.append(int(swapPriority))
+        with self._lock, self.conn:
+            self.conn.execute(sql + " WHERE id=?", args + [pair_id])
+
+    def delete_pair(self, pair_id: int):
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM pairs WHERE id=?", (pair_id,))
+
+    def import_pairs(self, path: str, batch_size: int = 5000, on_skip=None, on_progress=None):
+        """
+        Stream a CSV file of pairs into the table in one transaction.
+        Rows are validated as they are read and inserted with executemany in
+        batches; duplicates are ignored by the unique index. Uses its own
+        connection, so the store stays readable while a big file imports.
+        Returns (imported, duplicates, skipped).
+        """
+        conn = connect(self.db_path)
+        imported = duplicates = skipped = 0
+        try:
+            with open(path, "r", newline="") as f, conn:
+                batch = []
+                for line_no, parts in enumerate(csv.reader(f), 1):
+                    if not parts or not "".join(parts).strip() or parts[0].lstrip().startswith("#"):
+                        continue
+                    try:
+                        batch.append(parse_pair_row(parts))
+                    except ValueError as e:
+                        skipped += 1
+                        if on_skip:
+                            on_skip(f"Skipped line {line_no} ({e}): {','.join(parts)}")
+                        continue
+                    if len(batch) >= batch_size:
+                        added = self._insert_batch(conn, batch)
+                        imported += added
+                        duplicates += len(batch) - added
+                        batch = []
+                        if on_progress:
+                            on_progress(imported)
+                if batch:
+                    added = self._insert_batch(conn, batch)
+                    imported += added
+                    duplicates += len(batch) - added
+        finally:
+            conn.close()
+        return imported, duplicates, skipped
+
+    @staticmethod
+    def _insert_batch(conn, batch):
+        before = conn.total_changes
+        conn.executemany(INSERT_PAIR, batch)
+        return conn.total_changes - before
@@ -0,0 +1,92 @@
+import asyncio
+import time
+from solders.keypair import Keypair
+from balance_stream import BalanceSubscriber
+from jup_swap import JupSwap, SOL_MINT
+from stub_servers import RpcStub, start_app
+
+USDC_MINT = "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v"
+
+
+async def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def run_stream(body, **stream_kwargs):
+    """Start an RpcStub and a BalanceSubscriber for SOL and USDC on it, run body(rpc, swap, stream, seen)."""
+    async def run():
+        rpc = RpcStub(tokens={USDC_MINT: 25_000_000})
+        rpc_url, runner = await start_app(rpc.app())
+        swap = JupSwap(private_key_str=str(Keypair()), rpc_url=rpc_url)
+        seen = []
+        stream = BalanceSubscriber(
+            swap, on_balance=lambda mint, amount: seen.append((mint, amount)), reconnect_delay=0.05, **stream_kwargs
+        )
+        stream.mints = {SOL_MINT, USDC_MINT}
+        swap.balance_cache = stream
+        task = asyncio.ensure_future(stream.run())
+        try:
+            return await body(rpc, swap, stream, seen)
+        finally:
+            await stream.stop()
+            await asyncio.wait_for(task, 5)
+            await swap.close()
+            await runner.cleanup()
+    return asyncio.run(run())
+
+
+def test_resubscribes_and_reseeds_after_a_drop():
+    async def body(rpc, swap, stream, seen):
+        wallet = str(swap.pubkey)
+        # Subscribed and seeded from one RPC read per account
+        await wait_for(lambda: stream.cached(SOL_MINT) == 5_000_000_000 and stream.cached(USDC_MINT) == 25_000_000)
+        assert rpc.calls["accountSubscribe"] == 2
+        assert (SOL_MINT, 5_000_000_000) in seen
+
+        await rpc.notify(wallet, rpc.lamports_account(4_000_000_000))
+        await wait_for(lambda: stream.cached(SOL_MINT) == 4_000_000_000)
+        assert seen[-1] == (SOL_MINT, 4_000_000_000)
+        # Sized from the stream, no RPC read
+        reads = rpc.calls.get("getBalance", 0)
+        assert await swap.balance_of(SOL_MINT) == 4_000_000_000
+        assert rpc.calls.get("getBalance", 0) == reads
+
+        # Changed while the connection is down: the re-seed must pick it up
+        await rpc.drop_pubsub()
+        await wait_for(lambda: not stream.connected)
+        rpc.lamports = 3_000_000_000
+        await wait_for(lambda: rpc.calls["accountSubscribe"] == 4 and stream.cached(SOL_MINT) == 3_000_000_000)
+        assert (SOL_MINT, 3_000_000_000) in seen
+
+        ata = str(swap.mint_registry.ata(USDC_MINT, swap.pubkey))
+        await rpc.notify(ata, rpc.token_account(USDC_MINT, wallet, 1_000))
+        await wait_for(lambda: stream.cached(USDC_MINT) == 1_000)
+
+    run_stream(body)
+
+
+def test_retries_an_account_it_could_not_watch():
+    async def body(rpc, swap, stream, seen):
+        account_for = stream._account_for
+        failures = []
+
+        def flaky(mint):
+            if mint == USDC_MINT and not failures:
+                failures.append(mint)
+                raise ValueError("registry not loaded yet")
+            return account_for(mint)
+
+        stream._account_for = flaky
+        # Picked up again by the retry timer, without a reconnect
+        await wait_for(lambda: stream.cached(USDC_MINT) == 25_000_000)
+        assert failures == [USDC_MINT]
+        assert rpc.calls["accountSubscribe"] == 2
+        assert not stream._unwatched
+
+    statuses = []
+    run_stream(body, retry_interval=0.05, on_status=statuses.append)
+    assert sum(s.startswith("Can't watch") for s in statuses) == 1
+    assert not any(s.startswith("Balance stream disconnected") for s in statuses)
@@ -0,0 +1,28 @@
+import asyncio
+from solders.keypair import Keypair
+from jup_swap import JupSwap, SOL_MINT
+from stub_servers import TOKEN_2022_PROGRAM, RpcStub, start_app
+
+USDC_MINT = "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v"
+
+
+def test_snapshot_includes_token_2022_balances():
+    token_2022_mint = str(Keypair().pubkey())
+
+    async def run():
+        rpc = RpcStub(
+            tokens={USDC_MINT: 25_000_000, token_2022_mint: 7_000},
+            programs={token_2022_mint: TOKEN_2022_PROGRAM}
+        )
+        rpc_url, runner = await start_app(rpc.app())
+        swap = JupSwap(private_key_str=str(Keypair()), rpc_url=rpc_url)
+        try:
+            return rpc, await swap.get_all_balances()
+        finally:
+            await swap.close()
+            await runner.cleanup()
+
+    rpc, balances = asyncio.run(run())
+    assert balances == {SOL_MINT: 5_000_000_000, USDC_MINT: 25_000_000, token_2022_mint: 7_000}
+    # One call per token program
+    assert rpc.calls["getTokenAccountsByOwner"] == 2
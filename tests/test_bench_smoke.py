@@ -0,0 +1,21 @@
+import asyncio
+import bench_swaps
+
+
+def test_every_scenario_runs_against_the_stubs():
+    args = bench_swaps.build_parser().parse_args(["--sizes", "1,4", "--rounds", "1", "--inprocess"])
+    args.sizes = [1, 4]
+    args.scenarios = ["swaps", "pipeline", "balances"]
+
+    async def run():
+        jupiter_url, rpc_url, cleanup = await bench_swaps.start_stubs_inprocess(args)
+        try:
+            return await bench_swaps.bench(args, jupiter_url, rpc_url)
+        finally:
+            await cleanup()
+
+    rows = asyncio.run(run())
+    assert {row["scenario"] for row in rows} == set(args.scenarios)
+    for row in rows:
+        assert row["failed"] == 0, row
+        assert row["ok"] == row["concurrency"], row
@@ -0,0 +1,30 @@
+import asyncio
+from solders.keypair import Keypair
+from fee import PriorityFeeEstimator
+from jup_swap import JupSwap
+from stub_servers import RpcStub, start_app
+
+USDC_MINT = "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v"
+
+
+def test_estimate_uses_recent_prioritization_fees():
+    async def run():
+        rpc = RpcStub()
+        rpc_url, runner = await start_app(rpc.app())
+        swap = JupSwap(private_key_str=str(Keypair()), rpc_url=rpc_url)
+        try:
+            estimator = PriorityFeeEstimator(swap)
+            estimator.set_accounts([USDC_MINT])
+            # Concurrent estimates share one lookup
+            fees = await asyncio.gather(*(estimator.estimate(cap=5_000_000) for _ in range(5)))
+            return rpc, fees, estimator, swap._get_rpc().stats()
+        finally:
+            await swap.close()
+            await runner.cleanup()
+
+    rpc, fees, estimator, stats = asyncio.run(run())
+    assert rpc.calls.get("getRecentPrioritizationFees") == 1
+    assert estimator.lookups == 1
+    # The stub's fees top out at 100000 micro-lamports/CU, far below the cap fallback
+    assert all(estimator.min_fee <= fee <= 100000 * estimator.compute_units // 1_000_000 for fee in fees)
+    assert not any(endpoint["ejected"] for endpoint in stats)
@@ -0,0 +1,54 @@
+import asyncio
+from solders.keypair import Keypair
+from solders.pubkey import Pubkey
+from spl.token.constants import TOKEN_PROGRAM_ID
+from spl.token.instructions import get_associated_token_address
+from jup_swap import JupSwap
+from metrics import Metrics
+from mints import MintRegistry
+
+USDC_MINT = "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v"
+
+
+def test_ata_for_unfetched_mint(tmp_path):
+    registry = MintRegistry(str(tmp_path / "pairs.db"))
+    owner = Keypair().pubkey()
+    expected = get_associated_token_address(owner, Pubkey.from_string(USDC_MINT), token_program_id=TOKEN_PROGRAM_ID)
+    assert registry.get(USDC_MINT).program is None
+    assert registry.ata(USDC_MINT, owner) == expected
+
+
+def test_swap_keeps_empty_registry(tmp_path):
+    registry = MintRegistry(str(tmp_path / "pairs.db"))
+    swap = JupSwap(private_key_str=str(Keypair()), mint_registry=registry)
+    assert swap.mint_registry is registry
+
+
+def test_ensure_survives_parse_panic():
+    class Panic(BaseException):
+        # Like pyo3's PanicException, not an Exception subclass
+        pass
+
+    class Swap:
+        metrics = Metrics()
+
+        async def _rpc_call(self, fn):
+            raise Panic("WrongSize")
+
+    registry = MintRegistry()
+    assert asyncio.run(registry.ensure(Swap(), [USDC_MINT])) == 0
+    assert registry.decimals(USDC_MINT) is None
+
+
+def test_format_amount():
+    registry = MintRegistry()
+    registry.get(USDC_MINT).decimals = 6
+    zero = registry.get("zero-decimals")
+    zero.decimals = 0
+    assert registry.format_amount(USDC_MINT, 1_250_000) == "1.25 USDC"
+    assert registry.format_amount(USDC_MINT, 5_000_000) == "5 USDC"
+    assert registry.format_amount(USDC_MINT, -500) == "-0.0005 USDC"
+    assert registry.format_amount("zero-decimals", 100) == "100"
+    assert registry.format_amount("zero-decimals", 0) == "0"
+    # Past float precision
+    assert registry.format_amount(USDC_MINT, 123456789012345678901) == "123,456,789,012,345.678901 USDC"
@@ -0,0 +1,73 @@
+import asyncio
+from solders.keypair import Keypair
+from jup_swap import JupSwap, SOL_MINT
+from mints import MintRegistry
+from monitor import QuoteMonitor, TriggerStore
+from storage import PairStore
+from stub_servers import start_stubs
+
+USDC_MINT = "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v"
+
+
+def run_monitor(tmp_path, kind, target, body):
+    """A USDC -> SOL sell pair with one trigger; the stub prices it at 0.002 SOL per USDC."""
+    db = str(tmp_path / "pairs.db")
+    store = PairStore(db)
+    pair_id = store.add_pair(USDC_MINT, SOL_MINT, 0, 300, 1000)
+    triggers = TriggerStore(db)
+    triggers.add(pair_id, kind, target)
+
+    async def run():
+        jupiter_url, rpc_url, jupiter, rpc, cleanup = await start_stubs()
+        swap = JupSwap(private_key_str=str(Keypair()), rpc_url=rpc_url, jupiter_url=jupiter_url,
+                       mint_registry=MintRegistry(db))
+        monitor = QuoteMonitor(swap, store, triggers, sell_percent=lambda pid: 50, log=lambda msg: None)
+        try:
+            await monitor._reload()
+            pair = monitor._pairs[pair_id]
+            balances = await swap.get_all_balances()
+            return await body(monitor, swap, jupiter, pair, balances)
+        finally:
+            await swap.close()
+            await cleanup()
+
+    return triggers, asyncio.run(run())
+
+
+def test_sell_polls_quote_fresh_every_time(tmp_path):
+    async def body(monitor, swap, jupiter, pair, balances):
+        prices = [await monitor.poll(pair, balances) for _ in range(3)]
+        return prices, len(jupiter.orders), [o[3] for o in jupiter.orders.values()]
+
+    _, (prices, orders, amounts) = run_monitor(tmp_path, "stop_loss", 0.001, body)
+    assert prices == [0.002] * 3
+    assert orders == 3
+    # Half of the snapshot balance, no extra balance read per poll
+    assert amounts == [12_500_000] * 3
+
+
+def test_trigger_disarmed_after_the_swap_is_sent(tmp_path):
+    async def body(monitor, swap, jupiter, pair, balances):
+        await monitor.poll(pair, balances)
+        await asyncio.gather(*monitor._fire_tasks)
+        return jupiter.executed
+
+    triggers, executed = run_monitor(tmp_path, "take_profit", 0.001, body)
+    assert executed == 1
+    assert triggers.load() == []
+    assert triggers.history()[0][6] == 0.002
+
+
+def test_trigger_rearmed_when_nothing_was_sent(tmp_path):
+    async def body(monitor, swap, jupiter, pair, balances):
+        async def expired(order, pair_id=None):
+            return swap.expired(order, pair_id)
+
+        swap.sign_and_execute = expired
+        await monitor.poll(pair, balances)
+        await asyncio.gather(*monitor._fire_tasks)
+        return monitor._spent, monitor._loaded_at
+
+    triggers, (spent, loaded_at) = run_monitor(tmp_path, "take_profit", 0.001, body)
+    assert len(triggers.load()) == 1
+    assert not spent and loaded_at == 0
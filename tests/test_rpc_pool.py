@@ -0,0 +1,66 @@
+import asyncio
+import pytest
+from solders.keypair import Keypair
+from rpc_pool import RpcPool
+from stub_servers import Faults, RpcStub, start_app
+
+
+def run_with_stubs(faults, body, **pool_kwargs):
+    """Start one RpcStub per Faults, run body(pool, stubs), clean up."""
+    async def run():
+        stubs = [RpcStub(f) for f in faults]
+        started = [await start_app(stub.app()) for stub in stubs]
+        pool_kwargs.setdefault("hedge", True)
+        pool = RpcPool([url for url, _ in started], hedge_default_delay=0.05, **pool_kwargs)
+        try:
+            return await body(pool, stubs)
+        finally:
+            await pool.close()
+            for _, runner in started:
+                await runner.cleanup()
+    return asyncio.run(run())
+
+
+def test_failover_and_hedging():
+    owner = Keypair().pubkey()
+
+    async def body(pool, stubs):
+        results = [await pool.call(lambda c: c.get_balance(owner)) for _ in range(12)]
+        return results, pool.stats(), pool.hedged_count, [stub.calls.get("getBalance", 0) for stub in stubs]
+
+    faults = [Faults(error_rate=1.0), Faults(latency=0.3), Faults()]
+    results, stats, hedged, calls = run_with_stubs(faults, body)
+    assert all(r.value == 5_000_000_000 for r in results)
+    assert stats[0]["error_rate"] > 0 and stats[2]["error_rate"] == 0
+    # The slow node lost the race to the hedge, then the healthy one took the reads
+    assert hedged >= 1
+    assert calls[2] >= 10
+
+
+def test_failing_endpoint_is_ejected():
+    owner = Keypair().pubkey()
+
+    async def body(pool, stubs):
+        for _ in range(3):
+            await pool.call(lambda c: c.get_balance(owner))
+        return pool.stats()
+
+    stats = run_with_stubs([Faults(error_rate=1.0), Faults()], body, hedge=False, eject_after=1)
+    assert stats[0]["ejected"] and not stats[1]["ejected"]
+
+
+def test_caller_errors_do_not_count_against_the_endpoint():
+    async def body(pool, stubs):
+        async def broken(client):
+            await client.get_balance(Keypair().pubkey())
+            raise ValueError("parse error in the caller")
+
+        for _ in range(5):
+            with pytest.raises(ValueError):
+                await pool.call(broken)
+        return pool.stats(), [sum(stub.calls.values()) for stub in stubs]
+
+    stats, calls = run_with_stubs([Faults(), Faults()], body)
+    assert not any(e["ejected"] or e["error_rate"] for e in stats)
+    # Raised as is, never retried on the other node
+    assert sum(calls) == 5
@@ -0,0 +1,45 @@
+import asyncio
+from solders.keypair import Keypair
+from jup_swap import SOL_MINT
+from mints import MintRegistry
+from runner import run_once
+from storage import PairStore
+from stub_servers import start_stubs
+from wallets import WalletPool
+
+USDC_MINT = "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v"
+JUP_MINT = "JUPyiwrYJFskUPiHa7hkeR8VUtAeFoSYbKedZNsDvCN"
+
+
+def test_two_wallets_share_the_registry_and_sell(tmp_path):
+    db = str(tmp_path / "pairs.db")
+    store = PairStore(db)
+    # Shard by pair: ids 1 and 2 land on different wallets, both sells
+    store.add_pair(USDC_MINT, SOL_MINT, 0, 300, 1000)
+    store.add_pair(JUP_MINT, SOL_MINT, 0, 300, 1000)
+    store.add_pair(SOL_MINT, USDC_MINT, 1_000_000, 300, 1000)
+    registry = MintRegistry(db)
+
+    async def run():
+        jupiter_url, rpc_url, jupiter, rpc, cleanup = await start_stubs()
+        pool = WalletPool(
+            [str(Keypair()), str(Keypair())],
+            signer_workers=0,
+            log=None,
+            rpc_url=rpc_url,
+            jupiter_url=jupiter_url,
+            mint_registry=registry
+        )
+        try:
+            results = await run_once(pool, store, 50)
+            return pool, results, jupiter.executed
+        finally:
+            await pool.close()
+            await cleanup()
+
+    pool, results, executed = asyncio.run(run())
+    assert all(swap.mint_registry is registry for swap in pool)
+    assert {pool.wallet_for(1), pool.wallet_for(2)} == set(pool)
+    assert len(results) == 3
+    assert all(str(r).startswith("Succes") for r in results), results
+    assert executed == 3
@@ -0,0 +1,184 @@
+"""
+Several wallets trading side by side.
+
+    pool = WalletPool(read_keys("wallets.txt"), policy="pair", rpc_url=urls, journal=journal)
+    swap = pool.wallet_for(pair_id, index)     # the JupSwap that trades this pair
+    results = await pool.run([(swap, params, pair_id, priority), ...])
+
+Every wallet gets its own JupSwap (session, order cache, balance cache) and
+its own SwapPipeline, so one wallet's balance or fee budget never holds up
+the others. The rate limiter, journal, metrics and mint registry are shared.
+Orders of all wallets are signed by one SignerPool: worker processes that
+load the keys once, so thousands of orders in flight never stall the loop.
+"""
+import asyncio
+import os
+import time
+from base64 import b64encode, b64decode
+from jup_swap import JupSwap
+from mints import MintRegistry
+from pipeline import SwapPipeline
+
+# Keys of the signer process, wallet address -> Keypair
+_KEYPAIRS = {}
+
+
+def read_keys(path: str):
+    """One base58 private key per line; blank lines and # comments are skipped."""
+    with open(path, "r") as f:
+        keys = [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+    if not keys:
+        raise ValueError(f"No private keys in {path}")
+    return keys
+
+
+def _load_keys(keys):
+    # Runs once in every signer process
+    from solders.keypair import Keypair
+    for key in keys:
+        keypair = Keypair.from_base58_string(key)
+        _KEYPAIRS[str(keypair.pubkey())] = keypair
+
+
+def sign_transaction(wallet: str, transaction_b64: str):
+    """Signer process: /order transaction (base64) -> (signed transaction (base64), signature)."""
+    from solders import message
+    from solders.transaction import VersionedTransaction
+    raw_transaction = VersionedTransaction.from_bytes(b64decode(transaction_b64))
+    signature = _KEYPAIRS[wallet].sign_message(message.to_bytes_versioned(raw_transaction.message))
+    signed_txn = VersionedTransaction.populate(raw_transaction.message, [signature])
+    return b64encode(bytes(signed_txn)).decode("utf-8"), str(signature)
+
+
+class SignerPool:
+    """
+    Signs orders in `workers` processes, plugged into SwapPipeline(signer=...).
+    Processes start on the first order and keep the keys in memory.
+    """
+
+    def __init__(self, keys, workers: int = None):
+        self.keys = list(keys)
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            # spawn: forking a process with the engine loop and journal threads running is not safe
+            self._executor = ProcessPoolExecutor(
+                self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_load_keys,
+                initargs=(self.keys,)
+            )
+        return self._executor
+
+    async def sign(self, swap, order: dict):
+        """Same result as JupSwap.sign_order, computed in a signer process."""
+        loop = asyncio.get_running_loop()
+        with swap.metrics.span("sign_pool"):
+            order["_signed_transaction"], order["_signature"] = await loop.run_in_executor(
+                self._get_executor(), sign_transaction, swap.wallet, order["transaction"]
+            )
+        order["_signed_at"] = time.time()
+        return order["_signed_transaction"]
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def shard_by_pair(pair_id, index, count):
+    # A pair always trades from the same wallet, so its sells find the tokens its buys got
+    return (pair_id if pair_id is not None else index) % count
+
+
+def shard_round_robin(pair_id, index, count):
+    return index % count
+
+
+SHARD_POLICIES = {
+    "pair": shard_by_pair,
+    "round_robin": shard_round_robin,
+}
+
+
+class WalletPool:
+    """
+    One JupSwap per key, built with the same keyword arguments.
+    policy is a name from SHARD_POLICIES or fn(pair_id, index, count) ->
+    wallet index. signer_workers=0 signs on the event loop instead of in
+    a SignerPool.
+    """
+
+    def __init__(self, keys, policy="pair", signer_workers: int = None, log=print, **swap_kwargs):
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            raise ValueError("WalletPool needs at least one private key")
+        registry = swap_kwargs.pop("mint_registry", None)
+        if registry is None:
+            registry = MintRegistry()
+        self.swaps = [JupSwap(private_key_str=key, mint_registry=registry, **swap_kwargs) for key in keys]
+        # Each JupSwap claims the registry, the mints table keeps the first wallet's ATAs
+        registry.owner = self.swaps[0].pubkey
+        self.policy = SHARD_POLICIES[policy] if isinstance(policy, str) else policy
+        self.signer = SignerPool(keys, signer_workers) if signer_workers != 0 else None
+        self.log = log
+
+    def __len__(self):
+        return len(self.swaps)
+
+    def __iter__(self):
+        return iter(self.swaps)
+
+    @property
+    def primary(self):
+        return self.swaps[0]
+
+    def wallet_for(self, pair_id, index: int = 0):
+        """The JupSwap that trades `pair_id`; index is its position in the run."""
+        return self.swaps[self.policy(pair_id, index, len(self.swaps))]
+
+    async def run(self, jobs, on_result=None, **pipeline_kwargs):
+        """
+        jobs: iterable of (swap, params, pair_id, priority), swap from
+        wallet_for(), optionally followed by the Sell % as in SwapPipeline.
+        Every wallet runs its own pipeline, all at once. Results come back
+        in input order.
+        """
+        jobs = list(jobs)
+        shards = {}
+        for position, job in enumerate(jobs):
+            shards.setdefault(job[0], []).append((position, tuple(job[1:])))
+        started = time.monotonic()
+
+        async def run_shard(swap, shard):
+            pipeline = SwapPipeline(swap, log=None, signer=self.signer, **pipeline_kwargs)
+            return await pipeline.run([job for _, job in shard], on_result=on_result)
+
+        shard_results = await asyncio.gather(*(run_shard(swap, shard) for swap, shard in shards.items()))
+        results = [None] * len(jobs)
+        for shard, values in zip(shards.values(), shard_results):
+            for (position, _), value in zip(shard, values):
+                results[position] = value
+        if self.log and jobs:
+            elapsed = time.monotonic() - started
+            failed = sum(isinstance(r, Exception) for r in results)
+            self.log(
+                f"{len(jobs)} swaps over {len(shards)} wallets, {failed} failed, "
+                f"{elapsed:.2f}s ({len(jobs) / elapsed:.2f} swaps/s)"
+            )
+        return results
+
+    async def close(self):
+        await asyncio.gather(*(swap.close() for swap in self.swaps), return_exceptions=True)
+        if self.signer is not None:
+            self.signer.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()